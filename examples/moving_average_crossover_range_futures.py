@@ -4,10 +4,9 @@ import sys
 
 from ta_scanner.data.data import load_and_cache, db_data_fetch_between, aggregate_bars
 from ta_scanner.data.ib import IbDataFetcher
+from ta_scanner.experiments.parameter_sweep import ParameterSweep
 from ta_scanner.indicators import IndicatorSmaCrossover, IndicatorParams
-from ta_scanner.signals import Signal
-from ta_scanner.filters import FilterCumsum, FilterOptions, FilterNames
-from ta_scanner.reports import BasicReport
+from ta_scanner.filters import FilterOptions
 from ta_scanner.models import gen_engine
 
 
@@ -41,55 +40,29 @@ interval = 1
 df_original = query_data(engine, symbol, sd, ed, interval)
 
 
-# store signals in this field
-field_name = "moving_avg_cross"
-result_field_name = f"{field_name}_pnl"
-
-
-def run_cross(fast_sma: int, slow_sma: int):
-    df = df_original.copy()
-
-    indicator_params = {
-        IndicatorParams.fast_sma: fast_sma,
-        IndicatorParams.slow_sma: slow_sma,
-    }
-    indicator = IndicatorSmaCrossover(field_name, indicator_params)
-    indicator.apply(df)
+slow_sma = 60
 
-    filter_options = {
+sweep = ParameterSweep(
+    IndicatorSmaCrossover,
+    {
+        IndicatorParams.slow_sma: [slow_sma],
+        IndicatorParams.fast_sma: range(2, slow_sma),
+    },
+    {
         FilterOptions.win_points: 6,
         FilterOptions.loss_points: 4,
         FilterOptions.threshold_intervals: 30,
-    }
-    sfilter = FilterCumsum(field_name, result_field_name, filter_options)
-    results = sfilter.apply(df)
-
-    # get aggregate pnl
-    basic_report = BasicReport()
-    pnl, count, avg, median = basic_report.analyze(df, field_name)
-    return pnl, count, avg, median
-
-
-slow_sma = 60
-
-results = []
+    },
+)
+results = sweep.run(df_original)
 
-for fast_sma in range(2, slow_sma):
-    pnl, count, avg, median = run_cross(fast_sma, slow_sma)
-    results.append([slow_sma, fast_sma, pnl, count, avg, median])
+for fast_sma, pnl, count, avg, median in results[
+    ["fast_sma", "pnl", "count", "average", "median"]
+].itertuples(index=False):
     print(f"MA_Crx_{fast_sma}/{slow_sma}, {pnl}, {count}, {avg}, {median}")
 
 
 # write results to csv
 
-headers = ["slow_sma", "fast_sma", "pnl", "count", "avg", "median"]
-
 filename = f"results/MA_Crx_{symbol.replace('/', '')}.csv"
-
-with open(filename, "w") as f:
-    import csv
-
-    writer = csv.writer(f)
-    writer.writerow(headers)
-    for row in results:
-        writer.writerow(row)
+results.to_csv(filename, index=False)
@@ -6,7 +6,8 @@ from ta_scanner.data.data import load_and_cache
 from ta_scanner.data.ib import IbDataFetcher
 from ta_scanner.indicators import IndicatorSmaCrossover, IndicatorParams
 from ta_scanner.signals import Signal
-from ta_scanner.filters import FilterCumsum, FilterOptions, FilterNames
+from ta_scanner.filters import FilterCumsum, FilterOptions
+from ta_scanner.pipeline import Pipeline
 from ta_scanner.reports import BasicReport
 
 
@@ -30,8 +31,6 @@ result_field_name = f"{field_name}_pnl"
 
 
 def run_cross(fast_sma: int, slow_sma: int):
-    df = df_original.copy()
-
     indicator_sma_cross = IndicatorSmaCrossover(
         field_name=field_name,
         params={
@@ -40,9 +39,6 @@ def run_cross(fast_sma: int, slow_sma: int):
         },
     )
 
-    # apply indicator to generate signals
-    indicator_sma_cross.apply(df)
-
     # initialize filter
     sfilter = FilterCumsum(
         field_name=field_name,
@@ -54,13 +50,12 @@ def run_cross(fast_sma: int, slow_sma: int):
         },
     )
 
-    # generate results
-    results = sfilter.apply(df)
+    # generate signals and trades, df_original is only read, never copied
+    pipeline = Pipeline([indicator_sma_cross], sfilter, BasicReport())
+    result = pipeline.run(df_original)
 
     # get aggregate pnl
-    basic_report = BasicReport()
-    pnl = basic_report.analyze(df, FilterNames.filter_cumsum.value)
-    return pnl
+    return result.metrics.pnl[0]
 
 
 slow_sma = 50
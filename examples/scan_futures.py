@@ -0,0 +1,39 @@
+import datetime
+from loguru import logger
+import sys
+
+from ta_scanner.filters import FilterCumsum, FilterOptions
+from ta_scanner.indicators import IndicatorEmaCrossover, IndicatorParams
+from ta_scanner.scanner import DbBarLoader, Scanner, ScanPipeline, gen_futures_universe
+
+
+# mute the noisy data debug statements
+logger.remove()
+logger.add(sys.stderr, level="INFO")
+
+field_name = "ema_crossover"
+result_field_name = f"{field_name}_pnl"
+
+pipeline = ScanPipeline(
+    [
+        IndicatorEmaCrossover(
+            field_name=field_name,
+            params={IndicatorParams.fast_ema: 20, IndicatorParams.slow_ema: 60},
+        )
+    ],
+    FilterCumsum(
+        field_name=field_name,
+        result_field_name=result_field_name,
+        params={
+            FilterOptions.win_points: 6,
+            FilterOptions.loss_points: 4,
+            FilterOptions.threshold_intervals: 30,
+        },
+    ),
+)
+
+if __name__ == "__main__":
+    sd, ed = datetime.date(2020, 8, 1), datetime.date(2020, 8, 23)
+    scanner = Scanner(pipeline, DbBarLoader(sd, ed, groupby_minutes=5))
+    results = scanner.scan(gen_futures_universe())
+    print(results.to_string())
@@ -0,0 +1,242 @@
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from enum import Enum
+from loguru import logger
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from ta_scanner.indicators import BaseIndicator
+
+
+def fingerprint_arrays(arrays: Iterable[np.ndarray]) -> str:
+    """
+    blake2b digest of the dtype, shape and bytes of each array
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for values in arrays:
+        values = np.ascontiguousarray(values)
+        digest.update(f"{values.dtype.str}{values.shape}".encode())
+        digest.update(values.view(np.uint8).reshape(-1))
+    return digest.hexdigest()
+
+
+def canonical_params(params: Any) -> str:
+    """
+    params as a stable string: enums become their values, dicts are sorted and
+    ranges, tuples and numpy scalars become plain lists and numbers
+    """
+
+    def canonical(value):
+        if isinstance(value, Enum):
+            return canonical(value.value)
+        if isinstance(value, dict):
+            items = [(canonical(k), canonical(v)) for k, v in value.items()]
+            return sorted(items, key=repr)
+        if isinstance(value, (list, tuple, range)):
+            return [canonical(v) for v in value]
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    return json.dumps(canonical(params), default=repr)
+
+
+def gen_cache_key(parts: Iterable[str]) -> str:
+    """
+    blake2b hex digest of the parts, a fixed length key that is safe to use
+    as a file name
+    """
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+
+class IndicatorCache:
+    """
+    Memoize indicator outputs.
+
+    Entries are keyed on the indicator class, its params and field name, and
+    a fingerprint of the input columns, so an indicator re-applied to the same
+    bars copies its output columns from the cache instead of recomputing them.
+    The least recently used entries are evicted once the arrays held take more
+    than max_bytes. With a cache_dir, entries are also written there as .npz
+    files, so other processes and later runs hit too. The least recently used
+    files are removed once they take more than max_disk_bytes, without it the
+    cache_dir grows without limit. Pickled copies start with an empty memory
+    cache.
+
+    Example:
+        cache = IndicatorCache(max_bytes=512 * 2 ** 20, cache_dir=".cache")
+        IndicatorEmaCrossover("ema_crossover", params).apply(df, cache=cache)
+
+    Args:
+        max_bytes (int): memory budget for the cached arrays
+        cache_dir (str): optional directory for the on disk cache
+        max_disk_bytes (int): optional budget for the files in cache_dir
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 2**20,
+        cache_dir: Optional[str] = None,
+        max_disk_bytes: Optional[int] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def gen_key(self, indicator: BaseIndicator, df: pd.DataFrame) -> str:
+        columns = indicator.input_columns()
+        parts = [
+            indicator.__class__.__name__,
+            indicator.field_name,
+            canonical_params(indicator.params),
+            fingerprint_arrays(df[c].to_numpy() for c in columns),
+        ]
+        return gen_cache_key(parts)
+
+    def apply(self, indicator: BaseIndicator, df: pd.DataFrame) -> None:
+        """
+        same as indicator.apply(df), with the output columns from the cache
+        when the indicator already ran over the same input columns
+        """
+        columns = indicator.output_columns()
+        key = self.gen_key(indicator, df)
+
+        arrays = self.get(key)
+        if arrays is None:
+            self.misses += 1
+            indicator.apply(df)
+            self.put(key, {c: df[c].to_numpy() for c in columns})
+            return
+
+        self.hits += 1
+        for c in columns:
+            df[c] = arrays[c].copy()
+
+    def get_or_compute(
+        self, key: str, compute: Callable[[], Dict[str, np.ndarray]]
+    ) -> Dict[str, np.ndarray]:
+        """
+        the arrays cached under key, or compute and cache them. key is used as
+        a file name in the cache_dir, eg build it with gen_cache_key.
+        """
+        arrays = self.get(key)
+        if arrays is not None:
+            self.hits += 1
+            return arrays
+
+        self.misses += 1
+        arrays = compute()
+        self.put(key, arrays)
+        return arrays
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        arrays = self._read(key)
+        if arrays is not None:
+            self._insert(key, arrays)
+        return arrays
+
+    def put(self, key: str, arrays: Dict[str, np.ndarray]) -> None:
+        arrays = {c: np.array(v) for c, v in arrays.items()}
+        self._insert(key, arrays)
+        self._write(key, arrays)
+
+    def __getstate__(self):
+        # pickled copies, eg sent to executor workers, start empty and share
+        # only the disk cache
+        state = self.__dict__.copy()
+        state.update(nbytes=0, hits=0, misses=0, _entries=collections.OrderedDict())
+        return state
+
+    def clear(self) -> None:
+        """
+        drop the in memory entries, the disk cache is kept
+        """
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _insert(self, key: str, arrays: Dict[str, np.ndarray]) -> None:
+        for values in arrays.values():
+            values.flags.writeable = False
+
+        if key in self._entries:
+            self.nbytes -= self._entry_nbytes(self._entries.pop(key))
+        self._entries[key] = arrays
+        self.nbytes += self._entry_nbytes(arrays)
+
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.nbytes -= self._entry_nbytes(evicted)
+            logger.debug(f"Evicted {evicted_key}. Cached bytes={self.nbytes}")
+
+    def _entry_nbytes(self, arrays: Dict[str, np.ndarray]) -> int:
+        return sum(values.nbytes for values in arrays.values())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _read(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        if not self.cache_dir or not os.path.exists(self._path(key)):
+            return None
+        with np.load(self._path(key), allow_pickle=False) as npz:
+            arrays = {c: npz[c] for c in npz.files}
+        # mark the file as recently used for _trim_disk
+        os.utime(self._path(key))
+        return arrays
+
+    def _write(self, key: str, arrays: Dict[str, np.ndarray]) -> None:
+        if not self.cache_dir:
+            return
+        if any(values.dtype == object for values in arrays.values()):
+            logger.debug(f"Not writing {key}, object arrays can't be stored")
+            return
+
+        # write to a temp file and rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self._path(key))
+        self._trim_disk(keep=self._path(key))
+
+    def _trim_disk(self, keep: str) -> None:
+        """
+        remove the least recently used files until the cache_dir fits in
+        max_disk_bytes, the file just written at keep is always kept
+        """
+        if self.max_disk_bytes is None:
+            return
+
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npz"):
+                stat = entry.stat()
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        files.sort()
+
+        disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if disk_bytes <= self.max_disk_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # removed by another process sharing the cache_dir
+                pass
+            disk_bytes -= size
+            logger.debug(f"Removed {path}. Disk cache bytes={disk_bytes}")
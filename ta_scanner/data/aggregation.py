@@ -0,0 +1,321 @@
+import numpy as np
+import pandas as pd
+from enum import Enum
+from trading_calendars import TradingCalendar
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from ta_scanner.data.sessions import BAR_START_OFFSET, session_bounds, to_utc_nanos
+
+
+AGGREGATE_COLUMNS = ["open", "high", "low", "close", "volume", "bar_count", "average"]
+
+MINUTE_NANOS = 60 * 1_000_000_000
+
+
+class AggregationException(Exception):
+    pass
+
+
+class BarAnchor(Enum):
+    # buckets on the wall clock, like pandas resample
+    CLOCK = "clock"
+    # buckets on the minutes since the trading calendar's session open
+    SESSION = "session"
+
+
+def bucket_starts(bucket_ids: np.ndarray) -> np.ndarray:
+    """
+    positions where each run of equal, sorted bucket ids starts
+    """
+    if len(bucket_ids) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+
+
+def aggregate_arrays(
+    arrays: Dict[str, np.ndarray], starts: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    reduce the rows of arrays between consecutive starts into one bar each.
+    arrays holds the AGGREGATE_COLUMNS plus pv, the sum of average * volume
+    used for the volume weighted average, which falls back to the close when
+    a bucket has no volume. Missing prices are skipped.
+    """
+    ends = np.r_[starts[1:], len(arrays["close"])] - 1
+
+    result = {
+        "open": arrays["open"][starts],
+        "high": np.fmax.reduceat(arrays["high"], starts),
+        "low": np.fmin.reduceat(arrays["low"], starts),
+        "close": arrays["close"][ends],
+    }
+    for c in ["volume", "bar_count", "pv"]:
+        result[c] = np.add.reduceat(np.nan_to_num(arrays[c]), starts)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = result["pv"] / result["volume"]
+    average = np.where(result["volume"] > 0, average, result["close"])
+    # a bucket of one bar keeps that bar's average as is
+    single = starts == ends
+    result["average"] = np.where(single, arrays["average"][starts], average)
+    return result
+
+
+def gen_base_arrays(df: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    float64 arrays of the bar columns of a DataFrame or a dict of arrays, with
+    pv for the weighted average
+    """
+    length = len(df["close"])
+    arrays = {}
+    for c in AGGREGATE_COLUMNS:
+        if c in df:
+            arrays[c] = np.asarray(df[c], dtype=np.float64)
+        elif c == "average":
+            arrays[c] = arrays["close"]
+        else:
+            arrays[c] = np.zeros(length, dtype=np.float64)
+    arrays["pv"] = np.nan_to_num(arrays["average"]) * np.nan_to_num(arrays["volume"])
+    return arrays
+
+
+def aggregate_bars_multi(
+    df: pd.DataFrame, intervals: List[int], origin: Optional[pd.Timestamp] = None
+) -> Dict[int, pd.DataFrame]:
+    """
+    aggregate sorted bars, indexed by ts, to several minute intervals at once.
+
+    Buckets are anchored at origin, by default midnight of the first bar's
+    day like pandas resample, and labelled by their start. Intervals are
+    built smallest first and each one is reduced from the largest interval
+    already built that divides it, eg 60 from 15 from 5 from the minute bars,
+    so the minute arrays are only read once. Empty buckets are never created.
+
+    Args:
+        df (pd.DataFrame): bars indexed by ts, with open, high, low, close,
+            volume and optionally bar_count and average
+        intervals (List[int]): bar sizes in minutes, eg [1, 5, 15, 60]
+        origin (pd.Timestamp): optional bucket anchor
+
+    Returns:
+        Dict[int, pd.DataFrame]: interval -> bars indexed by ts, with the
+            AGGREGATE_COLUMNS, average being volume weighted
+    """
+    if any(interval < 1 or interval >= 1440 for interval in intervals):
+        raise AggregationException("intervals must be between 1 and 1439 minutes")
+
+    index = pd.DatetimeIndex(df.index)
+    if len(index) == 0:
+        empty = pd.DataFrame(columns=AGGREGATE_COLUMNS, index=index[:0])
+        return {interval: empty.copy() for interval in intervals}
+
+    if origin is None:
+        origin = index[0].normalize()
+    origin_nanos = to_utc_nanos([origin])[0]
+
+    nanos = to_utc_nanos(index)
+    built: Dict[int, tuple] = {0: (nanos, gen_base_arrays(df))}
+
+    for interval in sorted(set(intervals)):
+        source = max(i for i in built if i == 0 or interval % i == 0)
+        source_nanos, source_arrays = built[source]
+
+        interval_nanos = interval * MINUTE_NANOS
+        bucket_ids = (source_nanos - origin_nanos) // interval_nanos
+        starts = bucket_starts(bucket_ids)
+
+        ts_nanos = origin_nanos + bucket_ids[starts] * interval_nanos
+        built[interval] = (ts_nanos, aggregate_arrays(source_arrays, starts))
+
+    return {
+        interval: gen_bars_frame(*built[interval], index.tz) for interval in intervals
+    }
+
+
+def gen_bars_frame(ts_nanos: np.ndarray, arrays: Dict[str, np.ndarray], tz):
+    """
+    bars frame indexed by ts, in tz, from UTC nanos and aggregated arrays
+    """
+    ts = pd.DatetimeIndex(ts_nanos, tz="UTC", name="ts")
+    if tz is not None:
+        ts = ts.tz_convert(tz)
+    else:
+        ts = ts.tz_localize(None)
+    return pd.DataFrame({c: arrays[c] for c in AGGREGATE_COLUMNS}, index=ts)
+
+
+def session_buckets(
+    nanos: np.ndarray, calendar: TradingCalendar, interval: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    bucket starts and bucket labels (UTC nanos) for bars, labelled by their
+    start, bucketed on the minutes since their session opened. A bucket never
+    spans two sessions, so the last bucket of a session is cut short at the
+    close instead of running over the maintenance break.
+    """
+    opens = session_bounds(calendar, nanos.min(), nanos.max())[0]
+    if len(opens) == 0:
+        raise AggregationException(f"{calendar.name} has no sessions for the bars")
+
+    # first bar start of each session, eg 09:30 for the 09:31 XNYS open
+    anchors = opens - BAR_START_OFFSET.value
+    session = np.searchsorted(anchors, nanos, side="right") - 1
+    # bars before the first session are anchored on it
+    anchor = anchors[np.maximum(session, 0)]
+
+    interval_nanos = interval * MINUTE_NANOS
+    bucket = (nanos - anchor) // interval_nanos
+
+    changed = (session[1:] != session[:-1]) | (bucket[1:] != bucket[:-1])
+    starts = np.flatnonzero(np.r_[True, changed])
+    return starts, anchor[starts] + bucket[starts] * interval_nanos
+
+
+def aggregate_bars_by_session(
+    df: pd.DataFrame, interval: int, calendar: TradingCalendar
+) -> pd.DataFrame:
+    """
+    aggregate sorted bars, indexed by ts, to interval minute bars anchored on
+    the calendar's session opens, eg 60 minute /ES bars start at 17:00 CT
+    and the last one of a session ends at the 16:00 CT close. Only buckets
+    with bars are created, so there is nothing to dropna.
+
+    Returns:
+        pd.DataFrame: bars indexed by ts, with the AGGREGATE_COLUMNS
+    """
+    if interval < 1 or interval >= 1440:
+        raise AggregationException("interval must be between 1 and 1439 minutes")
+
+    index = pd.DatetimeIndex(df.index)
+    if len(index) == 0:
+        return pd.DataFrame(columns=AGGREGATE_COLUMNS, index=index[:0])
+
+    starts, ts_nanos = session_buckets(to_utc_nanos(index), calendar, interval)
+    arrays = aggregate_arrays(gen_base_arrays(df), starts)
+    return gen_bars_frame(ts_nanos, arrays, index.tz)
+
+
+class StreamingAggregator:
+    """
+    Aggregate a stream of sorted minute bar chunks, eg from
+    db_data_stream_between, to interval minute bars.
+
+    Buckets are anchored at origin like aggregate_bars_multi, by default
+    midnight UTC of the first bar's day. The last bucket of each chunk may
+    continue in the next chunk, so its minute bars are carried over instead
+    of emitted. At most one bucket of minute bars is held between chunks,
+    and the bars emitted over the stream, plus flush(), are the same as
+    aggregating all the chunks at once.
+
+    Example:
+        aggregator = StreamingAggregator(5)
+        for chunk in db_data_stream_between(engine, "/ES", sd, ed):
+            bars = aggregator.update(chunk)
+        bars = aggregator.flush()
+
+    Args:
+        interval (int): bar size in minutes
+        origin (pd.Timestamp): optional bucket anchor
+    """
+
+    def __init__(self, interval: int, origin: Optional[pd.Timestamp] = None):
+        if interval < 1 or interval >= 1440:
+            raise AggregationException("interval must be between 1 and 1439 minutes")
+
+        self.interval = interval
+        self.origin = origin
+        self._origin_nanos: Optional[int] = None
+        self._carry: Optional[Tuple[np.ndarray, Dict[str, np.ndarray]]] = None
+
+    def update(self, chunk: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        take the next chunk, a DataFrame or dict of arrays with ts and the
+        bar columns, and return the buckets it completed as arrays, ts as
+        UTC datetime64[ns] labelled by the bucket start
+        """
+        nanos = to_utc_nanos(chunk["ts"])
+        arrays = gen_base_arrays(chunk)
+
+        if self._carry is not None:
+            carry_nanos, carry_arrays = self._carry
+            nanos = np.concatenate([carry_nanos, nanos])
+            arrays = {c: np.concatenate([carry_arrays[c], arrays[c]]) for c in arrays}
+            self._carry = None
+
+        if len(nanos) == 0:
+            return self._gen_bars(nanos, arrays, starts=[])
+
+        if self._origin_nanos is None:
+            origin = self.origin
+            if origin is None:
+                origin = pd.Timestamp(nanos[0], tz="UTC").normalize()
+            self._origin_nanos = to_utc_nanos([origin])[0]
+
+        bucket_ids = (nanos - self._origin_nanos) // (self.interval * MINUTE_NANOS)
+        starts = bucket_starts(bucket_ids)
+
+        last = starts[-1]
+        self._carry = (nanos[last:], {c: v[last:] for c, v in arrays.items()})
+        complete = {c: v[:last] for c, v in arrays.items()}
+        return self._gen_bars(nanos[:last], complete, starts[:-1])
+
+    def flush(self) -> Dict[str, np.ndarray]:
+        """
+        return the carried over bucket, at the end of the stream
+        """
+        if self._carry is None:
+            return self._gen_bars(nanos=None, arrays={}, starts=[])
+
+        nanos, arrays = self._carry
+        self._carry = None
+        return self._gen_bars(nanos, arrays, np.zeros(1, dtype=np.int64))
+
+    def _gen_bars(
+        self,
+        nanos: Optional[np.ndarray],
+        arrays: Dict[str, np.ndarray],
+        starts: Sequence[int],
+    ) -> Dict[str, np.ndarray]:
+        if len(starts) == 0:
+            bars = {c: np.zeros(0, dtype=np.float64) for c in AGGREGATE_COLUMNS}
+            bars["ts"] = np.zeros(0, dtype="datetime64[ns]")
+            return bars
+
+        interval_nanos = self.interval * MINUTE_NANOS
+        bucket_ids = (nanos[starts] - self._origin_nanos) // interval_nanos
+        ts_nanos = self._origin_nanos + bucket_ids * interval_nanos
+
+        aggregated = aggregate_arrays(arrays, starts)
+        bars = {c: aggregated[c] for c in AGGREGATE_COLUMNS}
+        bars["ts"] = ts_nanos.astype("datetime64[ns]")
+        return bars
+
+
+def aggregate_bar_stream(
+    chunks: Iterable[Mapping[str, Any]],
+    interval: int,
+    origin: Optional[pd.Timestamp] = None,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    run chunks through a StreamingAggregator, yielding the bars completed by
+    each chunk and the last bucket at the end. Empty results are skipped.
+    """
+    aggregator = StreamingAggregator(interval, origin)
+    for chunk in chunks:
+        bars = aggregator.update(chunk)
+        if len(bars["ts"]):
+            yield bars
+
+    bars = aggregator.flush()
+    if len(bars["ts"]):
+        yield bars
@@ -0,0 +1,354 @@
+import os
+import json
+import tempfile
+from enum import Enum
+import numpy as np
+import pandas as pd
+from loguru import logger
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ta_scanner.data.sessions import to_utc_nanos
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # python 3.7
+    shared_memory = None
+
+
+BAR_SET_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# the manifest length, then the manifest json, then the arrays
+HEADER_SIZE = 8
+ARRAY_ALIGNMENT = 64
+
+
+class BarSetException(Exception):
+    pass
+
+
+class BarSetStorage(Enum):
+    SHARED_MEMORY = "shared_memory"
+    MEMMAP = "memmap"
+
+
+def resolve_storage(
+    storage: Optional[BarSetStorage], name: Optional[str] = None
+) -> BarSetStorage:
+    """
+    the storage to use when none is given: shared memory where python has it
+    (>= 3.8), otherwise a memmap file. Attaching to a name that is an
+    existing file is always a memmap.
+    """
+    if storage is not None:
+        return storage
+    if shared_memory is None or (name is not None and os.path.isfile(name)):
+        return BarSetStorage.MEMMAP
+    return BarSetStorage.SHARED_MEMORY
+
+
+class SymbolRange(NamedTuple):
+    """
+    rows [start, stop) of the bar set hold symbol's bars, from first_ts to
+    last_ts in tz
+    """
+
+    symbol: str
+    start: int
+    stop: int
+    first_ts: Optional[str]
+    last_ts: Optional[str]
+    tz: Optional[str]
+
+
+class BarSetManifest(NamedTuple):
+    """
+    the symbols in a bar set and the (name, dtype, offset) of each column
+    array, offsets counting from the start of the arrays. Every column holds
+    length rows, the symbols one after another.
+    """
+
+    length: int
+    columns: List[tuple]
+    symbols: List[SymbolRange]
+
+    def to_json(self) -> bytes:
+        values = {
+            "length": self.length,
+            "columns": [list(c) for c in self.columns],
+            "symbols": [list(s) for s in self.symbols],
+        }
+        return json.dumps(values).encode()
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "BarSetManifest":
+        values = json.loads(raw.decode())
+        return cls(
+            length=values["length"],
+            columns=[tuple(c) for c in values["columns"]],
+            symbols=[SymbolRange(*s) for s in values["symbols"]],
+        )
+
+
+def gen_manifest(frames: Dict[str, pd.DataFrame], columns: List[str]) -> BarSetManifest:
+    symbols, start = [], 0
+    for symbol, df in frames.items():
+        ts = pd.DatetimeIndex(df["ts"] if "ts" in df.columns else df.index)
+        stop = start + len(ts)
+        if len(ts) == 0:
+            symbols.append(SymbolRange(symbol, start, stop, None, None, None))
+            continue
+        tz = None if ts.tz is None else str(ts.tz)
+        first_ts, last_ts = ts[0].isoformat(), ts[-1].isoformat()
+        symbols.append(SymbolRange(symbol, start, stop, first_ts, last_ts, tz))
+        start = stop
+
+    dtypes = [("ts", np.dtype(np.int64))] + [(c, np.dtype(np.float64)) for c in columns]
+    layout, offset = [], 0
+    for name, dtype in dtypes:
+        offset += -offset % ARRAY_ALIGNMENT
+        layout.append((name, dtype.str, offset))
+        offset += start * dtype.itemsize
+    return BarSetManifest(start, layout, symbols)
+
+
+def arrays_offset(manifest_bytes: int) -> int:
+    """
+    where the arrays start, after the header and the manifest json
+    """
+    offset = HEADER_SIZE + manifest_bytes
+    return offset + -offset % ARRAY_ALIGNMENT
+
+
+def block_size(manifest: BarSetManifest, manifest_bytes: int) -> int:
+    name, dtype, offset = manifest.columns[-1]
+    end = offset + manifest.length * np.dtype(dtype).itemsize
+    return arrays_offset(manifest_bytes) + end
+
+
+class SharedBarSet:
+    """
+    Bars of many symbols written once into a shared memory block or a memory
+    mapped file, for experiment workers to read without each one loading or
+    unpickling its own copy of the frames.
+
+    The block starts with a small json manifest of the symbols, their row
+    ranges and ts span, and the column dtypes and offsets, followed by one
+    array per column with every symbol's rows one after another. ts is kept
+    as int64 UTC nanos and the other columns as float64. Workers attach by
+    name, the block name or the file path, and get read only, zero copy
+    views. By default the block is shared memory, or on python 3.7 a memmap
+    file in the temp directory, see resolve_storage.
+
+    Example:
+        with SharedBarSet.create({"/ES": df_es, "/NQ": df_nq}) as bar_set:
+            name = bar_set.name
+            # in the worker
+            bar_set = SharedBarSet.attach(name)
+            close = bar_set.arrays("/ES")["close"]
+
+    Args:
+        buffer: the block's buffer
+        manifest (BarSetManifest): the block's layout
+        name (str): shared memory block name or file path
+        storage (BarSetStorage): where the block lives
+        handle: the SharedMemory or np.memmap keeping the buffer open
+        owner (bool): the creating process, which unlinks the block
+    """
+
+    def __init__(
+        self,
+        buffer,
+        manifest: BarSetManifest,
+        name: str,
+        storage: BarSetStorage,
+        handle,
+        owner: bool = False,
+    ):
+        self.buffer = buffer
+        self.manifest = manifest
+        self.name = name
+        self.storage = storage
+        self.handle = handle
+        self.owner = owner
+        self._symbols = {s.symbol: s for s in manifest.symbols}
+        self._arrays_offset = arrays_offset(len(manifest.to_json()))
+        self.inode = os.stat(name).st_ino if storage == BarSetStorage.MEMMAP else None
+
+    @classmethod
+    def create(
+        cls,
+        frames: Dict[str, pd.DataFrame],
+        columns: List[str] = BAR_SET_COLUMNS,
+        storage: Optional[BarSetStorage] = None,
+        path: Optional[str] = None,
+    ) -> "SharedBarSet":
+        """
+        write the frames, symbol -> bars with a ts column or index, into a new
+        block. MEMMAP storage writes to path, by default a new temp file.
+        """
+        storage = resolve_storage(storage)
+        for symbol, df in frames.items():
+            missing = [c for c in columns if c not in df.columns]
+            if missing:
+                raise BarSetException(f"{symbol} bars are missing {missing}")
+
+        manifest = gen_manifest(frames, columns)
+        size = block_size(manifest, len(manifest.to_json()))
+
+        if storage == BarSetStorage.SHARED_MEMORY:
+            if shared_memory is None:
+                raise BarSetException("shared memory bar sets require python >= 3.8")
+            handle = shared_memory.SharedMemory(create=True, size=size)
+            name, buffer = handle.name, handle.buf
+        else:
+            if path is None:
+                fd, path = tempfile.mkstemp(prefix="ta_scanner_bars_", suffix=".bin")
+                os.close(fd)
+            handle = np.memmap(path, dtype=np.uint8, mode="w+", shape=(size,))
+            name, buffer = path, handle
+
+        bar_set = cls(buffer, manifest, name, storage, handle, owner=True)
+        bar_set._write(frames)
+        logger.debug(f"Created bar set {name}. Rows={manifest.length}. Bytes={size}")
+        return bar_set
+
+    def _write(self, frames: Dict[str, pd.DataFrame]) -> None:
+        raw = self.manifest.to_json()
+        np.ndarray(1, dtype="<u8", buffer=self.buffer)[0] = len(raw)
+        header = np.ndarray(
+            len(raw), dtype=np.uint8, buffer=self.buffer, offset=HEADER_SIZE
+        )
+        header[:] = np.frombuffer(raw, dtype=np.uint8)
+
+        views = self._views(writeable=True)
+        for symbol_range, df in zip(self.manifest.symbols, frames.values()):
+            rows = slice(symbol_range.start, symbol_range.stop)
+            ts = df["ts"] if "ts" in df.columns else df.index
+            views["ts"][rows] = to_utc_nanos(ts)
+            for name, _, _ in self.manifest.columns[1:]:
+                views[name][rows] = df[name].to_numpy(dtype=np.float64)
+
+        if self.storage == BarSetStorage.MEMMAP:
+            self.handle.flush()
+
+    @classmethod
+    def attach(
+        cls, name: str, storage: Optional[BarSetStorage] = None
+    ) -> "SharedBarSet":
+        """
+        attach to the bar set created under name, a shared memory block name
+        or a memmap file path
+        """
+        storage = resolve_storage(storage, name)
+        if storage == BarSetStorage.SHARED_MEMORY:
+            if shared_memory is None:
+                raise BarSetException("shared memory bar sets require python >= 3.8")
+            handle = shared_memory.SharedMemory(name=name)
+            buffer = handle.buf
+        else:
+            if not os.path.exists(name):
+                raise BarSetException(f"{name} does not exist")
+            handle = np.memmap(name, dtype=np.uint8, mode="r")
+            buffer = handle
+
+        size = int(np.frombuffer(buffer, dtype="<u8", count=1)[0])
+        raw = bytes(buffer[HEADER_SIZE : HEADER_SIZE + size])
+        manifest = BarSetManifest.from_json(raw)
+        return cls(buffer, manifest, name, storage, handle)
+
+    def _views(self, writeable: bool = False) -> Dict[str, np.ndarray]:
+        views = {}
+        start = self._arrays_offset
+        for name, dtype, offset in self.manifest.columns:
+            view = np.ndarray(
+                self.manifest.length,
+                dtype=dtype,
+                buffer=self.buffer,
+                offset=start + offset,
+            )
+            view.flags.writeable = writeable
+            views[name] = view
+        return views
+
+    def symbols(self) -> List[str]:
+        return list(self._symbols.keys())
+
+    def symbol_range(self, symbol: str) -> SymbolRange:
+        if symbol not in self._symbols:
+            raise BarSetException(f"{symbol} is not in the bar set")
+        return self._symbols[symbol]
+
+    def arrays(self, symbol: str) -> Dict[str, np.ndarray]:
+        """
+        read only, zero copy views of symbol's columns, ts as int64 UTC nanos
+        """
+        symbol_range = self.symbol_range(symbol)
+        rows = slice(symbol_range.start, symbol_range.stop)
+        return {name: values[rows] for name, values in self._views().items()}
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        """
+        symbol's bars as a frame with a ts column, in the ts tz they were
+        written with. Unlike arrays, this copies the rows.
+        """
+        symbol_range = self.symbol_range(symbol)
+        arrays = self.arrays(symbol)
+        ts = pd.DatetimeIndex(arrays.pop("ts"), tz="UTC")
+        if symbol_range.tz is None:
+            ts = ts.tz_localize(None)
+        else:
+            ts = ts.tz_convert(symbol_range.tz)
+
+        df = pd.DataFrame(arrays)
+        df.insert(0, "ts", ts)
+        return df
+
+    def close(self) -> None:
+        """
+        detach, the owner also removes the block and this process' attachment
+        from attach_bar_set. Views from arrays must be released first.
+        """
+        if self.owner:
+            attached = _attached.pop((self.name, self.storage), None)
+            if attached is not None and attached is not self:
+                attached.close()
+
+        self.buffer = None
+        if self.storage == BarSetStorage.SHARED_MEMORY:
+            self.handle.close()
+            if self.owner:
+                self.handle.unlink()
+        else:
+            self.handle = None
+            if self.owner:
+                os.remove(self.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# bar sets attached by this process, by (name, storage)
+_attached: Dict[Tuple[str, BarSetStorage], SharedBarSet] = {}
+
+
+def attach_bar_set(name: str, storage: Optional[BarSetStorage] = None) -> SharedBarSet:
+    """
+    SharedBarSet.attach, once per process. Executor tasks can carry just the
+    bar set name and call this on every task.
+    """
+    storage = resolve_storage(storage, name)
+    key = (name, storage)
+    bar_set = _attached.get(key)
+    if bar_set is not None and storage == BarSetStorage.MEMMAP:
+        # the file was removed, maybe re-created, since it was attached
+        if not os.path.exists(name) or os.stat(name).st_ino != bar_set.inode:
+            del _attached[key]
+            bar_set = None
+
+    if bar_set is None:
+        bar_set = _attached[key] = SharedBarSet.attach(name, storage)
+    return bar_set
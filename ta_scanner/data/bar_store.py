@@ -0,0 +1,185 @@
+import os
+import datetime
+from enum import Enum
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+from loguru import logger
+from trading_calendars import TradingCalendar
+from typing import List, Optional, Set
+
+from ta_scanner.data.base_connector import DataFetcherBase
+from ta_scanner.data.constants import TimezoneNames
+from ta_scanner.data.sessions import session_dates
+
+
+class StoreFormat(Enum):
+    ARROW = "arrow"
+    PARQUET = "parquet"
+
+
+FLOAT_COLUMNS = ["open", "high", "low", "close", "average"]
+INT_COLUMNS = ["volume", "bar_count"]
+STORE_COLUMNS = ["ts", "symbol"] + FLOAT_COLUMNS + INT_COLUMNS + ["rth"]
+
+DATE_PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+class LocalBarStore(DataFetcherBase):
+    """Local columnar cache of bars
+
+    Bars are kept in one file per symbol and date, laid out as
+    root_path/<symbol>/date=<YYYY-MM-DD>/bars.<format>. Prices are stored as
+    float64. Reads filter on the date partition, so only the files in the
+    requested range are opened, and Arrow IPC files are memory mapped.
+
+    Dates are the US/Eastern date of the bar, same as the postgres queries,
+    so a futures session that opens the evening before spans two dates.
+    Writes merge into the dates already stored.
+
+    Args:
+        root_path (str): directory holding the store
+        store_format (StoreFormat): arrow (default) or parquet files
+    """
+
+    def __init__(self, root_path: str, store_format: StoreFormat = StoreFormat.ARROW):
+        self.root_path = root_path
+        self.store_format = store_format
+
+    def _symbol_path(self, symbol: str) -> str:
+        return os.path.join(self.root_path, symbol.replace("/", ""))
+
+    def _dataset(self, symbol: str) -> Optional[ds.Dataset]:
+        path = self._symbol_path(symbol)
+        if not os.path.isdir(path):
+            return None
+
+        file_format = "ipc" if self.store_format == StoreFormat.ARROW else "parquet"
+        return ds.dataset(
+            path,
+            format=file_format,
+            partitioning=DATE_PARTITIONING,
+            filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True),
+        )
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        write bars into the store, merged into the symbol/dates already
+        there. Bars with the same ts as stored ones replace them.
+        """
+        columns = [c for c in STORE_COLUMNS if c in df.columns]
+        df = df[columns].copy()
+        df["ts"] = pd.to_datetime(df["ts"], utc=True)
+        for c in FLOAT_COLUMNS:
+            if c in df.columns:
+                df[c] = df[c].astype(np.float64)
+        for c in INT_COLUMNS:
+            if c in df.columns:
+                df[c] = df[c].astype("Int64")
+
+        dates = df["ts"].dt.tz_convert(TimezoneNames.US_EASTERN.value).dt.date
+        extension = self.store_format.value
+
+        for (symbol, date), day_df in df.groupby([df["symbol"], dates]):
+            day_path = os.path.join(self._symbol_path(symbol), f"date={date}")
+            os.makedirs(day_path, exist_ok=True)
+            file_path = os.path.join(day_path, f"bars.{extension}")
+
+            if os.path.exists(file_path):
+                day_df = pd.concat([self._read_file(file_path), day_df])
+                day_df = day_df.drop_duplicates(subset=["ts"], keep="last")
+
+            table = pa.Table.from_pandas(day_df.sort_values("ts"), preserve_index=False)
+            # write next to the file and rename, readers may have it memory
+            # mapped. Datasets skip the dot prefixed temp file.
+            tmp_path = os.path.join(day_path, f".bars.{extension}.tmp")
+            if self.store_format == StoreFormat.ARROW:
+                with pa.ipc.new_file(tmp_path, table.schema) as writer:
+                    writer.write_table(table)
+            else:
+                pq.write_table(table, tmp_path)
+            os.replace(tmp_path, file_path)
+
+            logger.debug(f"Stored {symbol} - {date}. Rows={table.num_rows}")
+
+    def _read_file(self, file_path: str) -> pd.DataFrame:
+        if self.store_format == StoreFormat.ARROW:
+            with pa.OSFile(file_path, "rb") as f:
+                table = pa.ipc.open_file(f).read_all()
+        else:
+            table = pq.read_table(file_path)
+        return table.to_pandas()
+
+    def dates_between(
+        self,
+        symbol: str,
+        sd: datetime.date,
+        ed: datetime.date,
+        calendar: Optional[TradingCalendar] = None,
+    ) -> Set[datetime.date]:
+        """
+        return the dates between sd and ed that are in the store. With a
+        calendar, return the session dates with bars inside the session
+        instead, so the evening bars of the next session don't count for
+        their own date.
+        """
+        dataset = self._dataset(symbol)
+        if dataset is None:
+            return set()
+
+        if calendar is not None:
+            # a session's bars can start on the date before it
+            previous = sd - datetime.timedelta(days=1)
+            ts = self.read_between(symbol, previous, ed, columns=["ts"]).ts
+            return {d for d in session_dates(ts, calendar) if sd <= d <= ed}
+
+        dates = set()
+        for fragment in dataset.get_fragments(filter=self._date_filter(sd, ed)):
+            # .../date=YYYY-MM-DD/bars.arrow
+            partition = os.path.basename(os.path.dirname(fragment.path))
+            dates.add(datetime.date.fromisoformat(partition.split("=")[1]))
+        return dates
+
+    def read_between(
+        self,
+        symbol: str,
+        sd: datetime.date,
+        ed: datetime.date,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        return the bars between sd and ed, inclusive, sorted by ts
+        """
+        dataset = self._dataset(symbol)
+        if dataset is None:
+            return pd.DataFrame(columns=columns or STORE_COLUMNS)
+
+        columns = columns or [c for c in STORE_COLUMNS if c in dataset.schema.names]
+        table = dataset.to_table(columns=columns, filter=self._date_filter(sd, ed))
+        if table.num_rows == 0:
+            return pd.DataFrame(columns=columns)
+
+        df = table.to_pandas()
+        if "ts" in df.columns:
+            df.sort_values(by=["ts"], inplace=True)
+            df.reset_index(drop=True, inplace=True)
+        return df
+
+    def _date_filter(self, sd: datetime.date, ed: datetime.date) -> ds.Expression:
+        return (ds.field("date") >= sd.isoformat()) & (
+            ds.field("date") <= ed.isoformat()
+        )
+
+    def request_instrument(
+        self, symbol: str, dt: datetime.date, what_to_show: str
+    ) -> Optional[pd.DataFrame]:
+        """
+        DataFetcherBase interface, return the stored bars for one date
+        """
+        df = self.read_between(symbol, dt, dt)
+        if df.empty:
+            return None
+        return df
@@ -2,4 +2,10 @@ from abc import ABCMeta, abstractmethod
 
 # python3
 class DataFetcherBase(object, metaclass=ABCMeta):
-    pass
+    def request_instruments(self, symbol, dts, what_to_show):
+        """
+        yield (date, bars) for each date in dts, one request at a time.
+        Fetchers that can request dates concurrently override this.
+        """
+        for dt in dts:
+            yield dt, self.request_instrument(symbol, dt, what_to_show)
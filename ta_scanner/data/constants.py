@@ -1,6 +1,14 @@
+import datetime
+import threading
+import pandas as pd
 from enum import Enum
+from loguru import logger
 from trading_calendars import get_calendar, TradingCalendar
-from typing import Dict
+from trading_calendars.exchange_calendar_cmes import CMESExchangeCalendar
+from trading_calendars.exchange_calendar_iepa import IEPAExchangeCalendar
+from trading_calendars.exchange_calendar_xcbf import XCBFExchangeCalendar
+from trading_calendars.exchange_calendar_xnys import XNYSExchangeCalendar
+from typing import Callable, Dict, Optional, Tuple
 
 
 class TimezoneNames(Enum):
@@ -28,6 +36,13 @@ class WhatToShow(Enum):
     YIELD_LAST = "YIELD_LAST"
 
 
+class RthSource(Enum):
+    # request useRTH=True and useRTH=False bars separately
+    REQUEST = "request"
+    # request the full session once and tag rth from the trading calendar
+    CALENDAR = "calendar"
+
+
 class Exchange(Enum):
     SMART = "SMART"
     NYSE = "NYSE"
@@ -85,20 +100,108 @@ class Calendar(Enum):
 
     @staticmethod
     def select_exchange_by_symbol(symbol: str):
-        for k, v in Calendar.futures_lookup_hash().items():
-            if symbol in v:
-                return k
+        if symbol in SYMBOL_CALENDARS:
+            return SYMBOL_CALENDARS[symbol]
         logger.warning(f"Did not find a calendar entry for symbol={symbol}")
         return Calendar.DEFAULT
 
     @staticmethod
-    def init_by_symbol(symbol: str) -> TradingCalendar:
+    def init_by_symbol(
+        symbol: str,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> TradingCalendar:
+        """
+        the symbol's calendar from calendar_registry. Pass start and end to
+        only build the sessions around those dates.
+        """
         if "/" in symbol:
             key = Calendar.select_exchange_by_symbol(symbol)
             name = key.value
         else:
             name = Calendar.NYSE.value
-        return get_calendar(name)
+        return calendar_registry.get(name, start, end)
+
+
+SYMBOL_CALENDARS: Dict[str, Calendar] = {
+    symbol: calendar
+    for calendar, symbols in Calendar.futures_lookup_hash().items()
+    for symbol in symbols
+}
+
+
+class CalendarRegistry:
+    """
+    Process wide cache of TradingCalendars.
+
+    trading_calendars builds every session from 1990 on for a default
+    calendar. The registry builds a calendar for a window of whole years
+    around the requested dates instead, and rebuilds it wider only when a
+    later request falls outside the window. Requests without dates, or for a
+    calendar without a registered factory, get the full default calendar.
+    """
+
+    # sessions can start the calendar day before, eg globex opens sunday
+    padding = datetime.timedelta(days=7)
+
+    def __init__(self):
+        # name -> (window start, window end, calendar)
+        self._calendars: Dict[str, Tuple] = {}
+        # name -> factory taking start and end
+        self._factories: Dict[str, Callable[..., TradingCalendar]] = {
+            Calendar.NYSE.value: XNYSExchangeCalendar,
+            Calendar.CME.value: CMESExchangeCalendar,
+            Calendar.CBOE.value: XCBFExchangeCalendar,
+            Calendar.ICE.value: IEPAExchangeCalendar,
+        }
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[..., TradingCalendar]) -> None:
+        """
+        build the calendar name with factory(start=..., end=...), eg a
+        TradingCalendar subclass
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._calendars.pop(name, None)
+
+    def get(
+        self,
+        name: str,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> TradingCalendar:
+        if start is None or end is None or name not in self._factories:
+            # trading_calendars caches the default calendars itself
+            return get_calendar(name)
+
+        window_start = pd.Timestamp(f"{(start - self.padding).year}-01-01", tz="UTC")
+        window_end = pd.Timestamp(f"{(end + self.padding).year}-12-31", tz="UTC")
+
+        with self._lock:
+            if name in self._calendars:
+                cached_start, cached_end, calendar = self._calendars[name]
+                if cached_start <= window_start and window_end <= cached_end:
+                    return calendar
+                window_start = min(window_start, cached_start)
+                window_end = max(window_end, cached_end)
+
+            calendar = self._build(name, window_start, window_end)
+            self._calendars[name] = (window_start, window_end, calendar)
+            return calendar
+
+    def _build(
+        self, name: str, start: pd.Timestamp, end: pd.Timestamp
+    ) -> TradingCalendar:
+        logger.debug(f"Building calendar {name} from {start.date()} to {end.date()}")
+        return self._factories[name](start=start, end=end)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._calendars = {}
+
+
+calendar_registry = CalendarRegistry()
 
 
 class Currency(Enum):
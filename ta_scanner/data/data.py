@@ -1,7 +1,9 @@
 from enum import Enum
 import pandas as pd
 import numpy as np
+import io
 import os
+import uuid
 from loguru import logger
 from psycopg2 import sql
 
@@ -9,11 +11,13 @@ import datetime
 import pytz
 from psycopg2.errors import UniqueViolation
 from sqlalchemy.exc import IntegrityError
-from trading_calendars import get_calendar, TradingCalendar
-from typing import Optional, Dict, Any, List, Tuple
+from trading_calendars import TradingCalendar
+from typing import Optional, Dict, Any, Iterator, List, Set, Tuple
 
-from ta_scanner.models import gen_engine, init_db, Quote
+from ta_scanner.models import gen_engine, init_db, Quote, PRICE_COLUMNS
+from ta_scanner.data.aggregation import BarAnchor, aggregate_bars_by_session
 from ta_scanner.data.base_connector import DataFetcherBase
+from ta_scanner.data.sessions import BAR_START_OFFSET, session_dates, tag_rth
 from ta_scanner.data.constants import (
     TimezoneNames,
     WhatToShow,
@@ -35,17 +39,26 @@ def load_and_cache(
 ) -> pd.DataFrame:
     """Fetch data from IB or postgres
 
+    Postgres is a read through cache. Trading sessions in the date range that
+    are already in postgres are not requested from the data_fetcher, and
+    non session days (weekends, holidays) are never requested.
+
+    A LocalBarStore passed as bar_store sits in front of postgres. Sessions
+    in the store are read from it, missing sessions are loaded through
+    postgres (or straight from the data_fetcher with use_db=False) and
+    written to the store.
+
     Args:
-        instrument_symbol (str): [description]
-        data_fetcher (DataFetcherBase): [description]
-        kwargs (Dict): [description]
+        instrument_symbol (str): symbol, eg "/ES" or "SPY"
+        data_fetcher (DataFetcherBase): fetcher used for sessions not cached
+        kwargs (Dict): start_date, end_date, use_rth, groupby_minutes,
+            return_tz, use_cache (defaults to True, False re-fetches every
+            session), bar_store, use_db (defaults to True) and bar_anchor
+            (defaults to BarAnchor.CLOCK, SESSION buckets on session opens)
 
     Returns:
-        pd.DataFrame: [description]
+        pd.DataFrame: bars for the date range
     """
-    engine = gen_engine()
-    init_db()
-
     # turn kwargs into variables
     start_date = extract_kwarg(kwargs, "start_date", None)
     end_date = extract_kwarg(kwargs, "end_date", None)
@@ -54,58 +67,171 @@ def load_and_cache(
     contract_date = extract_kwarg(kwargs, "contract_date")
     groupby_minutes = extract_kwarg(kwargs, "groupby_minutes", 1)
     return_tz = extract_kwarg(kwargs, "return_tz", TimezoneNames.US_EASTERN.value)
+    use_cache = extract_kwarg(kwargs, "use_cache", True)
+    bar_store = extract_kwarg(kwargs, "bar_store", None)
+    use_db = extract_kwarg(kwargs, "use_db", True)
+    bar_anchor = extract_kwarg(kwargs, "bar_anchor", BarAnchor.CLOCK)
+
+    calendar = Calendar.init_by_symbol(instrument_symbol, start_date, end_date)
+    sessions = gen_session_range(calendar, start_date, end_date)
+
+    if bar_store is None:
+        df = load_sessions_from_db(
+            instrument_symbol,
+            data_fetcher,
+            calendar,
+            sessions,
+            start_date,
+            end_date,
+            use_cache=use_cache,
+        )
+    else:
+        df = load_sessions_from_store(
+            instrument_symbol,
+            data_fetcher,
+            calendar,
+            sessions,
+            start_date,
+            end_date,
+            bar_store,
+            use_cache=use_cache,
+            use_db=use_db,
+        )
+
+    if use_rth:
+        fill_missing_rth(df, calendar)
+        df = reduce_to_only_rth(df)
+
+    transform_set_index_ts(df)
+
+    if bar_anchor == BarAnchor.SESSION:
+        df = aggregate_bars(df, groupby_minutes, calendar)
+    else:
+        df = aggregate_bars(df, groupby_minutes)
+    transform_ts_result_tz(df, return_tz)
 
-    what_to_show = WhatToShow.TRADES.value
+    logger.debug(f"finished {instrument_symbol}")
+
+    df.sort_values(by=["ts"], inplace=True, ascending=True)
+    df.reset_index(inplace=True)
+    return df
 
-    # this is temp - start
-    dfs = []
-    # temp - stop
 
-    calendar = Calendar.init_by_symbol(instrument_symbol)
+def fetch_session(
+    instrument_symbol: str, data_fetcher: DataFetcherBase, dt: datetime.date
+) -> Optional[pd.DataFrame]:
+    what_to_show = WhatToShow.TRADES.value
+    df = data_fetcher.request_instrument(instrument_symbol, dt, what_to_show)
+    return prepare_session(instrument_symbol, df, dt)
 
-    for dt in gen_datetime_range(start_date, end_date):
-        # if market was closed - skip
-        # if calendar.is_session(dt.date()) == False:
-        #     logger.debug(f"Market closed on {dt.date()} for {instrument_symbol}")
 
-        # if db already has values - skip
-        # if db_data_exists(engine, instrument_symbol, dt):
-        #     df = db_data_fetch(engine, instrument_symbol, dt)
-        # else:
-        if True:
-            df = data_fetcher.request_instrument(instrument_symbol, dt, what_to_show)
+def fetch_sessions(
+    instrument_symbol: str, data_fetcher: DataFetcherBase, dts: List[datetime.date]
+) -> Iterator[Tuple[datetime.date, Optional[pd.DataFrame]]]:
+    """
+    fetch many sessions through data_fetcher.request_instruments, yielding
+    (date, bars) as each one arrives. Concurrent fetchers return them in
+    completion order, not date order.
+    """
+    what_to_show = WhatToShow.TRADES.value
+    results = data_fetcher.request_instruments(instrument_symbol, dts, what_to_show)
+    for dt, df in results:
+        yield dt, prepare_session(instrument_symbol, df, dt)
 
-            if df is None:
-                continue
 
-            df["symbol"] = instrument_symbol
-            transform_rename_df_columns(df)
-            # convert time from UTC to US/Eastern
-            # df["ts"] = df["ts"].dt.tz_convert(TimezoneNames.UTC.value)
-            # df["ts"] = df["ts"].dt.tz_localize(TimezoneNames.US_EASTERN.value)
-            # apply_rth(df, calendar)
-            db_insert_df_conflict_on_do_nothing(engine, df, "quote")
+def prepare_session(
+    instrument_symbol: str, df: Optional[pd.DataFrame], dt: datetime.date
+) -> Optional[pd.DataFrame]:
+    if df is None:
+        return None
 
-        if use_rth:
-            df = reduce_to_only_rth(df)
+    df["symbol"] = instrument_symbol
+    transform_rename_df_columns(df)
+    # convert time from UTC to US/Eastern
+    # df["ts"] = df["ts"].dt.tz_convert(TimezoneNames.UTC.value)
+    # df["ts"] = df["ts"].dt.tz_localize(TimezoneNames.US_EASTERN.value)
+    # apply_rth(df, calendar)
 
-        transform_set_index_ts(df)
+    logger.debug(f"--- fetched {instrument_symbol} - {dt}")
+    return df
 
-        df = aggregate_bars(df, groupby_minutes)
-        transform_ts_result_tz(df, return_tz)
 
-        logger.debug(f"--- fetched {instrument_symbol} - {dt}")
+def is_cached(dt: datetime.date, cached_dates: Set[datetime.date]) -> bool:
+    # today's session may still be in progress, so it's never cached
+    return dt in cached_dates and dt < datetime.date.today()
 
-        # temp - start
-        dfs.append(df)
-        # temp - stop
 
-    logger.debug(f"finished {instrument_symbol}")
+def load_sessions_from_db(
+    instrument_symbol: str,
+    data_fetcher: DataFetcherBase,
+    calendar: TradingCalendar,
+    sessions: List[datetime.date],
+    sd: datetime.date,
+    ed: datetime.date,
+    use_cache: bool = True,
+) -> pd.DataFrame:
+    """
+    fetch the sessions missing from postgres into it, then read sd to ed
+    back with one query
+    """
+    engine = gen_engine()
+    init_db()
 
-    df = pd.concat(dfs)
-    df.sort_values(by=["ts"], inplace=True, ascending=True)
-    df.reset_index(inplace=True)
-    return df
+    if use_cache:
+        cached_dates = db_data_dates_between(
+            engine, instrument_symbol, calendar, sd, ed
+        )
+    else:
+        cached_dates = set()
+
+    missing = [dt for dt in sessions if not is_cached(dt, cached_dates)]
+    for dt, df in fetch_sessions(instrument_symbol, data_fetcher, missing):
+        if df is not None:
+            db_bulk_insert_df_conflict_on_do_nothing(engine, df, "quote")
+
+    return db_data_fetch_between(engine, instrument_symbol, sd, ed)
+
+
+def load_sessions_from_store(
+    instrument_symbol: str,
+    data_fetcher: DataFetcherBase,
+    calendar: TradingCalendar,
+    sessions: List[datetime.date],
+    sd: datetime.date,
+    ed: datetime.date,
+    bar_store,
+    use_cache: bool = True,
+    use_db: bool = True,
+) -> pd.DataFrame:
+    """
+    load the sessions missing from bar_store, through postgres when use_db,
+    write them to the store, then read sd to ed from the store
+    """
+    if use_cache:
+        cached_dates = bar_store.dates_between(instrument_symbol, sd, ed, calendar)
+    else:
+        cached_dates = set()
+
+    missing = [dt for dt in sessions if not is_cached(dt, cached_dates)]
+
+    if missing and use_db:
+        df = load_sessions_from_db(
+            instrument_symbol,
+            data_fetcher,
+            calendar,
+            missing,
+            missing[0],
+            missing[-1],
+            use_cache=use_cache,
+        )
+        bar_store.write(df)
+    elif missing:
+        results = fetch_sessions(instrument_symbol, data_fetcher, missing)
+        dfs = [df for dt, df in results if df is not None]
+        if dfs:
+            bar_store.write(pd.concat(dfs))
+
+    return bar_store.read_between(instrument_symbol, sd, ed)
 
 
 def gen_datetime_range(start, end) -> List[datetime.datetime]:
@@ -117,24 +243,62 @@ def gen_datetime_range(start, end) -> List[datetime.datetime]:
     return result
 
 
+def gen_session_range(
+    calendar: TradingCalendar, start: datetime.date, end: datetime.date
+) -> List[datetime.date]:
+    """
+    return the trading session dates between start and end, inclusive
+    """
+    sessions = calendar.sessions_in_range(
+        pd.Timestamp(start, tz=TimezoneNames.UTC.value),
+        pd.Timestamp(end, tz=TimezoneNames.UTC.value),
+    )
+    return [session.date() for session in sessions]
+
+
 def reduce_to_only_rth(df) -> pd.DataFrame:
     return df[df["rth"] == True]
 
 
-def apply_rth(df: pd.DataFrame, calendar: TradingCalendar) -> None:
-    calendar_name: str = "XNYS"
-    calendar = get_calendar(calendar_name)
+def apply_rth(
+    df: pd.DataFrame, calendar: TradingCalendar, offset: pd.Timedelta = pd.Timedelta(0)
+) -> None:
+    """
+    tag df.rth with calendar.is_open_on_minute(ts + offset), vectorized
+    """
+    df["rth"] = tag_rth(df.ts, calendar, offset)
+
 
-    def is_open(ts: pd.Timestamp):
-        return calendar.is_open_on_minute(ts)
+def fill_missing_rth(df: pd.DataFrame, calendar: TradingCalendar) -> None:
+    """
+    tag the bars without an rth value from the calendar, bars are labelled
+    by their start minute like IB's
+    """
+    if "rth" not in df.columns:
+        df["rth"] = None
 
-    df["rth"] = df.ts.apply(is_open)
+    missing = df["rth"].isnull().to_numpy()
+    if missing.any():
+        tagged = tag_rth(df.ts[missing], calendar, BAR_START_OFFSET)
+        df["rth"] = df["rth"].astype(object)
+        df.loc[missing, "rth"] = tagged
 
 
-def aggregate_bars(df: pd.DataFrame, groupby_minutes: int) -> pd.DataFrame:
+def aggregate_bars(
+    df: pd.DataFrame,
+    groupby_minutes: int,
+    calendar: Optional[TradingCalendar] = None,
+) -> pd.DataFrame:
+    """
+    resample bars indexed by ts to groupby_minutes. With a calendar the
+    buckets are anchored on its session opens, see aggregate_bars_by_session.
+    """
     if groupby_minutes == 1:
         return df
 
+    if calendar is not None:
+        return aggregate_bars_by_session(df, groupby_minutes, calendar)
+
     # this method only intended to handle data that's
     # aggredating data at intervals less than 1 day
     assert groupby_minutes < 1440
@@ -187,13 +351,63 @@ def db_data_exists(engine, instrument_symbol: str, date: datetime.datetime) -> b
     return counts != [(0,)]
 
 
+def db_data_dates_between(
+    engine,
+    instrument_symbol: str,
+    calendar: TradingCalendar,
+    sd: datetime.date,
+    ed: datetime.date,
+) -> Set[datetime.date]:
+    """
+    return the calendar's session dates between sd and ed that have at least
+    one quote inside the session. A futures session starts the evening
+    before, so those bars count for the next day's session, not their own
+    date.
+    """
+    sessions = calendar.sessions_in_range(
+        pd.Timestamp(sd, tz=TimezoneNames.UTC.value),
+        pd.Timestamp(ed, tz=TimezoneNames.UTC.value),
+    )
+    if len(sessions) == 0:
+        return set()
+
+    session_open = calendar.session_open(sessions[0])
+    session_close = calendar.session_close(sessions[-1])
+
+    query = f"""
+        select distinct date_trunc('minute', ts)
+        from {Quote.__tablename__}
+        where
+            symbol = '{instrument_symbol}'
+            and ts >= '{session_open - BAR_START_OFFSET}'
+            and ts <= '{session_close}'
+    """
+    with engine.connect() as con:
+        result = con.execute(clean_query(query))
+        ts = pd.to_datetime([x[0] for x in result], utc=True)
+
+    return session_dates(ts, calendar, BAR_START_OFFSET)
+
+
+def gen_quote_select() -> str:
+    """
+    select list for the quote table with the price columns cast to float8, so
+    reads return floats whether the table stores numeric or double precision
+    """
+    columns = [
+        f"{c.name}::float8 as {c.name}" if c.name in PRICE_COLUMNS else c.name
+        for c in Quote.__table__.columns
+    ]
+    return ", ".join(columns)
+
+
 def db_data_fetch(
     engine, instrument_symbol: str, date: datetime.datetime
 ) -> pd.DataFrame:
     date_str: str = date.strftime("%Y-%m-%d")
 
     query = f"""
-        select *
+        select {gen_quote_select()}
         from {Quote.__tablename__}
         where
             symbol = '{instrument_symbol}'
@@ -209,7 +423,7 @@ def db_data_fetch_between(
     ed_str: str = ed.strftime("%Y-%m-%d")
 
     query = f"""
-        select *
+        select {gen_quote_select()}
         from {Quote.__tablename__}
         where
             symbol = '{instrument_symbol}'
@@ -218,6 +432,111 @@ def db_data_fetch_between(
     return pd.read_sql(clean_query(query), con=engine)
 
 
+QUOTE_ARRAY_FLOAT_COLUMNS = PRICE_COLUMNS + ["volume", "bar_count"]
+
+
+def gen_quote_arrays_query(
+    instrument_symbol: str, sd: datetime.date, ed: datetime.date
+) -> str:
+    select = ", ".join(
+        ["(extract(epoch from ts) * 1000000)::bigint"]
+        + [f"{c}::float8" for c in QUOTE_ARRAY_FLOAT_COLUMNS]
+        + ["coalesce(rth, false)"]
+    )
+    query = f"""
+        select {select}
+        from {Quote.__tablename__}
+        where
+            symbol = '{instrument_symbol}'
+            and date(ts AT TIME ZONE '{TimezoneNames.US_EASTERN.value}') BETWEEN date('{sd}') AND date('{ed}')
+        order by ts
+    """
+    return clean_query(query)
+
+
+def gen_quote_arrays(rows: List[tuple]) -> Dict[str, np.ndarray]:
+    """
+    numpy columns from rows of the gen_quote_arrays_query select
+    """
+    width = len(QUOTE_ARRAY_FLOAT_COLUMNS) + 2
+    values = list(zip(*rows)) or [[] for _ in range(width)]
+
+    arrays = {}
+    ts = np.array(values[0], dtype=np.int64).astype("datetime64[us]")
+    arrays["ts"] = ts.astype("datetime64[ns]")
+    for c, v in zip(QUOTE_ARRAY_FLOAT_COLUMNS, values[1:]):
+        # None becomes nan
+        arrays[c] = np.array(v, dtype=np.float64)
+    arrays["rth"] = np.array(values[-1], dtype=bool)
+    return arrays
+
+
+def db_data_fetch_between_arrays(
+    engine, instrument_symbol: str, sd: datetime.date, ed: datetime.date
+) -> Dict[str, np.ndarray]:
+    """Fetch quotes between sd and ed as numpy columns, ordered by ts
+
+    Prices come back as contiguous float64 arrays, volume and bar_count as
+    float64 (NULL is NaN), rth as bool and ts as UTC datetime64[ns]. ts is
+    read as epoch microseconds, so no Decimal or datetime objects are built.
+
+    Args:
+        engine: sqlalchemy engine
+        instrument_symbol (str): symbol
+        sd (datetime.date): first US/Eastern date
+        ed (datetime.date): last US/Eastern date
+
+    Returns:
+        Dict[str, np.ndarray]: column name to values
+    """
+    query = gen_quote_arrays_query(instrument_symbol, sd, ed)
+    with engine.connect() as con:
+        with con.connection.cursor() as cur:
+            cur.execute(query)
+            rows = cur.fetchall()
+
+    return gen_quote_arrays(rows)
+
+
+def db_data_stream_between(
+    engine,
+    instrument_symbol: str,
+    sd: datetime.date,
+    ed: datetime.date,
+    chunk_size: int = 100_000,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Stream quotes between sd and ed as chunks of numpy columns, in ts order
+
+    Same columns as db_data_fetch_between_arrays, read through a named (server
+    side) cursor, so postgres holds the result and only chunk_size rows are
+    in memory at a time, whatever the date range. Feed the chunks to a
+    StreamingAggregator and the indicators' update_chunk to keep the whole
+    pipeline bounded.
+
+    Args:
+        engine: sqlalchemy engine
+        instrument_symbol (str): symbol
+        sd (datetime.date): first US/Eastern date
+        ed (datetime.date): last US/Eastern date
+        chunk_size (int): rows per chunk, the last chunk may be shorter
+
+    Yields:
+        Dict[str, np.ndarray]: column name to values
+    """
+    query = gen_quote_arrays_query(instrument_symbol, sd, ed)
+    cursor_name = f"quote_stream_{uuid.uuid4().hex}"
+
+    with engine.connect() as con:
+        with con.connection.cursor(name=cursor_name) as cur:
+            cur.itersize = chunk_size
+            cur.execute(query)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield gen_quote_arrays(rows)
+
+
 def db_insert_df_conflict_on_do_nothing(
     engine, df: pd.DataFrame, table_name: str
 ) -> None:
@@ -246,6 +565,77 @@ def db_insert_df_conflict_on_do_nothing(
                     con.connection.commit()
 
 
+def db_bulk_insert_df_conflict_on_do_nothing(
+    engine, df: pd.DataFrame, table_name: str, batch_size: int = 50000
+) -> Tuple[int, int]:
+    """Insert df rows, skipping rows that conflict on (symbol, ts)
+
+    Each batch is streamed with COPY into a temporary staging table and then
+    moved into table_name with one INSERT ... SELECT ... ON CONFLICT DO
+    NOTHING, committing once per batch.
+
+    Args:
+        engine: sqlalchemy engine
+        df (pd.DataFrame): rows to insert, columns named as the table columns
+        table_name (str): table to insert into
+        batch_size (int): rows per COPY and commit
+
+    Returns:
+        Tuple[int, int]: count of rows inserted and rows skipped
+    """
+    cols = __gen_cols(df)
+    staging_name = f"{table_name}_staging"
+
+    create_template = (
+        "CREATE TEMP TABLE {staging} (LIKE {table_name} INCLUDING DEFAULTS) "
+        "ON COMMIT DROP;"
+    )
+    copy_template = "COPY {staging} ({cols}) FROM STDIN WITH (FORMAT csv);"
+    insert_template = (
+        "INSERT INTO {table_name} ({cols}) SELECT {cols} FROM {staging} "
+        "ON CONFLICT (symbol, ts) DO NOTHING;"
+    )
+
+    format_args = dict(
+        table_name=sql.Identifier(table_name),
+        staging=sql.Identifier(staging_name),
+        cols=sql.SQL(", ").join(map(sql.Identifier, cols)),
+    )
+    create_query = sql.SQL(create_template).format(**format_args)
+    copy_query = sql.SQL(copy_template).format(**format_args)
+    insert_query = sql.SQL(insert_template).format(**format_args)
+
+    inserted = 0
+    with engine.connect() as con:
+        with con.connection.cursor() as cur:
+            for start in range(0, len(df.index), batch_size):
+                batch = df.iloc[start : start + batch_size]
+                try:
+                    cur.execute(create_query)
+                    cur.copy_expert(copy_query.as_string(cur), __gen_csv_buffer(batch))
+                    cur.execute(insert_query)
+                    inserted += cur.rowcount
+                    con.connection.commit()
+                except Exception:
+                    con.connection.rollback()
+                    raise
+
+    skipped = len(df.index) - inserted
+    logger.debug(f"{table_name}: inserted={inserted}. skipped={skipped}")
+    return inserted, skipped
+
+
+def __gen_csv_buffer(df: pd.DataFrame) -> io.StringIO:
+    """
+    return the df values as a csv buffer for COPY. Missing values are empty
+    fields, which COPY reads as NULL
+    """
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    return buffer
+
+
 def __gen_values(df: pd.DataFrame) -> List[Tuple[str]]:
     """
     return array of tuples for the df values
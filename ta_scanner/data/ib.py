@@ -1,9 +1,12 @@
+import asyncio
 import pandas as pd
+import time
 from loguru import logger
 
 import datetime
 from trading_calendars import get_calendar, TradingCalendar
 from typing import Optional, Dict, Any, List, Tuple, Optional
+from typing import AsyncIterator, Callable, Iterator
 
 from ib_insync import IB, Future, ContFuture, Stock, Contract
 from ib_insync import util as ib_insync_util
@@ -15,19 +18,88 @@ from ta_scanner.data.constants import (
     Exchange,
     Calendar,
     Currency,
+    RthSource,
 )
+from ta_scanner.data.sessions import BAR_START_OFFSET, tag_rth
+
+
+class TokenBucket:
+    """
+    asyncio token bucket, holds up to capacity tokens and refills them evenly
+    over period seconds. acquire() waits until a token is available.
+    """
+
+    def __init__(
+        self, capacity: int, period: float, clock: Callable[[], float] = time.monotonic
+    ):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
 
 
 class IbDataFetcher(DataFetcherBase):
-    def __init__(self, client_id: int = 0):
+    """
+    Historical bars from IB.
+
+    request_instrument makes blocking requests for one date. request_instruments
+    and request_instruments_async fetch many dates concurrently, with at most
+    max_in_flight requests outstanding and new requests paced by a token
+    bucket, by default 5 per 2 seconds to stay under IB's limit of 6 requests
+    for the same contract within 2 seconds.
+
+    With rth_source=RthSource.CALENDAR each date is one request for the full
+    session, and rth is tagged from the symbol's trading calendar instead of
+    making a second useRTH=True request.
+
+    Args:
+        client_id (int): IB client id
+        max_in_flight (int): concurrent historical data requests
+        pacing_requests (int): requests allowed per pacing_seconds
+        pacing_seconds (float): pacing window
+        rth_source (RthSource): how bars are tagged rth, defaults to REQUEST
+    """
+
+    def __init__(
+        self,
+        client_id: int = 0,
+        max_in_flight: int = 6,
+        pacing_requests: int = 5,
+        pacing_seconds: float = 2.0,
+        rth_source: RthSource = RthSource.REQUEST,
+    ):
         self.ib = None
         self.client_id = client_id
+        self.max_in_flight = max_in_flight
+        self.pacing = TokenBucket(pacing_requests, pacing_seconds)
+        self.rth_source = rth_source
 
     def _init_client(self, host: str = "127.0.0.1", port: int = 4001) -> None:
         ib = IB()
         ib.connect(host, port, clientId=self.client_id)
         self.ib = ib
 
+    async def _init_client_async(
+        self, host: str = "127.0.0.1", port: int = 4001
+    ) -> None:
+        ib = IB()
+        await ib.connectAsync(host, port, clientId=self.client_id)
+        self.ib = ib
+
     def _execute_req_historical(
         self, contract, dt, duration, bar_size_setting, what_to_show, use_rth
     ) -> pd.DataFrame:
@@ -35,7 +107,7 @@ class IbDataFetcher(DataFetcherBase):
             self._init_client()
 
         dfs = []
-        for rth in [True, False]:
+        for rth in self._rth_requests():
             bars = self.ib.reqHistoricalData(
                 contract,
                 endDateTime=dt,
@@ -51,23 +123,74 @@ class IbDataFetcher(DataFetcherBase):
             x["rth"] = rth
             dfs.append(x)
 
+        return self._concat_bars(dfs, contract)
+
+    async def _execute_req_historical_async(
+        self,
+        contract,
+        dt,
+        duration,
+        bar_size_setting,
+        what_to_show,
+        in_flight: asyncio.Semaphore,
+    ) -> Optional[pd.DataFrame]:
+        async def req_historical(rth: bool) -> Optional[pd.DataFrame]:
+            async with in_flight:
+                await self.pacing.acquire()
+                bars = await self.ib.reqHistoricalDataAsync(
+                    contract,
+                    endDateTime=dt,
+                    durationStr=duration,
+                    barSizeSetting=bar_size_setting,
+                    whatToShow=what_to_show,
+                    useRTH=rth,
+                    formatDate=2,  # return as UTC time
+                )
+            x = ib_insync_util.df(bars)
+            if x is not None:
+                x["rth"] = rth
+            return x
+
+        dfs = await asyncio.gather(*[req_historical(x) for x in self._rth_requests()])
+        return self._concat_bars([x for x in dfs if x is not None], contract)
+
+    def _rth_requests(self) -> List[bool]:
+        if self.rth_source == RthSource.CALENDAR:
+            return [False]
+        return [True, False]
+
+    def _concat_bars(
+        self, dfs: List[pd.DataFrame], contract: Contract
+    ) -> Optional[pd.DataFrame]:
         if dfs == []:
             return None
+
+        if self.rth_source == RthSource.CALENDAR:
+            df = dfs[0]
+            dates = df["date"].dt.date
+            calendar = Calendar.init_by_symbol(
+                contract.symbol, dates.min(), dates.max()
+            )
+            df["rth"] = tag_rth(df["date"], calendar, BAR_START_OFFSET)
+            return df
+
         df = pd.concat(dfs).drop_duplicates().reset_index(drop=True)
         return df
 
     def request_stock_instrument(
         self, instrument_symbol: str, dt: datetime.datetime, what_to_show: str
     ) -> pd.DataFrame:
-        exchange = Exchange.SMART.value
-        contract = Stock(instrument_symbol, exchange, Currency.USD.value)
-        duration = "2 D"
-        bar_size_setting = "1 min"
+        contract, duration, bar_size_setting = self.gen_stock_request(instrument_symbol)
         use_rth = False
         return self._execute_req_historical(
             contract, dt, duration, bar_size_setting, what_to_show, use_rth
         )
 
+    def gen_stock_request(self, instrument_symbol: str) -> Tuple[Contract, str, str]:
+        exchange = Exchange.SMART.value
+        contract = Stock(instrument_symbol, exchange, Currency.USD.value)
+        return contract, "2 D", "1 min"
+
     def select_exchange_by_symbol(self, symbol):
         kvs = {
             Exchange.GLOBEX: [
@@ -102,6 +225,17 @@ class IbDataFetcher(DataFetcherBase):
         what_to_show: str,
         contract_date: Optional[str] = None,
     ) -> pd.DataFrame:
+        contract, duration, bar_size_setting = self.gen_future_request(
+            symbol, contract_date
+        )
+        use_rth = False
+        return self._execute_req_historical(
+            contract, dt, duration, bar_size_setting, what_to_show, use_rth
+        )
+
+    def gen_future_request(
+        self, symbol: str, contract_date: Optional[str] = None
+    ) -> Tuple[Contract, str, str]:
         exchange_name = self.select_exchange_by_symbol(symbol).value
 
         if contract_date:
@@ -109,12 +243,7 @@ class IbDataFetcher(DataFetcherBase):
         else:
             contract = ContFuture(symbol, exchange_name, currency=Currency.USD.value)
 
-        duration = "1 D"
-        bar_size_setting = "1 min"
-        use_rth = False
-        return self._execute_req_historical(
-            contract, dt, duration, bar_size_setting, what_to_show, use_rth
-        )
+        return contract, "1 D", "1 min"
 
     def request_instrument(
         self,
@@ -129,3 +258,65 @@ class IbDataFetcher(DataFetcherBase):
             )
         else:
             return self.request_stock_instrument(symbol, dt, what_to_show)
+
+    async def request_instruments_async(
+        self,
+        symbol: str,
+        dts: List[datetime.date],
+        what_to_show: str,
+        contract_date: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[datetime.date, Optional[pd.DataFrame]]]:
+        """
+        request every date in dts concurrently and yield (date, bars) in the
+        order the requests complete. bars is None for dates without data.
+        """
+        if self.ib is None or not self.ib.isConnected():
+            await self._init_client_async()
+
+        if "/" in symbol:
+            request = self.gen_future_request(symbol, contract_date)
+        else:
+            request = self.gen_stock_request(symbol)
+        contract, duration, bar_size_setting = request
+
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+
+        async def fetch(dt: datetime.date):
+            df = await self._execute_req_historical_async(
+                contract, dt, duration, bar_size_setting, what_to_show, in_flight
+            )
+            logger.debug(f"Fetched {symbol} - {dt}")
+            return dt, df
+
+        tasks = [asyncio.ensure_future(fetch(dt)) for dt in dts]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield await completed
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def request_instruments(
+        self,
+        symbol: str,
+        dts: List[datetime.date],
+        what_to_show: str,
+        contract_date: Optional[str] = None,
+    ) -> Iterator[Tuple[datetime.date, Optional[pd.DataFrame]]]:
+        """
+        blocking version of request_instruments_async, runs ib_insync's event
+        loop and yields each date as it completes. When the caller stops early
+        or raises, the requests still in flight are cancelled.
+        """
+        loop = ib_insync_util.getLoop()
+        results = self.request_instruments_async(
+            symbol, dts, what_to_show, contract_date
+        )
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(results.aclose())
@@ -0,0 +1,105 @@
+import datetime
+import numpy as np
+import pandas as pd
+from trading_calendars import TradingCalendar
+from typing import Set, Tuple
+
+
+# IB bars are labelled by their start, trading_calendars minutes by their end
+BAR_START_OFFSET = pd.Timedelta(minutes=1)
+
+
+def to_utc_nanos(ts) -> np.ndarray:
+    """
+    int64 UTC nanoseconds for a timestamp column, naive timestamps are UTC
+    """
+    index = pd.DatetimeIndex(ts)
+    if index.tz is not None:
+        index = index.tz_convert("UTC")
+    return index.asi8
+
+
+def session_bounds(
+    calendar: TradingCalendar, start: int, end: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    open, break start, break end and close nanos of the calendar's sessions
+    that overlap the [start, end] nanos span. Break values are NaT (the
+    minimum int64) for sessions without a break.
+    """
+    opens = calendar.market_opens_nanos
+    closes = calendar.market_closes_nanos
+    lo = np.searchsorted(closes, start, side="left")
+    hi = np.searchsorted(opens, end, side="right")
+    return (
+        opens[lo:hi],
+        calendar.market_break_starts_nanos[lo:hi],
+        calendar.market_break_ends_nanos[lo:hi],
+        closes[lo:hi],
+    )
+
+
+def tag_rth(
+    ts, calendar: TradingCalendar, offset: pd.Timedelta = pd.Timedelta(0)
+) -> np.ndarray:
+    """
+    vectorized calendar.is_open_on_minute(t + offset) for every t in ts. The
+    session bounds for the span of ts are looked up once and each timestamp
+    is matched to its session with searchsorted.
+
+    Args:
+        ts: timestamps, naive timestamps are UTC
+        calendar (TradingCalendar): exchange calendar
+        offset (pd.Timedelta): added to each timestamp, BAR_START_OFFSET for
+            bars labelled by their start time
+
+    Returns:
+        np.ndarray: bool, True when the exchange is open
+    """
+    nanos = to_utc_nanos(ts) + offset.value
+    if len(nanos) == 0:
+        return np.zeros(0, dtype=bool)
+
+    opens, break_starts, break_ends, closes = session_bounds(
+        calendar, nanos.min(), nanos.max()
+    )
+    if len(opens) == 0:
+        return np.zeros(len(nanos), dtype=bool)
+
+    session = np.searchsorted(opens, nanos, side="right") - 1
+    after_open = session >= 0
+    session = np.maximum(session, 0)
+
+    in_break = (break_starts[session] <= nanos) & (nanos < break_ends[session])
+    return after_open & (nanos <= closes[session]) & ~in_break
+
+
+def session_dates(
+    ts, calendar: TradingCalendar, offset: pd.Timedelta = BAR_START_OFFSET
+) -> Set[datetime.date]:
+    """
+    the calendar's sessions, by session date, that hold at least one of the
+    timestamps. Futures bars from the evening before belong to the next day's
+    session, not to their calendar date. Timestamps outside every session
+    are ignored.
+
+    Args:
+        ts: timestamps, naive timestamps are UTC
+        calendar (TradingCalendar): exchange calendar
+        offset (pd.Timedelta): added to each timestamp, BAR_START_OFFSET for
+            bars labelled by their start time
+
+    Returns:
+        Set[datetime.date]: session dates
+    """
+    nanos = to_utc_nanos(ts) + offset.value
+    if len(nanos) == 0:
+        return set()
+
+    opens = calendar.market_opens_nanos
+    closes = calendar.market_closes_nanos
+    session = np.searchsorted(opens, nanos, side="right") - 1
+    inside = (session >= 0) & (nanos <= closes[np.maximum(session, 0)])
+
+    sessions = calendar.all_sessions[np.unique(session[inside])]
+    return {s.date() for s in sessions}
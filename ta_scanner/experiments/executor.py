@@ -0,0 +1,205 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from loguru import logger
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # python 3.7
+    shared_memory = None
+
+
+class ExecutorException(Exception):
+    pass
+
+
+class SharedArraysSpec(NamedTuple):
+    """
+    picklable description of a SharedArrays block: the block name and the
+    (name, dtype, shape, offset) of each array in it
+    """
+
+    block_name: str
+    layout: List[tuple]
+
+
+class SharedArrays:
+    """
+    numpy arrays copied once into a single shared memory block. Worker
+    processes attach to the block by name and get read only, zero copy views.
+
+    Example:
+        with SharedArrays({"close": close}) as shared:
+            spec = shared.spec
+            # in the worker
+            shm, arrays = SharedArrays.attach(spec)
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        if shared_memory is None:
+            raise ExecutorException("shared memory arrays require python >= 3.8")
+
+        layout, offset = [], 0
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            # keep every array 8 byte aligned
+            offset += -offset % 8
+            layout.append((name, values.dtype.str, values.shape, offset))
+            offset += values.nbytes
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self.spec = SharedArraysSpec(self.shm.name, layout)
+
+        for (name, dtype, shape, offset), values in zip(layout, arrays.values()):
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            view[...] = values
+
+    @staticmethod
+    def views(buffer, spec: SharedArraysSpec) -> Dict[str, np.ndarray]:
+        arrays = {}
+        for name, dtype, shape, offset in spec.layout:
+            view = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            view.flags.writeable = False
+            arrays[name] = view
+        return arrays
+
+    @staticmethod
+    def attach(spec: SharedArraysSpec):
+        shm = shared_memory.SharedMemory(name=spec.block_name)
+        return shm, SharedArrays.views(shm.buf, spec)
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# set once per worker process by _init_worker
+_worker_shm = None
+_worker_arrays: Dict[str, np.ndarray] = {}
+
+
+def _init_worker(
+    spec: Optional[SharedArraysSpec], arrays: Optional[Dict[str, np.ndarray]] = None
+) -> None:
+    global _worker_shm, _worker_arrays
+    if spec is None:
+        # python 3.7, the arrays were pickled once for this worker
+        _worker_arrays = arrays or {}
+        return
+    _worker_shm, _worker_arrays = SharedArrays.attach(spec)
+
+
+def _run_task(fn: Callable, task: Any) -> Any:
+    return fn(_worker_arrays, task)
+
+
+class ExperimentExecutor:
+    """
+    Run experiment tasks, eg grid cells or walk forward windows, across a
+    process pool. The base arrays are put in shared memory once and each
+    worker attaches to them when it starts, so the bars are never pickled
+    per task. Without shared memory, on python 3.7, each worker is sent its
+    own copy of the arrays once when it starts instead.
+
+    fn must be a module level function taking (arrays, task). Results are
+    yielded in task order as soon as each one, and every one before it, is
+    done.
+
+    Args:
+        max_workers (int): pool size, defaults to the number of cpus. With
+            max_workers=1 tasks run in the calling process.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def map(
+        self,
+        fn: Callable,
+        tasks: Iterable,
+        arrays: Optional[Dict[str, np.ndarray]] = None,
+    ) -> Iterator[Any]:
+        arrays = arrays or {}
+        tasks = list(tasks)
+
+        if self.max_workers == 1:
+            for task in tasks:
+                yield fn(arrays, task)
+            return
+
+        shared = None
+        if not arrays:
+            initargs = (None, None)
+        elif shared_memory is None:
+            initargs = (None, arrays)
+        else:
+            shared = SharedArrays(arrays)
+            initargs = (shared.spec, None)
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=initargs,
+            ) as pool:
+                futures = [pool.submit(_run_task, fn, task) for task in tasks]
+                logger.debug(
+                    f"Submitted {len(futures)} tasks to {self.max_workers} workers"
+                )
+                for future in futures:
+                    yield future.result()
+        finally:
+            if shared:
+                shared.close()
+
+    def chunks(self, items: List, chunks_per_worker: int = 4) -> List[List]:
+        """
+        split items into contiguous chunks, a few per worker so slow chunks
+        don't hold up the pool
+        """
+        count = min(len(items), self.max_workers * chunks_per_worker) or 1
+        return [list(c) for c in np.array_split(np.arange(len(items)), count) if len(c)]
+
+
+class WalkForwardWindow(NamedTuple):
+    label: Any
+    train: slice
+    test: slice
+
+
+def gen_walk_forward_windows(
+    ts: pd.Series, train_days: int, test_days: int = 1
+) -> List[WalkForwardWindow]:
+    """
+    walk forward windows over the trading dates present in ts. Each window
+    trains on train_days dates and tests on the following test_days dates.
+    Windows are positional slices, so every window reads from the same arrays.
+
+    Args:
+        ts (pd.Series): sorted bar timestamps
+        train_days (int): number of trading dates to train on
+        test_days (int): number of trading dates to test on
+
+    Returns:
+        List[WalkForwardWindow]: windows labelled by their first test date
+    """
+    dates = pd.DatetimeIndex(ts).normalize()
+    unique_dates = dates.unique()
+    starts = dates.searchsorted(unique_dates, side="left")
+    bounds = [int(b) for b in starts] + [len(dates)]
+
+    windows = []
+    for i in range(train_days, len(unique_dates) - test_days + 1):
+        train = slice(bounds[i - train_days], bounds[i])
+        test = slice(bounds[i], bounds[i + test_days])
+        windows.append(WalkForwardWindow(unique_dates[i].date(), train, test))
+    return windows
@@ -0,0 +1,265 @@
+import itertools
+import numpy as np
+import pandas as pd
+from loguru import logger
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from ta_scanner.cache import IndicatorCache, fingerprint_arrays, gen_cache_key
+from ta_scanner.experiments.executor import ExperimentExecutor
+from ta_scanner.filters import FilterCumsum, FilterOptions, gen_filter_cells
+from ta_scanner.indicators import (
+    BaseMovingAverageCrossover,
+    IndicatorParams,
+    crossover_values,
+)
+from ta_scanner.kernels import Backend
+from ta_scanner.reports import BasicReport
+
+
+class ParameterSweepException(Exception):
+    pass
+
+
+class ParameterSweep:
+    """
+    Run a moving average crossover over every cell of a parameter grid.
+
+    Each distinct moving average length is computed once and shared by every
+    cell that uses it. The crossover signals for the whole grid are held in a
+    single (bars, cells) int8 matrix, so only the close column is read from
+    the bars frame and nothing is copied per cell. With a cache, the moving
+    averages are memoized on the close array, eg across repeated runs of the
+    same walk forward windows.
+
+    Example:
+        sweep = ParameterSweep(
+            IndicatorSmaCrossover,
+            {IndicatorParams.fast_sma: range(2, 60), IndicatorParams.slow_sma: [60]},
+            {
+                FilterOptions.win_points: 6,
+                FilterOptions.loss_points: 4,
+                FilterOptions.threshold_intervals: 30,
+            },
+        )
+        results = sweep.run(df)
+    """
+
+    result_columns = BasicReport.metric_columns
+
+    def __init__(
+        self,
+        indicator_class: Type[BaseMovingAverageCrossover],
+        param_grid: Dict[IndicatorParams, Iterable[int]],
+        filter_params: Dict[FilterOptions, Any],
+        inverse: int = 1,
+        backend: Backend = Backend.auto,
+        cache: Optional[IndicatorCache] = None,
+    ):
+        if not issubclass(indicator_class, BaseMovingAverageCrossover):
+            raise ParameterSweepException(
+                f"{indicator_class.__name__} is not a moving average crossover"
+            )
+
+        for param in [indicator_class.fast_param, indicator_class.slow_param]:
+            if param not in param_grid:
+                raise ParameterSweepException(f"param_grid requires key = {param}")
+
+        self.indicator_class = indicator_class
+        self.param_grid = {k: list(v) for k, v in param_grid.items()}
+        self.filter_params = filter_params
+        self.inverse = inverse
+        self.backend = backend
+        self.cache = cache
+
+    def cells(self) -> List[Dict[IndicatorParams, Any]]:
+        """
+        every combination of the grid values, in grid order
+        """
+        keys = list(self.param_grid.keys())
+        combinations = itertools.product(*[self.param_grid[k] for k in keys])
+        return [dict(zip(keys, values)) for values in combinations]
+
+    def moving_averages(
+        self, close: np.ndarray, cells: List[Dict[IndicatorParams, Any]]
+    ) -> Dict[int, np.ndarray]:
+        """
+        compute each distinct fast/slow time period used by cells once
+        """
+        fast_param = self.indicator_class.fast_param
+        slow_param = self.indicator_class.slow_param
+        periods = {c[fast_param] for c in cells} | {c[slow_param] for c in cells}
+        if self.cache is None:
+            return {p: self.indicator_class.moving_average(close, p) for p in periods}
+
+        ma_function = self.indicator_class.ma_function
+        fingerprint = fingerprint_arrays([close])
+
+        def compute(p: int) -> Dict[str, np.ndarray]:
+            return {"ma": self.indicator_class.moving_average(close, p)}
+
+        moving_averages = {}
+        for p in periods:
+            key = gen_cache_key([ma_function, str(p), fingerprint])
+            arrays = self.cache.get_or_compute(key, lambda: compute(p))
+            moving_averages[p] = arrays["ma"]
+        return moving_averages
+
+    def signals(
+        self,
+        close: np.ndarray,
+        cells: Optional[List[Dict[IndicatorParams, Any]]] = None,
+    ) -> np.ndarray:
+        """
+        (bars, cells) int8 matrix with the crossover signals of every cell
+        """
+        cells = self.cells() if cells is None else cells
+        close = np.asarray(close, dtype=np.float64)
+        moving_averages = self.moving_averages(close, cells)
+
+        fast_param = self.indicator_class.fast_param
+        slow_param = self.indicator_class.slow_param
+
+        signals = np.zeros((len(close), len(cells)), dtype=np.int8, order="F")
+        for i, cell in enumerate(cells):
+            spread = (
+                moving_averages[cell[fast_param]] - moving_averages[cell[slow_param]]
+            )
+            signals[:, i] = crossover_values(spread)
+        return signals
+
+    def run(
+        self, df: pd.DataFrame, executor: Optional[ExperimentExecutor] = None
+    ) -> pd.DataFrame:
+        """
+        run the sweep over the bars in df
+
+        Args:
+            df (pd.DataFrame): bars with a close column
+            executor (ExperimentExecutor): optional, spread the grid cells
+                across the executor's process pool
+
+        Returns:
+            pd.DataFrame: one row per grid cell with the cell params and the
+                BasicReport metrics of its trades
+        """
+        close = df["close"].to_numpy(dtype=np.float64)
+        cells = self.cells()
+
+        if executor is None:
+            return self.run_cells(close, cells)
+
+        tasks = [(self, [cells[i] for i in chunk]) for chunk in executor.chunks(cells)]
+        results = executor.map(run_sweep_cells, tasks, {"close": close})
+        return pd.concat(list(results), ignore_index=True)
+
+    def run_cells(
+        self,
+        close: np.ndarray,
+        cells: Optional[List[Dict[IndicatorParams, Any]]] = None,
+    ) -> pd.DataFrame:
+        """
+        run cells, by default every cell, over a close array
+        """
+        cells = self.cells() if cells is None else cells
+        signals = self.signals(close, cells)
+        return self.evaluate(close, signals, cells)
+
+    def evaluate(
+        self,
+        close: np.ndarray,
+        signals: np.ndarray,
+        cells: Optional[List[Dict[IndicatorParams, Any]]] = None,
+    ) -> pd.DataFrame:
+        cells = self.cells() if cells is None else cells
+        sfilter = FilterCumsum(
+            field_name=None,
+            result_field_name=None,
+            params=self.filter_params,
+            backend=self.backend,
+        )
+        ledgers = [
+            sfilter.trades(close, signals[:, i], self.inverse)
+            for i in range(len(cells))
+        ]
+        metrics = BasicReport().ledger_metrics(ledgers)
+
+        params = pd.DataFrame(
+            [{k.value: v for k, v in cell.items()} for cell in cells],
+            columns=[k.value for k in self.param_grid.keys()],
+        )
+        results = pd.concat([params, metrics[self.result_columns]], axis=1)
+        logger.debug(f"Swept {len(results)} cells")
+        return results
+
+
+def run_sweep_cells(arrays: Dict[str, np.ndarray], task) -> pd.DataFrame:
+    """
+    executor task, run a chunk of a sweep's cells over the shared close array
+    """
+    sweep, cells = task
+    return sweep.run_cells(arrays["close"], cells)
+
+
+class FilterSweep:
+    """
+    Run every cell of a FilterOptions grid over one set of entry signals.
+
+    The exits of the whole grid are resolved in one FilterCumsum.trades_grid
+    pass and reported in one BasicReport call, instead of re-running the
+    filter per cell.
+
+    Example:
+        sweep = FilterSweep(
+            {
+                FilterOptions.win_points: np.arange(1, 11),
+                FilterOptions.loss_points: np.arange(1, 11),
+                FilterOptions.threshold_intervals: range(10, 110, 10),
+            }
+        )
+        results = sweep.run(df, "sma_crossover")
+    """
+
+    result_columns = BasicReport.metric_columns
+
+    def __init__(
+        self,
+        filter_grid: Dict[FilterOptions, Iterable[Any]],
+        inverse: int = 1,
+    ):
+        for option in FilterCumsum.required_filter_options:
+            if option not in filter_grid:
+                raise ParameterSweepException(f"filter_grid requires key = {option}")
+
+        self.filter_grid = {k: list(v) for k, v in filter_grid.items()}
+        self.inverse = inverse
+
+    def cells(self) -> List[Dict[FilterOptions, Any]]:
+        return gen_filter_cells(self.filter_grid)
+
+    def run(self, df: pd.DataFrame, field_name: str) -> pd.DataFrame:
+        """
+        Args:
+            df (pd.DataFrame): bars with a close and a signal column
+            field_name (str): the signal column
+
+        Returns:
+            pd.DataFrame: one row per filter cell with the cell params and
+                the BasicReport metrics of its trades
+        """
+        close = df["close"].to_numpy(dtype=np.float64)
+        signals = df[field_name].to_numpy(dtype=np.float64)
+        return self.evaluate(close, signals)
+
+    def evaluate(self, close: np.ndarray, signals: np.ndarray) -> pd.DataFrame:
+        cells = self.cells()
+        sfilter = FilterCumsum(field_name=None, result_field_name=None, params={})
+        ledgers = sfilter.trades_grid(close, signals, cells, self.inverse)
+        metrics = BasicReport().ledger_metrics(ledgers)
+
+        params = pd.DataFrame(
+            [{k.value: v for k, v in cell.items()} for cell in cells],
+            columns=[k.value for k in self.filter_grid.keys()],
+        )
+        results = pd.concat([params, metrics[self.result_columns]], axis=1)
+        logger.debug(f"Swept {len(results)} filter cells")
+        return results
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from loguru import logger
+from typing import Callable, Dict, List, Optional
+
+from ta_scanner.experiments.executor import (
+    ExperimentExecutor,
+    WalkForwardWindow,
+    gen_walk_forward_windows,
+)
+from ta_scanner.experiments.parameter_sweep import ParameterSweep
+from ta_scanner.experiments.simple_experiment import BaseExperiment
+
+
+def select_best_pnl(train_results: pd.DataFrame) -> int:
+    """
+    position of the train cell with the highest pnl
+    """
+    return int(np.nanargmax(train_results.pnl.to_numpy(dtype=np.float64)))
+
+
+class WalkForwardExperiment(BaseExperiment):
+    """
+    Walk forward a parameter sweep: for each window, run every cell of the
+    sweep over the train days, select one cell and run it over the test days.
+
+    The bars are loaded once. Signals for every cell are computed once over
+    the full span, and windows are positional slices of the same close and
+    signal arrays. The moving averages therefore carry warm state across
+    window boundaries instead of restarting, and nothing is re-queried or
+    re-resampled per window.
+
+    Example:
+        experiment = WalkForwardExperiment(sweep, train_days=5)
+        results = experiment.run(df)
+
+    Args:
+        sweep (ParameterSweep): the cells to train
+        train_days (int): trading dates per train window
+        test_days (int): trading dates per test window
+        select_cell (Callable): takes the train results and returns the
+            position of the cell to test, defaults to the best pnl
+    """
+
+    def __init__(
+        self,
+        sweep: ParameterSweep,
+        train_days: int,
+        test_days: int = 1,
+        select_cell: Callable[[pd.DataFrame], int] = select_best_pnl,
+    ):
+        self.sweep = sweep
+        self.train_days = train_days
+        self.test_days = test_days
+        self.select_cell = select_cell
+
+    def windows(self, df: pd.DataFrame) -> List[WalkForwardWindow]:
+        return gen_walk_forward_windows(df.ts, self.train_days, self.test_days)
+
+    def run(
+        self, df: pd.DataFrame, executor: Optional[ExperimentExecutor] = None
+    ) -> pd.DataFrame:
+        """
+        Args:
+            df (pd.DataFrame): sorted bars with ts and close columns
+            executor (ExperimentExecutor): optional, run the windows across
+                the executor's process pool
+
+        Returns:
+            pd.DataFrame: one row per window with the window label (first
+                test date), the selected cell's params, the test pnl, count,
+                average and median, and the cumulative pnl and count
+        """
+        close = df.close.to_numpy(dtype=np.float64)
+        arrays = {"close": close, "signals": self.sweep.signals(close)}
+        windows = self.windows(df)
+
+        if executor is None:
+            rows = [self.run_window(arrays, window) for window in windows]
+        else:
+            tasks = [(self, window) for window in windows]
+            rows = list(executor.map(run_walk_forward_window, tasks, arrays))
+
+        param_columns = [k.value for k in self.sweep.param_grid.keys()]
+        columns = ["label"] + param_columns + ParameterSweep.result_columns
+        results = pd.DataFrame(rows, columns=columns)
+        results["cumulative_pnl"] = results.pnl.cumsum()
+        results["cumulative_count"] = results["count"].cumsum()
+
+        for row in results.itertuples(index=False):
+            logger.info(
+                f"Test Results. {row.label}. pnl={row.pnl}, count={row.count}. "
+                f"CumulativePnL={row.cumulative_pnl}. Trades Count={row.cumulative_count}"
+            )
+        return results
+
+    def run_window(self, arrays: Dict[str, np.ndarray], window: WalkForwardWindow):
+        close, signals = arrays["close"], arrays["signals"]
+        cells = self.sweep.cells()
+
+        train_close, train_signals = close[window.train], signals[window.train]
+        train_results = self.sweep.evaluate(train_close, train_signals, cells)
+        selected = self.select_cell(train_results)
+
+        test_close, test_signals = close[window.test], signals[window.test]
+        test_results = self.sweep.evaluate(
+            test_close, test_signals[:, [selected]], [cells[selected]]
+        )
+        return [window.label] + test_results.iloc[0].tolist()
+
+
+def run_walk_forward_window(arrays: Dict[str, np.ndarray], task):
+    """
+    executor task, run one window over the shared close and signal arrays
+    """
+    experiment, window = task
+    return experiment.run_window(arrays, window)
@@ -1,8 +1,12 @@
 import abc
-from enum import Enum
+import itertools
+from enum import Enum, IntEnum
+import numpy as np
 import pandas as pd
 from loguru import logger
-from typing import Any, Dict, List, Optional, List
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from ta_scanner.kernels import Backend, cumsum_exits, forward_excursions
 
 
 class FilterOptions(Enum):
@@ -19,13 +23,76 @@ class FilterException(Exception):
     pass
 
 
+class ExitReason(IntEnum):
+    won = 1
+    lost = 2
+    max_time = 3
+
+
+class TradeLedger(NamedTuple):
+    """
+    trades as a struct of arrays, one value per trade ordered by exit bar.
+    Indexes are bar positions, direction is +1 long or -1 short and
+    exit_reason holds ExitReason values.
+    """
+
+    entry_index: np.ndarray
+    exit_index: np.ndarray
+    direction: np.ndarray
+    entry_price: np.ndarray
+    exit_price: np.ndarray
+    pnl: np.ndarray
+    exit_reason: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "TradeLedger":
+        return cls(
+            entry_index=np.empty(0, dtype=np.int64),
+            exit_index=np.empty(0, dtype=np.int64),
+            direction=np.empty(0, dtype=np.int8),
+            entry_price=np.empty(0, dtype=np.float64),
+            exit_price=np.empty(0, dtype=np.float64),
+            pnl=np.empty(0, dtype=np.float64),
+            exit_reason=np.empty(0, dtype=np.int8),
+        )
+
+    def to_frame(self, ts: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        the ledger as a DataFrame, with entry and exit timestamps looked up
+        from the bars' ts column when it's given
+        """
+        df = pd.DataFrame(self._asdict())
+        df["exit_reason"] = [ExitReason(x).name for x in self.exit_reason]
+        if ts is not None:
+            ts = pd.Series(ts).reset_index(drop=True)
+            df.insert(0, "entry_ts", ts.iloc[self.entry_index].to_numpy())
+            df.insert(1, "exit_ts", ts.iloc[self.exit_index].to_numpy())
+        return df
+
+
+def gen_filter_cells(
+    filter_grid: Dict[FilterOptions, Iterable[Any]],
+) -> List[Dict[FilterOptions, Any]]:
+    """
+    every combination of the filter grid values, in grid order
+    """
+    keys = list(filter_grid.keys())
+    combinations = itertools.product(*[filter_grid[k] for k in keys])
+    return [dict(zip(keys, values)) for values in combinations]
+
+
 class BaseFitler(metaclass=abc.ABCMeta):
     def __init__(
-        self, field_name: str, result_field_name: str, params: Dict[FilterOptions, Any]
+        self,
+        field_name: str,
+        result_field_name: str,
+        params: Dict[FilterOptions, Any],
+        backend: Backend = Backend.auto,
     ):
         self.field_name = field_name
         self.result_field_name = result_field_name
         self.params = params
+        self.backend = backend
 
     def ensure_required_filter_options(
         self, expected: List[FilterOptions], actual: Dict[FilterOptions, Any]
@@ -38,6 +105,21 @@ class BaseFitler(metaclass=abc.ABCMeta):
     def apply(self, df, field_name, filter_options):
         pass
 
+    def input_columns(self) -> List[str]:
+        """
+        columns of df that the filter reads
+        """
+        return ["close", self.field_name]
+
+    def trade_ledger(self, df: Mapping[str, Any], inverse: int = 1) -> TradeLedger:
+        """
+        the trades for the signals in df, a DataFrame or a dict of arrays, as
+        a TradeLedger. Unlike apply, df is only read, no result column is
+        written.
+        """
+        filter_name = self.__class__.__name__
+        raise FilterException(f"{filter_name} does not support trade_ledger")
+
 
 class FilterCumsum(BaseFitler):
     required_filter_options = [
@@ -52,9 +134,192 @@ class FilterCumsum(BaseFitler):
     def log_entry(self, action, row):
         logger.debug(f"Action={action}. Ts={row.ts}. Close={row.close}")
 
-    def apply(self, df: pd.DataFrame, inverse: int = 1):
+    def apply(self, df: pd.DataFrame, inverse: int = 1, vectorized: bool = True):
+        self.ensure_required_filter_options(self.required_filter_options, self.params)
+
+        if vectorized:
+            self._apply_vectorized(df, inverse)
+        else:
+            self._apply_iterrows(df, inverse)
+
+    def exits(
+        self, close: np.ndarray, signals: np.ndarray, inverse: int = 1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        return the exit bar index and pnl of the trades opened on every non
+        zero signal, see trades. The result column holds one trade per exit
+        bar, so when several exit on the same bar only the later entry is
+        kept, same as writing them into it one at a time.
+        """
+        ledger = self.trades(close, signals, inverse)
+        last = np.append(ledger.exit_index[1:] != ledger.exit_index[:-1], True)
+        return ledger.exit_index[last], ledger.pnl[last]
+
+    def trades(
+        self, close: np.ndarray, signals: np.ndarray, inverse: int = 1
+    ) -> TradeLedger:
+        """
+        return the ledger of the trades opened on every non zero signal,
+        ordered by exit bar then entry bar. Every trade is kept, including
+        several exiting on the same bar.
+        """
         self.ensure_required_filter_options(self.required_filter_options, self.params)
+        threshold = self.params[FilterOptions.threshold_intervals]
+        win_points = self.params[FilterOptions.win_points]
+        loss_points = self.params[FilterOptions.loss_points]
+
+        close = np.asarray(close, dtype=np.float64)
+        signals = np.asarray(signals, dtype=np.float64)
+        positions = np.flatnonzero(signals != 0)
+
+        if len(positions) == 0 or threshold <= 0:
+            return TradeLedger.empty()
+
+        directions = signals[positions] * inverse
+        exit_index, pnl = cumsum_exits(
+            close,
+            positions,
+            directions,
+            win_points,
+            loss_points,
+            threshold,
+            backend=self.backend,
+        )
+
+        return self._gen_ledger(
+            close, positions, directions, exit_index, pnl, win_points, loss_points
+        )
+
+    def trades_grid(
+        self,
+        close: np.ndarray,
+        signals: np.ndarray,
+        cells: List[Dict[FilterOptions, Any]],
+        inverse: int = 1,
+    ) -> List[TradeLedger]:
+        """
+        return the ledger of every filter cell, eg from gen_filter_cells, for
+        one set of signals. Each ledger is the same as trades with the cell
+        as params.
+
+        The forward move of every entry is computed once over the longest
+        threshold, with its running max favourable and adverse excursion.
+        The first bar a win or loss limit is reached is then a count over
+        those rows, found once per distinct limit, and each cell only picks
+        the earliest of its win, loss and threshold bars.
+        """
+        for cell in cells:
+            self.ensure_required_filter_options(self.required_filter_options, cell)
+
+        close = np.asarray(close, dtype=np.float64)
+        signals = np.asarray(signals, dtype=np.float64)
+        positions = np.flatnonzero(signals != 0)
+        thresholds = [cell[FilterOptions.threshold_intervals] for cell in cells]
+        length = max(thresholds, default=0)
+
+        if len(positions) == 0 or length <= 0:
+            return [TradeLedger.empty() for _ in cells]
+
+        directions = signals[positions] * inverse
+        diffs, favourable, adverse = forward_excursions(
+            close, positions, directions, length
+        )
+
+        # bar offset of the first win / loss per entry, length when never hit
+        first_win: Dict[float, np.ndarray] = {}
+        first_loss: Dict[float, np.ndarray] = {}
+        for cell in cells:
+            win_points = cell[FilterOptions.win_points]
+            loss_points = cell[FilterOptions.loss_points]
+            if win_points not in first_win:
+                first_win[win_points] = (favourable < win_points).sum(axis=1)
+            if loss_points not in first_loss:
+                limit = loss_points * -1.0
+                first_loss[loss_points] = (adverse > limit).sum(axis=1)
+
+        rows = np.arange(len(positions))
+        ledgers = []
+        for cell, threshold in zip(cells, thresholds):
+            if threshold <= 0:
+                ledgers.append(TradeLedger.empty())
+                continue
+
+            win_points = cell[FilterOptions.win_points]
+            loss_points = cell[FilterOptions.loss_points]
+            offsets = np.minimum(first_win[win_points], first_loss[loss_points])
+            offsets = np.minimum(offsets, threshold - 1)
+
+            exit_index = np.minimum(positions + offsets, len(close) - 1)
+            ledger = self._gen_ledger(
+                close,
+                positions,
+                directions,
+                exit_index,
+                diffs[rows, offsets],
+                win_points,
+                loss_points,
+            )
+            ledgers.append(ledger)
+        return ledgers
+
+    def _gen_ledger(
+        self,
+        close: np.ndarray,
+        positions: np.ndarray,
+        directions: np.ndarray,
+        exit_index: np.ndarray,
+        pnl: np.ndarray,
+        win_points: float,
+        loss_points: float,
+    ) -> TradeLedger:
+        order = np.lexsort((positions, exit_index))
+        logger.debug(f"Trades={len(order)}")
+
+        exit_index = exit_index[order]
+        pnl = pnl[order]
+        # a trade only runs to max time when it never reached either limit
+        exit_reason = np.select(
+            [pnl >= win_points, pnl <= (loss_points * -1.0)],
+            [ExitReason.won, ExitReason.lost],
+            default=ExitReason.max_time,
+        ).astype(np.int8)
+
+        entry_index = positions[order]
+        return TradeLedger(
+            entry_index=entry_index,
+            exit_index=exit_index,
+            direction=np.sign(directions[order]).astype(np.int8),
+            entry_price=close[entry_index],
+            exit_price=close[exit_index],
+            pnl=pnl,
+            exit_reason=exit_reason,
+        )
+
+    def trade_ledger(self, df: Mapping[str, Any], inverse: int = 1) -> TradeLedger:
+        close = np.asarray(df["close"], dtype=np.float64)
+        signals = np.asarray(df[self.field_name], dtype=np.float64)
+        return self.trades(close, signals, inverse)
+
+    def _apply_vectorized(self, df: pd.DataFrame, inverse: int = 1) -> None:
+        signals = df[self.field_name].to_numpy(dtype=np.float64)
+        if not (signals != 0).any():
+            return
+
+        close = df["close"].to_numpy(dtype=np.float64)
+        exit_index, pnl = self.exits(close, signals, inverse)
+
+        if len(exit_index) == 0:
+            return
+
+        if self.result_field_name in df.columns:
+            results = df[self.result_field_name].to_numpy(dtype=np.float64, copy=True)
+        else:
+            results = np.full(len(df.index), np.nan)
+
+        results[exit_index] = pnl
+        df[self.result_field_name] = results
 
+    def _apply_iterrows(self, df: pd.DataFrame, inverse: int = 1) -> None:
         query_signals = f"{self.field_name} != 0"
         query_results = df.query(query_signals)
 
@@ -1,9 +1,12 @@
 import abc
+import collections
 from enum import Enum
 import numpy as np
 import pandas as pd
 from talib import abstract
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from ta_scanner.kernels import Backend, combined_binary
 
 
 class IndicatorParams(Enum):
@@ -12,6 +15,18 @@ class IndicatorParams(Enum):
     slow_ema = "slow_ema"
     fast_ema = "fast_ema"
     field_names = "field_names"
+    combine_mode = "combine_mode"
+    weights = "weights"
+    min_weight = "min_weight"
+
+
+class CombineMode(Enum):
+    # every field's last signal agrees
+    all_agree = "all_agree"
+    # more than half of the fields' last signals agree
+    majority = "majority"
+    # the agreeing fields hold at least min_weight of the weights
+    weighted = "weighted"
 
 
 def crossover(series, value=0):
@@ -26,14 +41,104 @@ def crossover(series, value=0):
     return crossover
 
 
+def crossover_values(values: np.ndarray, value=0) -> np.ndarray:
+    """
+    same as crossover, for a 1-D array or for each column of a 2-D array
+    """
+    values_shifted = np.full_like(values, np.nan, dtype=np.float64)
+    values_shifted[1:] = values[:-1]
+    conditions = [
+        (values <= value) & (values_shifted >= value),
+        (values >= value) & (values_shifted <= value),
+    ]
+    choices = [-1, +1]
+    return np.select(conditions, choices, default=0).astype(np.int8)
+
+
 class IndicatorException(Exception):
     pass
 
 
+class RollingSma:
+    """
+    O(1) per value simple moving average. Keeps the running sum of the last
+    timeperiod values and adds/subtracts in the same order as talib's SMA, so
+    the output is bit for bit the same as the batch function.
+    """
+
+    def __init__(self, timeperiod: int):
+        self.timeperiod = timeperiod
+        self.window: collections.deque = collections.deque()
+        self.total = 0.0
+
+    def update(self, value: float) -> float:
+        self.total += value
+        self.window.append(value)
+        if len(self.window) < self.timeperiod:
+            return np.nan
+
+        average = self.total / self.timeperiod
+        self.total -= self.window.popleft()
+        return average
+
+
+class RollingEma:
+    """
+    O(1) per value exponential moving average. Seeded with the simple average
+    of the first timeperiod values, then prev + (value - prev) * k, same as
+    talib's EMA.
+    """
+
+    def __init__(self, timeperiod: int):
+        self.timeperiod = timeperiod
+        self.k = 2.0 / (timeperiod + 1)
+        self.count = 0
+        self.total = 0.0
+        self.prev = np.nan
+
+    def update(self, value: float) -> float:
+        self.count += 1
+        if self.count < self.timeperiod:
+            self.total += value
+            return np.nan
+
+        if self.count == self.timeperiod:
+            self.total += value
+            self.prev = self.total / self.timeperiod
+        else:
+            self.prev = ((value - self.prev) * self.k) + self.prev
+        return self.prev
+
+
+class RollingCrossover:
+    """
+    O(1) per value version of crossover, keeps the previous value
+    """
+
+    def __init__(self, value=0):
+        self.value = value
+        self.prev = np.nan
+
+    def update(self, current: float) -> int:
+        prev, self.prev = self.prev, current
+        if current <= self.value and prev >= self.value:
+            return -1
+        if current >= self.value and prev <= self.value:
+            return +1
+        return 0
+
+
 class BaseIndicator(metaclass=abc.ABCMeta):
-    def __init__(self, field_name: str, params: Dict[IndicatorParams, Any]):
+    def __init__(
+        self,
+        field_name: str,
+        params: Dict[IndicatorParams, Any],
+        backend: Backend = Backend.auto,
+    ):
         self.field_name = field_name
         self.params = params
+        self.backend = backend
+        self.reset()
 
     def ensure_required_filter_options(
         self, expected: List[IndicatorParams], actual: Dict[IndicatorParams, Any]
@@ -49,42 +154,271 @@ class BaseIndicator(metaclass=abc.ABCMeta):
     def apply(self, df, field_name: str) -> None:
         pass
 
+    def input_columns(self) -> List[str]:
+        """
+        columns of df that apply reads
+        """
+        return ["close"]
 
-class IndicatorSmaCrossover(BaseIndicator):
-    def apply(self, df: pd.DataFrame) -> None:
-        self.ensure_required_filter_options(
-            [IndicatorParams.fast_sma, IndicatorParams.slow_sma], self.params
-        )
-        slow_sma = self.params[IndicatorParams.slow_sma]
-        fast_sma = self.params[IndicatorParams.fast_sma]
+    def output_columns(self) -> List[str]:
+        """
+        columns of df that apply writes
+        """
+        return [self.field_name]
 
-        sma = abstract.Function("sma")
-        df["slow_sma"] = sma(df.close, timeperiod=slow_sma)
-        df["fast_sma"] = sma(df.close, timeperiod=fast_sma)
-        df[self.field_name] = crossover(df.fast_sma - df.slow_sma)
-        return df
+    def compute(self, columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        read the input_columns from columns, a DataFrame or a dict of arrays,
+        and return the output_columns as new arrays without writing anything
+        """
+        indicator_name = self.__class__.__name__
+        raise IndicatorException(f"{indicator_name} does not support compute")
+
+    def update(self, bar) -> Any:
+        """
+        streaming mode, take one new bar (a dict or pd.Series) and return the
+        indicator value for it. State is kept between calls, so each bar costs
+        O(1) instead of re-running apply over the full history.
+        """
+        indicator_name = self.__class__.__name__
+        raise IndicatorException(f"{indicator_name} does not support update")
+
+    def update_chunk(self, columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        streaming mode for a chunk of bars, a DataFrame or dict of arrays with
+        the input_columns. Returns the field_name values for the chunk, and
+        the state carries over to the next chunk, so feeding a stream of
+        chunks gives the same values as apply over all of them.
+        """
+        names = self.input_columns()
+        values = [np.asarray(columns[c]) for c in names]
+        updates = [self.update(dict(zip(names, row))) for row in zip(*values)]
+        return {self.field_name: np.array(updates, dtype=np.int64)}
+
+    def reset(self) -> None:
+        """
+        drop the streaming state, the next update starts from scratch
+        """
+        pass
+
+
+class BaseMovingAverageCrossover(BaseIndicator):
+    """
+    crossover of a fast and slow moving average. Subclasses pick the talib
+    function and the params that hold the fast and slow time periods.
+    """
+
+    ma_function: str
+    rolling_class: type
+    fast_param: IndicatorParams
+    slow_param: IndicatorParams
+
+    @classmethod
+    def moving_average(cls, close: np.ndarray, timeperiod: int) -> np.ndarray:
+        ma = abstract.Function(cls.ma_function)
+        return ma(np.asarray(close, dtype=np.float64), timeperiod=timeperiod)
+
+    def apply(self, df: pd.DataFrame, cache=None) -> None:
+        """
+        write the output_columns into df. With an IndicatorCache, they are
+        copied from the cache when already computed for the same close.
+        """
+        if cache is not None:
+            cache.apply(self, df)
+            return df
 
+        for c, values in self.compute(df).items():
+            df[c] = values
+        return df
 
-class IndicatorEmaCrossover(BaseIndicator):
-    def apply(self, df: pd.DataFrame) -> None:
+    def compute(self, columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
         self.ensure_required_filter_options(
-            [IndicatorParams.fast_ema, IndicatorParams.slow_ema], self.params
+            [self.fast_param, self.slow_param], self.params
         )
-        slow_ema = self.params[IndicatorParams.slow_ema]
-        fast_ema = self.params[IndicatorParams.fast_ema]
+        slow_period = self.params[self.slow_param]
+        fast_period = self.params[self.fast_param]
 
-        ema = abstract.Function("ema")
-        df["slow_ema"] = ema(df.close, timeperiod=slow_ema)
-        df["fast_ema"] = ema(df.close, timeperiod=fast_ema)
-        df[self.field_name] = crossover(df.fast_ema - df.slow_ema)
-        return df
+        close = np.asarray(columns["close"], dtype=np.float64)
+        slow = self.moving_average(close, slow_period)
+        fast = self.moving_average(close, fast_period)
+        return {
+            self.slow_param.value: slow,
+            self.fast_param.value: fast,
+            self.field_name: crossover_values(fast - slow).astype(np.int64),
+        }
+
+    def output_columns(self) -> List[str]:
+        return [self.slow_param.value, self.fast_param.value, self.field_name]
+
+    def update(self, bar) -> int:
+        """
+        streaming apply for one bar, returns the crossover signal for it. Feed
+        bars in order, the signals match apply over the same bars exactly.
+        """
+        fast, slow, cross = self.rolling_state()
+        close = float(bar["close"])
+        return cross.update(fast.update(close) - slow.update(close))
+
+    def update_chunk(self, columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        streaming apply for a chunk of bars, returns the same columns as
+        compute, continuing the moving averages from the previous chunk
+        """
+        fast, slow, cross = self.rolling_state()
+        close = np.asarray(columns["close"], dtype=np.float64)
+
+        fast_values = np.empty(len(close), dtype=np.float64)
+        slow_values = np.empty(len(close), dtype=np.float64)
+        signals = np.empty(len(close), dtype=np.int64)
+        for i, value in enumerate(close.tolist()):
+            fast_values[i] = fast.update(value)
+            slow_values[i] = slow.update(value)
+            signals[i] = cross.update(fast_values[i] - slow_values[i])
+
+        return {
+            self.slow_param.value: slow_values,
+            self.fast_param.value: fast_values,
+            self.field_name: signals,
+        }
+
+    def rolling_state(self) -> tuple:
+        """
+        the fast and slow rolling averages and the crossover of the stream
+        """
+        if self._rolling is None:
+            self.ensure_required_filter_options(
+                [self.fast_param, self.slow_param], self.params
+            )
+            self._rolling = (
+                self.rolling_class(self.params[self.fast_param]),
+                self.rolling_class(self.params[self.slow_param]),
+                RollingCrossover(),
+            )
+        return self._rolling
+
+    def reset(self) -> None:
+        self._rolling: Optional[tuple] = None
+
+
+class IndicatorSmaCrossover(BaseMovingAverageCrossover):
+    ma_function = "sma"
+    rolling_class = RollingSma
+    fast_param = IndicatorParams.fast_sma
+    slow_param = IndicatorParams.slow_sma
+
+
+class IndicatorEmaCrossover(BaseMovingAverageCrossover):
+    ma_function = "ema"
+    rolling_class = RollingEma
+    fast_param = IndicatorParams.fast_ema
+    slow_param = IndicatorParams.slow_ema
 
 
 class CombinedBindary(BaseIndicator):
-    def apply(self, df: pd.DataFrame) -> None:
+    """
+    combine the -1/0/+1 signals of several fields into one. Each field votes
+    with its last non zero signal, and on bars where any field signals, the
+    combined signal is the direction the vote agrees on, per the combine_mode
+    param (all_agree by default). weighted mode takes one weight per field
+    and min_weight, by default half of the total weight.
+    """
+
+    def apply(self, df: pd.DataFrame, vectorized: bool = True, cache=None) -> None:
+        """
+        write the combined signal into df. With an IndicatorCache, it is
+        copied from the cache when already computed for the same fields.
+        """
+        if cache is not None:
+            cache.apply(self, df)
+            return
+
         self.ensure_required_filter_options([IndicatorParams.field_names], self.params)
         field_names = self.params[IndicatorParams.field_names]
 
+        if vectorized:
+            self._apply_vectorized(df, field_names)
+        else:
+            self._apply_iterrows(df, field_names)
+
+    def input_columns(self) -> List[str]:
+        self.ensure_required_filter_options([IndicatorParams.field_names], self.params)
+        return list(self.params[IndicatorParams.field_names])
+
+    def combine_mode(self) -> CombineMode:
+        return self.params.get(IndicatorParams.combine_mode, CombineMode.all_agree)
+
+    def gen_vote(self, width: int) -> Tuple[np.ndarray, float]:
+        """
+        weight per field and the weight needed to emit a signal
+        """
+        mode = self.combine_mode()
+        if mode != CombineMode.weighted:
+            weights = np.ones(width, dtype=np.float64)
+            if mode == CombineMode.majority:
+                return weights, float(width // 2 + 1)
+            return weights, float(width)
+
+        self.ensure_required_filter_options([IndicatorParams.weights], self.params)
+        weights = np.asarray(self.params[IndicatorParams.weights], dtype=np.float64)
+        if weights.shape != (width,):
+            raise IndicatorException("weights requires one value per field name")
+        min_weight = self.params.get(IndicatorParams.min_weight, weights.sum() / 2)
+        return weights, float(min_weight)
+
+    def _apply_vectorized(self, df: pd.DataFrame, field_names: List[str]) -> None:
+        df[self.field_name] = self.compute(df)[self.field_name]
+
+    def compute(self, columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        self.ensure_required_filter_options([IndicatorParams.field_names], self.params)
+        field_names = self.params[IndicatorParams.field_names]
+
+        # kernels take -1/0/+1 int8 signals
+        values = np.column_stack(
+            [np.asarray(columns[fn], dtype=np.float64) for fn in field_names]
+        )
+        signals = np.sign(np.nan_to_num(values)).astype(np.int8)
+        weights, min_weight = self.gen_vote(len(field_names))
+        combined = combined_binary(
+            signals, backend=self.backend, weights=weights, min_weight=min_weight
+        )
+        return {self.field_name: combined.astype(np.int64)}
+
+    def update(self, bar) -> int:
+        """
+        streaming apply for one bar of -1/0/+1 signals, keeps the last nonzero
+        signal of each field
+        """
+        self.ensure_required_filter_options([IndicatorParams.field_names], self.params)
+        field_names = self.params[IndicatorParams.field_names]
+        if self._last_signals is None:
+            self._last_signals = [0 for _ in field_names]
+
+        changed = False
+        for i, fn in enumerate(field_names):
+            signal = int(np.sign(np.nan_to_num(bar[fn])))
+            if signal != 0:
+                self._last_signals[i] = signal
+                changed = True
+        if not changed:
+            return 0
+
+        weights, min_weight = self.gen_vote(len(field_names))
+        last_signals = np.array(self._last_signals)
+        longs = weights[last_signals == 1].sum()
+        shorts = weights[last_signals == -1].sum()
+        if longs >= min_weight and longs > shorts:
+            return 1
+        if shorts >= min_weight and shorts > longs:
+            return -1
+        return 0
+
+    def reset(self) -> None:
+        self._last_signals: Optional[List[int]] = None
+
+    def _apply_iterrows(self, df: pd.DataFrame, field_names: List[str]) -> None:
+        if self.combine_mode() != CombineMode.all_agree:
+            raise IndicatorException("only all_agree can be applied with iterrows")
+
         df[self.field_name] = 0
         length = len(field_names)
         field_name_values = [None for _ in range(length)]
@@ -0,0 +1,244 @@
+from enum import Enum
+import numpy as np
+from loguru import logger
+from typing import Callable, Optional, Tuple
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+class Backend(Enum):
+    auto = "auto"
+    numpy = "numpy"
+    numba = "numba"
+
+
+def resolve_backend(backend: Backend) -> Backend:
+    """
+    return the backend the kernels will actually run on. numba is used when
+    it's installed, otherwise everything falls back to the numpy kernels.
+    """
+    if backend == Backend.numpy:
+        return Backend.numpy
+    if numba is None:
+        if backend == Backend.numba:
+            logger.warning("numba is not installed. Falling back to numpy kernels")
+        return Backend.numpy
+    return Backend.numba
+
+
+def _jit(func: Callable) -> Callable:
+    if numba is None:
+        return func
+    return numba.njit(cache=True)(func)
+
+
+# --- numpy kernels
+
+
+def forward_windows(values: np.ndarray, length: int) -> np.ndarray:
+    """
+    return a read only (len(values), length) strided view where row i holds
+    values[i:i + length]. The tail is padded with the last value so windows
+    that run past the end hold the final bar.
+    """
+    padding = np.repeat(values[-1:], length - 1)
+    padded = np.concatenate([values, padding])
+    stride = padded.strides[0]
+    return np.lib.stride_tricks.as_strided(
+        padded, shape=(len(values), length), strides=(stride, stride), writeable=False
+    )
+
+
+def cumsum_exits_numpy(
+    close: np.ndarray,
+    positions: np.ndarray,
+    directions: np.ndarray,
+    win_points: float,
+    loss_points: float,
+    threshold: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    windows = forward_windows(close, threshold)[positions]
+    diffs = (windows - close[positions, np.newaxis]) * directions[:, np.newaxis]
+
+    hits = (diffs >= win_points) | (diffs <= (loss_points * -1.0))
+    offsets = np.where(hits.any(axis=1), hits.argmax(axis=1), threshold - 1)
+
+    exit_index = np.minimum(positions + offsets, len(close) - 1)
+    pnl = diffs[np.arange(len(positions)), offsets]
+    return exit_index, pnl
+
+
+def forward_excursions(
+    close: np.ndarray, positions: np.ndarray, directions: np.ndarray, length: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    the (entries, length) move of every entry over its next length bars, in
+    the entry's direction, with its running max (favourable) and running min
+    (adverse) excursion along each row. Rows are non decreasing / non
+    increasing, so the first bar a limit is reached is a count of the bars
+    before it.
+    """
+    windows = forward_windows(close, length)[positions]
+    diffs = (windows - close[positions, np.newaxis]) * directions[:, np.newaxis]
+    favourable = np.maximum.accumulate(diffs, axis=1)
+    adverse = np.minimum.accumulate(diffs, axis=1)
+    return diffs, favourable, adverse
+
+
+def combined_binary_numpy(
+    signals: np.ndarray, weights: np.ndarray, min_weight: float
+) -> np.ndarray:
+    length, width = signals.shape
+
+    # row number of the last non zero value per column, 0 meaning none yet
+    rows = np.arange(1, length + 1)[:, np.newaxis]
+    last_rows = np.maximum.accumulate(np.where(signals != 0, rows, 0), axis=0)
+
+    padded = np.concatenate([np.zeros((1, width), dtype=signals.dtype), signals])
+    last_values = np.take_along_axis(padded, last_rows, axis=0)
+
+    # weight of the fields whose last signal is long / short
+    longs = (last_values == 1).astype(np.float64) @ weights
+    shorts = (last_values == -1).astype(np.float64) @ weights
+
+    active = (signals != 0).any(axis=1)
+    conditions = [
+        active & (longs >= min_weight) & (longs > shorts),
+        active & (shorts >= min_weight) & (shorts > longs),
+    ]
+    return np.select(conditions, [1, -1], default=0).astype(np.int8)
+
+
+# --- numba kernels
+
+
+@_jit
+def cumsum_exits_scan(close, positions, directions, win_points, loss_points, threshold):
+    count = len(positions)
+    last = len(close) - 1
+    exit_index = np.empty(count, dtype=np.int64)
+    pnl = np.empty(count, dtype=np.float64)
+
+    for i in range(count):
+        entry = positions[i]
+        for offset in range(threshold):
+            bar = entry + offset
+            if bar > last:
+                break
+            diff = (close[bar] - close[entry]) * directions[i]
+            exit_index[i] = bar
+            pnl[i] = diff
+            if diff >= win_points or diff <= (loss_points * -1.0):
+                break
+    return exit_index, pnl
+
+
+@_jit
+def combined_binary_scan(signals, weights, min_weight):
+    length, width = signals.shape
+    last_values = np.zeros(width, dtype=np.int64)
+    result = np.zeros(length, dtype=np.int8)
+
+    for i in range(length):
+        active = False
+        for j in range(width):
+            if signals[i, j] != 0:
+                last_values[j] = signals[i, j]
+                active = True
+        if not active:
+            continue
+
+        longs = 0.0
+        shorts = 0.0
+        for j in range(width):
+            if last_values[j] == 1:
+                longs += weights[j]
+            elif last_values[j] == -1:
+                shorts += weights[j]
+
+        if longs >= min_weight and longs > shorts:
+            result[i] = 1
+        elif shorts >= min_weight and shorts > longs:
+            result[i] = -1
+    return result
+
+
+# --- dispatch
+
+
+def cumsum_exits(
+    close: np.ndarray,
+    positions: np.ndarray,
+    directions: np.ndarray,
+    win_points: float,
+    loss_points: float,
+    threshold: int,
+    backend: Backend = Backend.auto,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    find the exit bar and pnl for every entry. Each entry exits on the first
+    bar within threshold bars where the move reaches win_points or
+    -loss_points, otherwise on the last bar of the window.
+
+    Args:
+        close (np.ndarray): float64 close prices
+        positions (np.ndarray): int64 bar index of each entry
+        directions (np.ndarray): float64 direction of each entry, +1 or -1
+        win_points (float): points to exit with a win
+        loss_points (float): points to exit with a loss
+        threshold (int): max bars to hold the trade
+        backend (Backend): kernel backend
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: exit bar index and pnl per entry
+    """
+    if resolve_backend(backend) == Backend.numba:
+        kernel = cumsum_exits_scan
+    else:
+        kernel = cumsum_exits_numpy
+    return kernel(
+        np.ascontiguousarray(close, dtype=np.float64),
+        np.ascontiguousarray(positions, dtype=np.int64),
+        np.ascontiguousarray(directions, dtype=np.float64),
+        float(win_points),
+        float(loss_points),
+        int(threshold),
+    )
+
+
+def combined_binary(
+    signals: np.ndarray,
+    backend: Backend = Backend.auto,
+    weights: Optional[np.ndarray] = None,
+    min_weight: Optional[float] = None,
+) -> np.ndarray:
+    """
+    combine the (bars, fields) int8 signal matrix into one signal. Each field
+    votes with the weight of its last non zero value. On bars with a signal,
+    a direction is emitted when the fields voting for it hold at least
+    min_weight and more than the fields voting against it. By default every
+    field weighs 1 and min_weight is the number of fields, so every field
+    has to agree.
+
+    Args:
+        signals (np.ndarray): int8 matrix of -1, 0, +1 values
+        backend (Backend): kernel backend
+        weights (np.ndarray): optional, float64 weight per field
+        min_weight (float): optional, weight needed to emit a signal
+
+    Returns:
+        np.ndarray: int8 combined signal
+    """
+    signals = np.ascontiguousarray(signals, dtype=np.int8)
+    if weights is None:
+        weights = np.ones(signals.shape[1], dtype=np.float64)
+    weights = np.ascontiguousarray(weights, dtype=np.float64)
+    if min_weight is None:
+        min_weight = weights.sum()
+
+    if resolve_backend(backend) == Backend.numba:
+        return combined_binary_scan(signals, weights, float(min_weight))
+    return combined_binary_numpy(signals, weights, float(min_weight))
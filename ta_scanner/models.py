@@ -1,9 +1,10 @@
+from enum import Enum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import (
     create_engine,
     Column,
     Integer,
-    Numeric,
+    Float,
     String,
     DateTime,
     Index,
@@ -14,7 +15,17 @@ from sqlalchemy import (
 Base = declarative_base()
 
 
-NUMERIC_OPTIONS = dict(precision=8, scale=2, decimal_return_scale=None, asdecimal=True)
+DOUBLE_OPTIONS = dict(precision=53, asdecimal=False)
+
+
+class PriceStorage(Enum):
+    # numeric(8, 2), the original schema. Reads come back as Decimal
+    NUMERIC = "numeric(8, 2)"
+    # float8, the default for new tables
+    DOUBLE = "double precision"
+
+
+PRICE_COLUMNS = ["open", "close", "high", "low", "average"]
 
 
 def gen_engine():
@@ -36,13 +47,31 @@ class Quote(Base):
     id = Column(Integer, primary_key=True)
     ts = Column(DateTime(timezone=True), index=True)
     symbol = Column(String(10))
-    open = Column(Numeric(**NUMERIC_OPTIONS))
-    close = Column(Numeric(**NUMERIC_OPTIONS))
-    high = Column(Numeric(**NUMERIC_OPTIONS))
-    low = Column(Numeric(**NUMERIC_OPTIONS))
-    average = Column(Numeric(**NUMERIC_OPTIONS))
+    open = Column(Float(**DOUBLE_OPTIONS))
+    close = Column(Float(**DOUBLE_OPTIONS))
+    high = Column(Float(**DOUBLE_OPTIONS))
+    low = Column(Float(**DOUBLE_OPTIONS))
+    average = Column(Float(**DOUBLE_OPTIONS))
     volume = Column(Integer)
     bar_count = Column(Integer)
     rth = Column(Boolean)
 
     __table_args__ = (Index("ix_quote_symbol_ts", symbol, ts, unique=True),)
+
+
+def migrate_price_columns(
+    engine,
+    storage: PriceStorage = PriceStorage.DOUBLE,
+    table_name: str = Quote.__tablename__,
+) -> None:
+    """
+    change the type of the price columns of an existing table. Tables
+    created before prices were stored as double precision keep numeric(8, 2)
+    columns until they are migrated.
+    """
+    alter_columns = ", ".join(
+        f"ALTER COLUMN {c} TYPE {storage.value} USING {c}::{storage.value}"
+        for c in PRICE_COLUMNS
+    )
+    with engine.connect() as con:
+        con.execute(f"ALTER TABLE {table_name} {alter_columns};")
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from loguru import logger
+from typing import Dict, List, NamedTuple, Optional
+
+from ta_scanner.filters import BaseFitler, TradeLedger
+from ta_scanner.indicators import BaseIndicator
+from ta_scanner.reports import BasicReport
+
+
+class PipelineException(Exception):
+    pass
+
+
+def read_only_view(values: np.ndarray) -> np.ndarray:
+    view = values.view()
+    view.flags.writeable = False
+    return view
+
+
+class PipelineResult(NamedTuple):
+    """
+    outputs of a pipeline run, the new columns of every indicator, the
+    filter's trade ledger and the report's metrics
+    """
+
+    columns: Dict[str, np.ndarray]
+    ledger: Optional[TradeLedger] = None
+    metrics: Optional[pd.DataFrame] = None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.columns.values())
+
+    def to_frame(self, index: Optional[pd.Index] = None) -> pd.DataFrame:
+        """
+        the output columns as a DataFrame, eg with the bars' index to join
+        """
+        return pd.DataFrame(self.columns, index=index)
+
+
+class Pipeline:
+    """
+    Run indicators, then a filter and a report, without touching the bars.
+
+    Each stage is passed only the columns it declares with input_columns(),
+    as read only numpy views of the bars or of earlier stages' outputs, and
+    returns its outputs as new arrays. The outputs are collected in a
+    PipelineResult, so running a pipeline costs the new columns alone and the
+    same bars frame can be shared by every run without copying it.
+
+    Example:
+        pipeline = Pipeline(
+            [IndicatorSmaCrossover("sma_crossover", params)],
+            FilterCumsum("sma_crossover", "sma_crossover_pnl", filter_params),
+            BasicReport(),
+        )
+        result = pipeline.run(df)
+        result.metrics
+
+    Args:
+        indicators (List[BaseIndicator]): applied in order
+        sfilter (BaseFitler): optional, builds the trade ledger
+        report (BasicReport): optional, reports the ledger
+    """
+
+    def __init__(
+        self,
+        indicators: List[BaseIndicator],
+        sfilter: Optional[BaseFitler] = None,
+        report: Optional[BasicReport] = None,
+    ):
+        self.indicators = indicators
+        self.sfilter = sfilter
+        self.report = report
+
+    def run(self, df: pd.DataFrame) -> PipelineResult:
+        columns: Dict[str, np.ndarray] = {}
+
+        def project(stage, names: List[str]) -> Dict[str, np.ndarray]:
+            inputs = {}
+            for c in names:
+                if c in columns:
+                    inputs[c] = read_only_view(columns[c])
+                elif c in df.columns:
+                    inputs[c] = read_only_view(df[c].to_numpy())
+                else:
+                    stage_name = stage.__class__.__name__
+                    raise PipelineException(f"{stage_name} requires column {c}")
+            return inputs
+
+        for indicator in self.indicators:
+            outputs = indicator.compute(project(indicator, indicator.input_columns()))
+            columns.update(outputs)
+
+        if self.sfilter is None:
+            return PipelineResult(columns)
+
+        inputs = project(self.sfilter, self.sfilter.input_columns())
+        ledger = self.sfilter.trade_ledger(inputs)
+        logger.debug(f"Trades={len(ledger.pnl)}")
+
+        if self.report is None:
+            return PipelineResult(columns, ledger)
+        return PipelineResult(columns, ledger, self.report.ledger_metrics([ledger]))
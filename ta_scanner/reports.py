@@ -1,19 +1,167 @@
+import warnings
 import numpy as np
-from typing import Tuple
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from ta_scanner.filters import TradeLedger
+
+
+def gen_pnl_matrix(ledgers: List[TradeLedger]) -> np.ndarray:
+    """
+    (trades, ledgers) matrix of each ledger's pnl in exit order, padded with
+    NaN below the shorter ledgers
+    """
+    length = max([len(ledger.pnl) for ledger in ledgers], default=0)
+    matrix = np.full((length, len(ledgers)), np.nan)
+    for i, ledger in enumerate(ledgers):
+        matrix[: len(ledger.pnl), i] = ledger.pnl
+    return matrix
 
 
 class BasicReport:
+    """
+    Performance metrics of trade results.
+
+    Values are pnl per trade in order. In a filter's sparse result column
+    zero and NaN values are not trades. A ledger holds only trades, so for
+    ledgers only NaN values, eg the padding of gen_pnl_matrix, are not
+    trades and a breakeven trade is still counted. A 2-D matrix is reported
+    column by column in one pass, eg every cell of a sweep.
+    """
+
+    metric_columns = [
+        "pnl",
+        "count",
+        "average",
+        "median",
+        "win_rate",
+        "profit_factor",
+        "max_drawdown",
+        "sharpe",
+        "sortino",
+        "expectancy",
+    ]
+
     def __init__(self):
         pass
 
-    def analyze(self, df, field_name) -> Tuple[np.float64, int, np.float64, np.float64]:
-        trades = df.query(f"0 < {field_name} or {field_name} < 0")
+    def analyze(
+        self, df: pd.DataFrame, field_name: str, export_path: Optional[str] = None
+    ) -> Tuple[np.float64, int, np.float64, np.float64]:
+        """
+        summarize the trade results in df[field_name]. The trade rows are only
+        written to csv when an export_path is given.
+        """
+        values = df[field_name].to_numpy(dtype=np.float64)
+
+        if export_path is not None:
+            df[(0 < values) | (values < 0)].to_csv(export_path)
+
+        return self.summarize(values)
+
+    def summarize(
+        self, values, is_trade: Optional[np.ndarray] = None
+    ) -> Tuple[np.float64, int, np.float64, np.float64]:
+        """
+        pnl, count, average and median of the trade results in values, see
+        gen_metrics for is_trade
+        """
+        metrics = self.gen_metrics(values, is_trade)
+        return (
+            metrics["pnl"][0],
+            int(metrics["count"][0]),
+            metrics["average"][0],
+            metrics["median"][0],
+        )
+
+    def summarize_ledger(
+        self, ledger: TradeLedger
+    ) -> Tuple[np.float64, int, np.float64, np.float64]:
+        """
+        pnl, count, average and median of the trades in a filter's ledger
+        """
+        return self.summarize(ledger.pnl, np.ones(len(ledger.pnl), dtype=bool))
+
+    def metrics(self, values, is_trade: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        the metric_columns for values, one row per column of a 2-D matrix or
+        a single row for 1-D values
+        """
+        metrics = self.gen_metrics(values, is_trade)
+        return pd.DataFrame(metrics, columns=self.metric_columns)
+
+    def ledger_metrics(self, ledgers: List[TradeLedger]) -> pd.DataFrame:
+        """
+        the metric_columns of every ledger, one row each, breakeven trades
+        included
+        """
+        matrix = gen_pnl_matrix(ledgers)
+        return self.metrics(matrix, ~np.isnan(matrix))
+
+    def gen_metrics(
+        self, values, is_trade: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        every metric_column as an array with one value per column of values.
+        is_trade masks the values that are trades, by default the non zero,
+        non NaN values of a sparse result column.
+
+        max_drawdown is the largest drop of the cumulative pnl from its peak,
+        starting from 0. sharpe is the average over the standard deviation
+        of the trades, sortino the average over their downside deviation,
+        and expectancy is win_rate * average win - loss rate * average loss.
+        Breakeven trades are neither wins nor losses.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, np.newaxis]
+
+        if is_trade is None:
+            is_trade = (0 < values) | (values < 0)
+        else:
+            is_trade = np.asarray(is_trade, dtype=bool).reshape(values.shape)
+        trades = np.where(is_trade, values, 0.0)
+        wins = np.where(trades > 0, trades, 0.0)
+        losses = np.where(trades < 0, trades, 0.0)
+
+        count = is_trade.sum(axis=0)
+        win_count = (trades > 0).sum(axis=0)
+        loss_count = (trades < 0).sum(axis=0)
+
+        # adding the zeros of non trades is exact, so the running sum gives
+        # the same pnl as summing only the trades in order
+        width = values.shape[1]
+        equity = np.concatenate([np.zeros((1, width)), np.cumsum(trades, axis=0)])
+        pnl = equity[-1]
+        max_drawdown = (np.maximum.accumulate(equity, axis=0) - equity).max(axis=0)
+
+        with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+            # all NaN median of a column without trades
+            warnings.simplefilter("ignore", RuntimeWarning)
+            median = np.nanmedian(np.where(is_trade, values, np.nan), axis=0)
 
-        trades.to_csv("trades.csv")
+            average = pnl / count
+            deviations = np.where(is_trade, trades - average, 0.0)
+            std = np.sqrt((deviations**2).sum(axis=0) / (count - 1))
+            downside = np.sqrt((losses**2).sum(axis=0) / count)
 
-        pnl = trades[field_name].sum()
-        count = trades[field_name].count()
-        average = np.average(trades[field_name])
-        median = np.median(trades[field_name])
+            gross_win = wins.sum(axis=0)
+            gross_loss = -losses.sum(axis=0)
+            win_rate = win_count / count
+            loss_rate = loss_count / count
+            average_win = np.where(win_count > 0, gross_win / win_count, 0.0)
+            average_loss = np.where(loss_count > 0, gross_loss / loss_count, 0.0)
 
-        return pnl, count, average, median
+            metrics = {
+                "pnl": pnl,
+                "count": count,
+                "average": average,
+                "median": median,
+                "win_rate": win_rate,
+                "profit_factor": gross_win / gross_loss,
+                "max_drawdown": max_drawdown,
+                "sharpe": np.where(count > 1, average / std, np.nan),
+                "sortino": average / downside,
+                "expectancy": win_rate * average_win - loss_rate * average_loss,
+            }
+        return metrics
@@ -0,0 +1,182 @@
+import datetime
+import time
+import numpy as np
+import pandas as pd
+from loguru import logger
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from ta_scanner.data.bar_set import BarSetStorage, attach_bar_set
+from ta_scanner.data.constants import Calendar
+from ta_scanner.data.data import aggregate_bars, db_data_fetch_between
+from ta_scanner.experiments.executor import ExperimentExecutor
+from ta_scanner.filters import BaseFitler
+from ta_scanner.indicators import BaseIndicator
+from ta_scanner.models import gen_engine
+from ta_scanner.pipeline import Pipeline
+from ta_scanner.reports import BasicReport
+
+
+class ScannerException(Exception):
+    pass
+
+
+def gen_futures_universe() -> List[str]:
+    """
+    every futures symbol in Calendar.futures_lookup_hash, without duplicates
+    """
+    symbols: List[str] = []
+    for calendar_symbols in Calendar.futures_lookup_hash().values():
+        for symbol in calendar_symbols:
+            if symbol not in symbols:
+                symbols.append(symbol)
+    return symbols
+
+
+class DbBarLoader:
+    """
+    load a symbol's bars from postgres. A plain callable object, so it can be
+    pickled to the scanner's worker processes. Each call opens its own engine.
+
+    Args:
+        sd (datetime.date): start date, inclusive
+        ed (datetime.date): end date, inclusive
+        groupby_minutes (int): bar size
+    """
+
+    def __init__(self, sd: datetime.date, ed: datetime.date, groupby_minutes: int = 1):
+        self.sd = sd
+        self.ed = ed
+        self.groupby_minutes = groupby_minutes
+
+    def __call__(self, symbol: str) -> pd.DataFrame:
+        engine = gen_engine()
+        df = db_data_fetch_between(engine, symbol, self.sd, self.ed)
+        df.set_index("ts", inplace=True)
+        df = aggregate_bars(df, groupby_minutes=self.groupby_minutes)
+        df["ts"] = df.index
+        return df.reset_index(drop=True)
+
+
+class BarSetLoader:
+    """
+    load a symbol's bars from a SharedBarSet. Only the bar set name is
+    pickled to the scanner's worker processes, each attaches to it once.
+
+    Args:
+        name (str): shared memory block name or memmap file path
+        storage (BarSetStorage): where the bar set lives, by default worked
+            out from the name, see resolve_storage
+    """
+
+    def __init__(self, name: str, storage: Optional[BarSetStorage] = None):
+        self.name = name
+        self.storage = storage
+
+    def __call__(self, symbol: str) -> pd.DataFrame:
+        return attach_bar_set(self.name, self.storage).frame(symbol)
+
+
+class ScanPipeline(NamedTuple):
+    """
+    indicators, run in order by a Pipeline that leaves the bars untouched,
+    then the filter and the report that scores the filter's trade ledger
+    """
+
+    indicators: List[BaseIndicator]
+    sfilter: BaseFitler
+    report: BasicReport = BasicReport()
+
+    def run(self, df: pd.DataFrame) -> tuple:
+        result = Pipeline(self.indicators, self.sfilter).run(df)
+        return self.report.summarize_ledger(result.ledger)
+
+
+class Scanner:
+    """
+    Run a pipeline over a universe of symbols.
+
+    Each symbol is loaded and run as one task on an ExperimentExecutor, so the
+    symbols run in parallel and a scan takes about as long as the slowest
+    symbol. A symbol that fails to load or run is logged and reported with an
+    error instead of stopping the scan.
+
+    Example:
+        scanner = Scanner(
+            ScanPipeline(
+                [IndicatorEmaCrossover("ema_crossover", params)],
+                FilterCumsum("ema_crossover", "ema_crossover_pnl", filter_params),
+            ),
+            DbBarLoader(datetime.date(2020, 8, 1), datetime.date(2020, 8, 23)),
+        )
+        results = scanner.scan(gen_futures_universe())
+
+    Args:
+        pipeline (ScanPipeline): indicators, filter and report
+        load_bars (Callable): picklable callable returning the bars of a symbol
+        executor (ExperimentExecutor): optional, defaults to one worker per cpu
+    """
+
+    metric_columns = ["pnl", "count", "average", "median"]
+    timing_columns = ["load_seconds", "run_seconds"]
+
+    def __init__(
+        self,
+        pipeline: ScanPipeline,
+        load_bars: Callable[[str], pd.DataFrame],
+        executor: Optional[ExperimentExecutor] = None,
+    ):
+        self.pipeline = pipeline
+        self.load_bars = load_bars
+        self.executor = executor or ExperimentExecutor()
+
+    def scan(self, symbols: List[str]) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: one row per symbol, ranked by pnl, with the report
+                metrics, the number of bars, the load and run seconds and the
+                error if the symbol failed
+        """
+        if len(symbols) == 0:
+            raise ScannerException("symbols is empty")
+
+        started = time.perf_counter()
+        tasks = [(symbol, self.load_bars, self.pipeline) for symbol in symbols]
+        rows = list(self.executor.map(run_scan_symbol, tasks))
+        elapsed = time.perf_counter() - started
+
+        columns = ["symbol"] + self.metric_columns + ["bars"] + self.timing_columns
+        results = pd.DataFrame(rows, columns=columns + ["error"])
+        results.sort_values(by="pnl", ascending=False, inplace=True, kind="mergesort")
+        results.reset_index(drop=True, inplace=True)
+
+        total = results[self.timing_columns].sum().sum()
+        logger.info(
+            f"Scanned {len(symbols)} symbols in {elapsed:.2f}s. Symbol time={total:.2f}s"
+        )
+        return results
+
+
+def run_scan_symbol(arrays: Dict[str, np.ndarray], task) -> Dict:
+    """
+    executor task, load one symbol and run the pipeline over it
+    """
+    symbol, load_bars, pipeline = task
+    row = {"symbol": symbol, "bars": 0, "load_seconds": np.nan, "run_seconds": np.nan}
+    row.update({c: np.nan for c in Scanner.metric_columns})
+    row["error"] = None
+
+    try:
+        started = time.perf_counter()
+        df = load_bars(symbol)
+        row["load_seconds"] = time.perf_counter() - started
+        row["bars"] = len(df)
+
+        started = time.perf_counter()
+        row.update(zip(Scanner.metric_columns, pipeline.run(df)))
+        row["run_seconds"] = time.perf_counter() - started
+    except Exception as e:
+        logger.exception(f"Failed to scan {symbol}")
+        row["error"] = repr(e)
+
+    logger.debug(f"Scanned {row}")
+    return row
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+import pytest
+from trading_calendars import get_calendar
+
+from ta_scanner.data.aggregation import (
+    AggregationException,
+    StreamingAggregator,
+    aggregate_bar_stream,
+    aggregate_bars_by_session,
+    aggregate_bars_multi,
+)
+from ta_scanner.data.data import aggregate_bars
+
+
+def gen_df_minute_bars(tz="US/Eastern", seed=1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2020-08-03 04:00", "2020-08-05 20:00", freq="1min", tz=tz)
+    # drop the overnight hours and random minutes, so some buckets are empty
+    ts = ts[((ts.hour < 18) | (ts.hour > 21)) & (rng.random(len(ts)) > 0.2)]
+
+    close = 3300 + rng.normal(0, 0.5, len(ts)).cumsum()
+    spread = rng.random((2, len(ts)))
+    df = pd.DataFrame(
+        {
+            "open": close + rng.normal(0, 0.25, len(ts)),
+            "high": close + spread[0],
+            "low": close - spread[1],
+            "close": close,
+            "volume": rng.integers(0, 50, len(ts)).astype(np.float64),
+            "bar_count": rng.integers(1, 10, len(ts)).astype(np.float64),
+        },
+        index=pd.DatetimeIndex(ts, name="ts"),
+    )
+    df["average"] = (df.high + df.low) / 2
+    return df
+
+
+@pytest.mark.parametrize("tz", ["US/Eastern", None])
+def test_aggregate_bars_multi_matches_resample(tz):
+    df = gen_df_minute_bars(tz)
+    intervals = [60, 5, 1, 15, 7]
+    results = aggregate_bars_multi(df, intervals)
+
+    assert list(results.keys()) == intervals
+    for interval in intervals:
+        expected = aggregate_bars(df.copy(), interval)
+        actual = results[interval]
+        assert actual.index.dtype == df.index.dtype
+        pd.testing.assert_frame_equal(
+            actual[expected.columns], expected, check_freq=False, check_names=False
+        )
+
+
+def test_aggregate_bars_multi_weighted_average():
+    df = gen_df_minute_bars()
+    df["volume"] += 1
+    # 04:05 - 04:08, a bucket with several bars and no volume
+    df.iloc[4:8, df.columns.get_loc("volume")] = 0
+    result = aggregate_bars_multi(df, [5, 15])
+
+    for interval in [5, 15]:
+        grouped = df.resample(f"{interval}min")
+        pv = (df.average * df.volume).resample(f"{interval}min").sum()
+        volume = grouped.volume.sum()
+        expected = (pv / volume).where(volume > 0, grouped.close.last()).dropna()
+        np.testing.assert_allclose(result[interval].average, expected)
+        np.testing.assert_array_equal(
+            result[interval].bar_count,
+            grouped.bar_count.sum()[volume.index.isin(expected.index)],
+        )
+
+
+def test_aggregate_bars_multi_validates_intervals():
+    with pytest.raises(AggregationException):
+        aggregate_bars_multi(gen_df_minute_bars(), [0, 5])
+    with pytest.raises(AggregationException):
+        aggregate_bars_multi(gen_df_minute_bars(), [1440])
+
+
+def test_aggregate_bars_multi_empty():
+    results = aggregate_bars_multi(gen_df_minute_bars().iloc[:0], [1, 5])
+    assert results[5].empty
+
+
+def test_aggregate_bars_by_session_matches_resample_when_aligned():
+    df = gen_df_minute_bars()
+    df = df.iloc[df.index.indexer_between_time("09:30", "15:59")]
+    calendar = get_calendar("XNYS")
+
+    # 30 minute buckets from the 09:30 open line up with the wall clock
+    actual = aggregate_bars_by_session(df, 30, calendar)
+    expected = aggregate_bars(df.copy(), 30)
+    pd.testing.assert_frame_equal(
+        actual[expected.columns], expected, check_freq=False, check_names=False
+    )
+
+    hourly = aggregate_bars(df.copy(), 60, calendar)
+    assert hourly.index[0] == pd.Timestamp("2020-08-03 09:30", tz="US/Eastern")
+    assert hourly.index[6] == pd.Timestamp("2020-08-03 15:30", tz="US/Eastern")
+    assert hourly.index[7] == pd.Timestamp("2020-08-04 09:30", tz="US/Eastern")
+
+
+def test_aggregate_bars_by_session_never_spans_the_maintenance_break():
+    ts = pd.date_range(
+        "2020-08-02 18:00", "2020-08-05 16:59", freq="1min", tz="US/Eastern"
+    )
+    # globex halts 17:00 - 18:00 US/Eastern
+    ts = ts[ts.hour != 17]
+    df = pd.DataFrame(
+        {"open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 1.0}, index=ts
+    )
+
+    # 7 and 90 minutes don't divide the 23 hour session, so buckets are cut
+    for interval in [60, 7, 90]:
+        result = aggregate_bars_by_session(df, interval, get_calendar("CMES"))
+
+        session_opens = pd.DatetimeIndex(
+            ["2020-08-02 18:00", "2020-08-03 18:00", "2020-08-04 18:00"],
+            tz="US/Eastern",
+        )
+        per_session = -(-23 * 60 // interval)
+        assert len(result) == 3 * per_session
+        assert result.index[::per_session].equals(session_opens)
+        assert result.volume.sum() == len(df)
+
+        # the last bucket of each session stops at the 17:00 close
+        last_bars = (23 * 60) % interval or interval
+        assert (result.volume.iloc[per_session - 1 :: per_session] == last_bars).all()
+
+
+def test_aggregate_bars_by_session_validates_interval():
+    with pytest.raises(AggregationException):
+        aggregate_bars_by_session(gen_df_minute_bars(), 0, get_calendar("XNYS"))
+
+
+@pytest.mark.parametrize("interval", [1, 5, 60])
+def test_aggregate_bar_stream_matches_aggregate_bars_multi(interval):
+    df = gen_df_minute_bars(tz=None)
+    expected = aggregate_bars_multi(df, [interval])[interval]
+
+    chunks = []
+    for start in range(0, len(df), 997):
+        chunk = df.iloc[start : start + 997]
+        arrays = {c: chunk[c].to_numpy() for c in chunk.columns}
+        arrays["ts"] = chunk.index.to_numpy()
+        chunks.append(arrays)
+
+    bars = list(aggregate_bar_stream(chunks, interval))
+    actual = pd.DataFrame(
+        {c: np.concatenate([b[c] for b in bars]) for c in expected.columns},
+        index=pd.DatetimeIndex(np.concatenate([b["ts"] for b in bars]), name="ts"),
+    )
+    pd.testing.assert_frame_equal(actual, expected, check_freq=False)
+
+
+def test_streaming_aggregator_carries_the_last_bucket():
+    ts = pd.date_range("2020-08-03 09:30", periods=7, freq="1min")
+    chunk = {"ts": ts.to_numpy(), "close": np.arange(7.0)}
+
+    aggregator = StreamingAggregator(5)
+    bars = aggregator.update(chunk)
+    assert bars["ts"].tolist() == [pd.Timestamp("2020-08-03 09:30").value]
+    assert bars["close"].tolist() == [4.0]
+
+    bars = aggregator.flush()
+    assert bars["close"].tolist() == [6.0]
+    assert len(aggregator.flush()["ts"]) == 0
@@ -0,0 +1,125 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+from ta_scanner.data import bar_set as bar_set_module
+from ta_scanner.data.bar_set import (
+    BarSetException,
+    BarSetStorage,
+    SharedBarSet,
+    attach_bar_set,
+)
+from ta_scanner.experiments.executor import ExperimentExecutor
+
+
+def gen_df_bars(length, tz="America/Chicago", seed=1):
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2020-08-03 08:30", periods=length, freq="1min", tz=tz)
+    close = 3000 + rng.normal(0, 1, length).cumsum()
+    return pd.DataFrame(
+        {
+            "ts": ts,
+            "open": close - 0.25,
+            "high": close + 0.5,
+            "low": close - 0.5,
+            "close": close,
+            "volume": rng.integers(1, 100, length),
+        }
+    )
+
+
+def gen_frames():
+    return {
+        "/ES": gen_df_bars(50, seed=1),
+        "/NQ": gen_df_bars(30, seed=2),
+        "SPY": gen_df_bars(20, tz=None, seed=3),
+    }
+
+
+def sum_close(arrays, task):
+    name, symbol = task
+    bar_set = attach_bar_set(name)
+    return float(bar_set.arrays(symbol)["close"].sum())
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="requires shared_memory")
+def test_shared_memory_round_trip():
+    frames = gen_frames()
+    with SharedBarSet.create(frames) as bar_set:
+        attached = SharedBarSet.attach(bar_set.name)
+        assert attached.symbols() == ["/ES", "/NQ", "SPY"]
+
+        symbol_range = attached.symbol_range("/NQ")
+        assert (symbol_range.start, symbol_range.stop) == (50, 80)
+        assert symbol_range.tz == "America/Chicago"
+        assert pd.Timestamp(symbol_range.last_ts) == frames["/NQ"].ts.iloc[-1]
+
+        for symbol, df in frames.items():
+            pd.testing.assert_frame_equal(
+                attached.frame(symbol), df.astype({"volume": np.float64})
+            )
+
+        arrays = attached.arrays("/ES")
+        assert not arrays["close"].flags.writeable
+        assert not arrays["close"].flags.owndata
+        del arrays
+        attached.close()
+
+
+def test_memmap_round_trip(tmp_path):
+    frames = gen_frames()
+    path = str(tmp_path / "bars.bin")
+    with SharedBarSet.create(frames, storage=BarSetStorage.MEMMAP, path=path):
+        attached = SharedBarSet.attach(path, BarSetStorage.MEMMAP)
+        close = attached.arrays("SPY")["close"]
+        np.testing.assert_array_equal(close, frames["SPY"].close)
+    assert not (tmp_path / "bars.bin").exists()
+
+
+def test_workers_attach_by_name():
+    frames = gen_frames()
+    expected = [float(df.close.sum()) for df in frames.values()]
+
+    with SharedBarSet.create(frames) as bar_set:
+        tasks = [(bar_set.name, symbol) for symbol in frames]
+        executor = ExperimentExecutor(max_workers=2)
+        assert list(executor.map(sum_close, tasks)) == expected
+
+
+def test_attach_bar_set_after_recreate(tmp_path):
+    path = str(tmp_path / "bars.bin")
+    first = {"/ES": gen_df_bars(10, seed=1)}
+    second = {"/ES": gen_df_bars(10, seed=2)}
+
+    # tasks run in the owning process with ExperimentExecutor(1)
+    with SharedBarSet.create(first, storage=BarSetStorage.MEMMAP, path=path):
+        close = attach_bar_set(path, BarSetStorage.MEMMAP).frame("/ES").close
+        np.testing.assert_array_equal(close, first["/ES"].close)
+
+    with SharedBarSet.create(second, storage=BarSetStorage.MEMMAP, path=path):
+        close = attach_bar_set(path, BarSetStorage.MEMMAP).frame("/ES").close
+        np.testing.assert_array_equal(close, second["/ES"].close)
+
+
+def test_default_storage_without_shared_memory(monkeypatch):
+    # python 3.7, the default falls back to a memmap temp file
+    monkeypatch.setattr(bar_set_module, "shared_memory", None)
+    frames = gen_frames()
+
+    with SharedBarSet.create(frames) as bar_set:
+        assert bar_set.storage == BarSetStorage.MEMMAP
+        attached = SharedBarSet.attach(bar_set.name)
+        assert attached.storage == BarSetStorage.MEMMAP
+        close = attached.arrays("/NQ")["close"]
+        np.testing.assert_array_equal(close, frames["/NQ"].close)
+        del close
+        attached.close()
+    assert not os.path.exists(bar_set.name)
+
+
+def test_create_requires_columns():
+    frames = {"/ES": gen_df_bars(5).drop(columns=["volume"])}
+    with pytest.raises(BarSetException):
+        SharedBarSet.create(frames)
@@ -0,0 +1,93 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from trading_calendars import get_calendar
+
+pytest.importorskip("pyarrow")
+
+from ta_scanner.data.bar_store import LocalBarStore, StoreFormat
+from ta_scanner.data.data import load_and_cache
+from tests.data.test_data import FakeDataFetcher, fake_df_quotes, fake_df_session
+
+
+def fake_df_days(symbol, dates):
+    return pd.concat([fake_df_session(symbol, dt) for dt in dates])
+
+
+@pytest.mark.parametrize("store_format", [StoreFormat.ARROW, StoreFormat.PARQUET])
+def test_write_and_read_between(tmp_path, store_format):
+    store = LocalBarStore(str(tmp_path), store_format)
+    dates = [datetime.date(2020, 8, d) for d in [3, 4, 5]]
+    store.write(fake_df_days("/ES", dates))
+
+    assert store.dates_between("/ES", dates[1], dates[2]) == set(dates[1:])
+    assert store.dates_between("/NQ", dates[0], dates[2]) == set()
+
+    df = store.read_between("/ES", dates[1], dates[1])
+    assert len(df.index) == 3
+    assert df.close.dtype == np.float64
+    assert (df.ts.dt.date == dates[1]).all()
+
+
+def fake_df_futures_session(symbol, dt, periods):
+    # the session opens at 18:00 US/Eastern the evening before
+    session_open = pd.Timestamp(dt, tz="US/Eastern") - pd.Timedelta(hours=6)
+    ts = pd.date_range(session_open, periods=periods, freq="1min")
+    return fake_df_quotes(symbol, ts)
+
+
+@pytest.mark.parametrize("store_format", [StoreFormat.ARROW, StoreFormat.PARQUET])
+def test_write_merges_consecutive_futures_sessions(tmp_path, store_format):
+    store = LocalBarStore(str(tmp_path), store_format)
+    calendar = get_calendar("CMES")
+    d3, d4 = datetime.date(2020, 8, 3), datetime.date(2020, 8, 4)
+
+    rth = pd.date_range("2020-08-03 09:30", periods=390, freq="1min", tz="US/Eastern")
+    store.write(fake_df_quotes("/ES", rth))
+    store.write(fake_df_futures_session("/ES", d4, 30))
+
+    df = store.read_between("/ES", d3, d3)
+    assert len(df.index) == 390 + 30
+    assert df.ts.is_unique
+
+    # re-writing the same bars doesn't duplicate them
+    store.write(fake_df_futures_session("/ES", d4, 30))
+    assert len(store.read_between("/ES", d3, d3).index) == 390 + 30
+    assert store.dates_between("/ES", d3, d4, calendar) == {d3, d4}
+
+
+def test_dates_between_by_session(tmp_path):
+    store = LocalBarStore(str(tmp_path))
+    calendar = get_calendar("CMES")
+    d3, d4 = datetime.date(2020, 8, 3), datetime.date(2020, 8, 4)
+    store.write(fake_df_futures_session("/ES", d4, 30))
+
+    # the evening bars are stored under 8/3 but belong to the 8/4 session
+    assert store.dates_between("/ES", d3, d4) == {d3}
+    assert store.dates_between("/ES", d3, d4, calendar) == {d4}
+
+
+def test_request_instrument(tmp_path):
+    store = LocalBarStore(str(tmp_path))
+    store.write(fake_df_session("/ES", datetime.date(2020, 8, 3)))
+
+    assert store.request_instrument("/ES", datetime.date(2020, 8, 3), None) is not None
+    assert store.request_instrument("/ES", datetime.date(2020, 8, 4), None) is None
+
+
+def test_load_and_cache_in_place_of_db(tmp_path):
+    store = LocalBarStore(str(tmp_path))
+    sd, ed = datetime.date(2020, 7, 31), datetime.date(2020, 8, 3)
+    store.write(fake_df_session("/ES", sd))
+
+    fetcher = FakeDataFetcher()
+    kwargs = dict(start_date=sd, end_date=ed, bar_store=store, use_db=False)
+    df = load_and_cache("/ES", fetcher, **kwargs)
+
+    assert fetcher.requested == [datetime.date(2020, 8, 3)]
+    assert len(df.index) == 6
+
+    fetcher = FakeDataFetcher()
+    load_and_cache("/ES", fetcher, **kwargs)
+    assert fetcher.requested == []
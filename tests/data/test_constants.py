@@ -0,0 +1,69 @@
+import datetime
+import pandas as pd
+from trading_calendars import get_calendar
+from trading_calendars.exchange_calendar_xnys import XNYSExchangeCalendar
+
+from ta_scanner.data.constants import Calendar, CalendarRegistry, calendar_registry
+
+
+def test_select_exchange_by_symbol():
+    assert Calendar.select_exchange_by_symbol("/ES") == Calendar.CME
+    assert Calendar.select_exchange_by_symbol("/NOPE") == Calendar.DEFAULT
+
+
+def test_calendar_registry_window():
+    registry = CalendarRegistry()
+    sd, ed = datetime.date(2020, 8, 3), datetime.date(2020, 8, 21)
+
+    calendar = registry.get("CMES", sd, ed)
+    assert calendar.first_session.year == 2020
+    assert calendar.last_session.year == 2020
+    assert registry.get("CMES", sd, sd) is calendar
+
+    default = get_calendar("CMES")
+    sessions = calendar.sessions_in_range(
+        pd.Timestamp(sd, tz="UTC"), pd.Timestamp(ed, tz="UTC")
+    )
+    assert sessions.equals(
+        default.sessions_in_range(
+            pd.Timestamp(sd, tz="UTC"), pd.Timestamp(ed, tz="UTC")
+        )
+    )
+    assert calendar.schedule.loc[sessions].equals(default.schedule.loc[sessions])
+
+
+def test_calendar_registry_widens_window():
+    registry = CalendarRegistry()
+    calendar = registry.get(
+        "XNYS", datetime.date(2020, 8, 3), datetime.date(2020, 8, 3)
+    )
+
+    # the first week of january pads back into the prior year
+    wider = registry.get("XNYS", datetime.date(2019, 1, 2), datetime.date(2019, 1, 2))
+    assert wider is not calendar
+    assert wider.first_session.year == 2018
+    assert wider.last_session.year == 2020
+    assert (
+        registry.get("XNYS", datetime.date(2020, 8, 3), datetime.date(2020, 8, 3))
+        is wider
+    )
+
+
+def test_calendar_registry_register():
+    registry = CalendarRegistry()
+    sd = datetime.date(2020, 8, 3)
+
+    # without a factory the full default calendar is used
+    assert registry.get("NYSE", sd, sd) is get_calendar("NYSE")
+
+    registry.register("NYSE", XNYSExchangeCalendar)
+    calendar = registry.get("NYSE", sd, sd)
+    assert isinstance(calendar, XNYSExchangeCalendar)
+    assert calendar.first_session.year == 2020
+
+
+def test_init_by_symbol():
+    sd = datetime.date(2020, 8, 3)
+    calendar = Calendar.init_by_symbol("/ES", sd, sd)
+    assert calendar is calendar_registry.get("CMES", sd, sd)
+    assert Calendar.init_by_symbol("SPY") is get_calendar("XNYS")
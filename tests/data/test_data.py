@@ -1,9 +1,26 @@
+import datetime
+import numpy as np
 import pandas as pd
+import pytest
+from sqlalchemy.exc import OperationalError
+from trading_calendars import get_calendar
+
+from ta_scanner.data.base_connector import DataFetcherBase
 from ta_scanner.data.data import (
     __gen_values,
     __gen_cols,
+    __gen_csv_buffer,
     db_insert_df_conflict_on_do_nothing,
+    db_bulk_insert_df_conflict_on_do_nothing,
+    load_and_cache,
+    gen_quote_select,
+    db_data_fetch_between_arrays,
+    db_data_stream_between,
+    apply_rth,
+    fill_missing_rth,
+    db_data_dates_between,
 )
+from ta_scanner.models import gen_engine, init_db, migrate_price_columns, PriceStorage
 
 
 def fake_df_ab():
@@ -22,3 +39,226 @@ def test_gen_cols():
     df = fake_df_ab()
     expected_values = ["a", "b"]
     assert __gen_cols(df) == expected_values
+
+
+def gen_engine_or_skip():
+    engine = gen_engine()
+    try:
+        init_db()
+    except OperationalError:
+        pytest.skip("postgres is not running, see docker-compose.yml")
+    return engine
+
+
+def fake_df_quotes(symbol, ts):
+    data = {
+        "ts": ts,
+        "symbol": symbol,
+        "open": 1.25,
+        "high": 2.5,
+        "low": 1.0,
+        "close": 2.0,
+        "volume": 10,
+        "rth": True,
+    }
+    return pd.DataFrame(data)
+
+
+def test_gen_csv_buffer():
+    df = fake_df_ab()
+    df.loc[1, "b"] = None
+    assert __gen_csv_buffer(df).read() == "1,11.0\n2,\n3,33.0\n"
+
+
+def test_db_bulk_insert_df_conflict_on_do_nothing():
+    engine = gen_engine_or_skip()
+    symbol = "TEST_BULK"
+    ts = pd.date_range("2020-08-03 13:30", periods=4, freq="1min", tz="UTC")
+
+    with engine.connect() as con:
+        con.execute(f"delete from quote where symbol = '{symbol}'")
+
+    try:
+        df = fake_df_quotes(symbol, ts[:2])
+        assert db_bulk_insert_df_conflict_on_do_nothing(engine, df, "quote") == (2, 0)
+
+        df = fake_df_quotes(symbol, ts)
+        result = db_bulk_insert_df_conflict_on_do_nothing(
+            engine, df, "quote", batch_size=3
+        )
+        assert result == (2, 2)
+    finally:
+        with engine.connect() as con:
+            con.execute(f"delete from quote where symbol = '{symbol}'")
+
+
+def fake_df_session(symbol, dt):
+    ts = pd.date_range(f"{dt} 14:00", periods=3, freq="1min", tz="UTC")
+    return fake_df_quotes(symbol, ts)
+
+
+class FakeDataFetcher(DataFetcherBase):
+    def __init__(self):
+        self.requested = []
+
+    def request_instrument(self, symbol, dt, what_to_show):
+        self.requested.append(dt)
+        df = fake_df_session(symbol, dt).drop(columns=["symbol"])
+        return df.rename(columns={"ts": "date"})
+
+
+def test_load_and_cache_only_fetches_missing_sessions():
+    engine = gen_engine_or_skip()
+    symbol = "TEST_CACHE"
+    # fri 7/31 - mon 8/3, the weekend is not a session
+    sd, ed = datetime.date(2020, 7, 31), datetime.date(2020, 8, 3)
+
+    with engine.connect() as con:
+        con.execute(f"delete from quote where symbol = '{symbol}'")
+
+    try:
+        df_cached = fake_df_session(symbol, sd)
+        db_bulk_insert_df_conflict_on_do_nothing(engine, df_cached, "quote")
+
+        fetcher = FakeDataFetcher()
+        df = load_and_cache(symbol, fetcher, start_date=sd, end_date=ed)
+        assert fetcher.requested == [datetime.date(2020, 8, 3)]
+        assert len(df.index) == 6
+
+        fetcher = FakeDataFetcher()
+        df = load_and_cache(symbol, fetcher, start_date=sd, end_date=ed)
+        assert fetcher.requested == []
+        assert len(df.index) == 6
+    finally:
+        with engine.connect() as con:
+            con.execute(f"delete from quote where symbol = '{symbol}'")
+
+
+def test_db_data_dates_between_futures_sessions():
+    engine = gen_engine_or_skip()
+    symbol = "TEST_FUT"
+    calendar = get_calendar("CMES")
+    sd, ed = datetime.date(2020, 8, 3), datetime.date(2020, 8, 4)
+
+    with engine.connect() as con:
+        con.execute(f"delete from quote where symbol = '{symbol}'")
+
+    try:
+        # the 8/4 session's first bars are on the evening of 8/3
+        ts = pd.date_range("2020-08-03 18:00", periods=3, freq="1min", tz="US/Eastern")
+        db_bulk_insert_df_conflict_on_do_nothing(
+            engine, fake_df_quotes(symbol, ts), "quote"
+        )
+        assert db_data_dates_between(engine, symbol, calendar, sd, ed) == {ed}
+
+        ts = pd.date_range("2020-08-03 10:00", periods=3, freq="1min", tz="US/Eastern")
+        db_bulk_insert_df_conflict_on_do_nothing(
+            engine, fake_df_quotes(symbol, ts), "quote"
+        )
+        assert db_data_dates_between(engine, symbol, calendar, sd, ed) == {sd, ed}
+    finally:
+        with engine.connect() as con:
+            con.execute(f"delete from quote where symbol = '{symbol}'")
+
+
+def test_gen_quote_select():
+    select = gen_quote_select()
+    assert select.startswith("id, ts, symbol, open::float8 as open")
+    assert "volume, bar_count, rth" in select
+
+
+def test_db_data_fetch_between_arrays():
+    engine = gen_engine_or_skip()
+    symbol = "TEST_ARR"
+    dt = datetime.date(2020, 8, 3)
+
+    with engine.connect() as con:
+        con.execute(f"delete from quote where symbol = '{symbol}'")
+
+    try:
+        df = fake_df_session(symbol, dt)
+        db_bulk_insert_df_conflict_on_do_nothing(engine, df, "quote")
+
+        arrays = db_data_fetch_between_arrays(engine, symbol, dt, dt)
+        assert arrays["close"].dtype == np.float64
+        assert arrays["close"].flags.c_contiguous
+        np.testing.assert_array_equal(arrays["open"], [1.25, 1.25, 1.25])
+        np.testing.assert_array_equal(arrays["bar_count"], [np.nan] * 3)
+        np.testing.assert_array_equal(
+            arrays["ts"], df.ts.dt.tz_convert(None).to_numpy()
+        )
+    finally:
+        with engine.connect() as con:
+            con.execute(f"delete from quote where symbol = '{symbol}'")
+
+
+def test_db_data_stream_between():
+    engine = gen_engine_or_skip()
+    symbol = "TEST_STRM"
+    dt = datetime.date(2020, 8, 3)
+
+    with engine.connect() as con:
+        con.execute(f"delete from quote where symbol = '{symbol}'")
+
+    try:
+        df = fake_df_session(symbol, dt)
+        db_bulk_insert_df_conflict_on_do_nothing(engine, df, "quote")
+
+        expected = db_data_fetch_between_arrays(engine, symbol, dt, dt)
+        chunks = list(db_data_stream_between(engine, symbol, dt, dt, chunk_size=2))
+
+        assert [len(chunk["ts"]) for chunk in chunks] == [2, 1]
+        for c, values in expected.items():
+            actual = np.concatenate([chunk[c] for chunk in chunks])
+            np.testing.assert_array_equal(actual, values)
+    finally:
+        with engine.connect() as con:
+            con.execute(f"delete from quote where symbol = '{symbol}'")
+
+
+def test_migrate_price_columns():
+    engine = gen_engine_or_skip()
+    table_name = "quote_migration_test"
+    query_types = f"""
+        select data_type from information_schema.columns
+        where table_name = '{table_name}' and column_name = 'close'
+    """
+
+    with engine.connect() as con:
+        con.execute(f"drop table if exists {table_name}")
+        con.execute(f"create table {table_name} (like quote)")
+
+    try:
+        migrate_price_columns(engine, PriceStorage.NUMERIC, table_name)
+        assert engine.execute(query_types).scalar() == "numeric"
+
+        migrate_price_columns(engine, PriceStorage.DOUBLE, table_name)
+        assert engine.execute(query_types).scalar() == "double precision"
+    finally:
+        with engine.connect() as con:
+            con.execute(f"drop table if exists {table_name}")
+
+
+def test_apply_rth_uses_calendar():
+    ts = pd.date_range("2020-07-31", "2020-08-04", freq="1min", tz="US/Eastern")
+    for calendar_name in ["XNYS", "CMES"]:
+        calendar = get_calendar(calendar_name)
+        df = pd.DataFrame({"ts": ts})
+        apply_rth(df, calendar)
+
+        expected = [calendar.is_open_on_minute(t) for t in ts[::97]]
+        assert df.rth.iloc[::97].tolist() == expected
+
+    # 20:00 US/Eastern, globex is open and nyse is not
+    assert df.rth[ts.get_loc(pd.Timestamp("2020-08-03 20:00", tz="US/Eastern"))]
+
+
+def test_fill_missing_rth():
+    ts = pd.to_datetime(["2020-08-03 09:29", "2020-08-03 09:30", "2020-08-03 12:00"])
+    df = pd.DataFrame({"ts": ts.tz_localize("US/Eastern"), "rth": [None, None, False]})
+    fill_missing_rth(df, get_calendar("XNYS"))
+    assert df.rth.tolist() == [False, True, False]
+
+    df = pd.DataFrame({"ts": ts.tz_localize("US/Eastern")})
+    fill_missing_rth(df, get_calendar("XNYS"))
+    assert df.rth.tolist() == [False, True, True]
@@ -0,0 +1,195 @@
+import asyncio
+import datetime
+import time
+import pandas as pd
+import pytest
+from ib_insync import BarData
+
+from ta_scanner.data.constants import RthSource, WhatToShow
+from ta_scanner.data.ib import IbDataFetcher, TokenBucket
+
+
+class FakeIB:
+    """
+    stand in for ib_insync.IB, serves canned bars after a latency that
+    depends on the requested date. full_session includes the rth bar in
+    useRTH=False requests, like IB does.
+    """
+
+    def __init__(self, latency, full_session=False):
+        self.latency = latency
+        self.full_session = full_session
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+
+    def isConnected(self):
+        return True
+
+    async def reqHistoricalDataAsync(self, contract, endDateTime, useRTH, **kwargs):
+        self.requests.append((endDateTime, useRTH))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency(endDateTime))
+        finally:
+            self.in_flight -= 1
+
+        return self.gen_bars(endDateTime, useRTH)
+
+    def reqHistoricalData(self, contract, endDateTime, useRTH, **kwargs):
+        self.requests.append((endDateTime, useRTH))
+        return self.gen_bars(endDateTime, useRTH)
+
+    def gen_bars(self, dt, use_rth):
+        if self.full_session:
+            hours = [14] if use_rth else [14, 23]
+        else:
+            hours = [14] if use_rth else [23]
+
+        bars = []
+        for hour in hours:
+            ts = datetime.datetime.combine(dt, datetime.time(hour))
+            ts = ts.replace(tzinfo=datetime.timezone.utc)
+            bars.append(BarData(date=ts, open=1.0, high=2.0, low=0.5, close=1.5))
+        return bars
+
+
+def gen_fetcher(latency, full_session=False, **kwargs) -> IbDataFetcher:
+    fetcher = IbDataFetcher(**kwargs)
+    fetcher.ib = FakeIB(latency, full_session)
+    return fetcher
+
+
+def gen_dates(count):
+    sd = datetime.date(2020, 8, 3)
+    return [sd + datetime.timedelta(days=i) for i in range(count)]
+
+
+async def collect(fetcher, symbol, dts):
+    what_to_show = WhatToShow.TRADES.value
+    return [
+        x async for x in fetcher.request_instruments_async(symbol, dts, what_to_show)
+    ]
+
+
+def test_request_instruments_async_bounded_in_flight():
+    dts = gen_dates(12)
+    # later dates answer first
+    fetcher = gen_fetcher(
+        lambda dt: 0.05 - 0.003 * dts.index(dt),
+        max_in_flight=4,
+        pacing_requests=100,
+        pacing_seconds=1.0,
+    )
+
+    results = asyncio.run(collect(fetcher, "/ES", dts))
+
+    assert sorted(dt for dt, _ in results) == dts
+    assert [dt for dt, _ in results] != dts
+    assert len(fetcher.ib.requests) == 2 * len(dts)
+    assert fetcher.ib.max_in_flight == 4
+
+    for dt, df in results:
+        assert len(df) == 2
+        assert sorted(df.rth) == [False, True]
+        assert set(df.date.dt.date) == {dt}
+
+
+def test_request_instruments_async_pacing():
+    dts = gen_dates(4)
+    fetcher = gen_fetcher(
+        lambda dt: 0, max_in_flight=8, pacing_requests=4, pacing_seconds=0.2
+    )
+
+    started = time.monotonic()
+    asyncio.run(collect(fetcher, "SPY", dts))
+    elapsed = time.monotonic() - started
+
+    # 4 requests come from the full bucket, the other 4 wait 0.05s each
+    assert elapsed >= 0.19
+
+
+def test_request_instruments_blocking():
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    dts = gen_dates(3)
+    fetcher = gen_fetcher(lambda dt: 0.01, pacing_requests=100)
+
+    results = dict(fetcher.request_instruments("/ES", dts, WhatToShow.TRADES.value))
+    assert sorted(results.keys()) == dts
+    assert all(isinstance(df, pd.DataFrame) for df in results.values())
+
+
+def test_request_instruments_blocking_cancels_when_closed():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    dts = gen_dates(6)
+    fetcher = gen_fetcher(
+        lambda dt: 0.01 if dt == dts[0] else 10, max_in_flight=6, pacing_requests=100
+    )
+
+    # hold on to the async generator, so it isn't finalized when dropped
+    generators = []
+    request_instruments_async = fetcher.request_instruments_async
+
+    def keep_generator(*args):
+        generators.append(request_instruments_async(*args))
+        return generators[-1]
+
+    fetcher.request_instruments_async = keep_generator
+
+    results = fetcher.request_instruments("/ES", dts, WhatToShow.TRADES.value)
+    dt, df = next(results)
+    assert dt == dts[0]
+    assert fetcher.ib.in_flight > 0
+
+    # the caller stops early, eg a failed insert
+    results.close()
+    assert generators[0].ag_frame is None
+    loop.run_until_complete(asyncio.sleep(0.05))
+    assert fetcher.ib.in_flight == 0
+
+
+def test_request_instruments_rth_from_calendar():
+    dts = gen_dates(3)
+    fetcher = gen_fetcher(
+        lambda dt: 0.01,
+        full_session=True,
+        pacing_requests=100,
+        rth_source=RthSource.CALENDAR,
+    )
+
+    results = dict(asyncio.run(collect(fetcher, "SPY", dts)))
+
+    # one request per date, all full session
+    assert sorted(fetcher.ib.requests) == [(dt, False) for dt in dts]
+    for dt in dts:
+        df = results[dt]
+        # 10:00 and 19:00 US/Eastern
+        assert df.date.dt.hour.tolist() == [14, 23]
+        assert df.rth.tolist() == [True, False]
+
+    fetcher.ib.requests = []
+    df = fetcher.request_instrument("SPY", dts[0], WhatToShow.TRADES.value)
+    assert fetcher.ib.requests == [(dts[0], False)]
+    assert df.rth.tolist() == [True, False]
+
+
+def test_token_bucket():
+    now = [0.0]
+    bucket = TokenBucket(2, 1.0, clock=lambda: now[0])
+
+    async def acquire_twice():
+        await bucket.acquire()
+        await bucket.acquire()
+
+    asyncio.run(acquire_twice())
+    assert bucket.tokens == 0
+
+    now[0] = 0.25
+    bucket._refill()
+    assert bucket.tokens == pytest.approx(0.5)
+
+    now[0] = 10.0
+    bucket._refill()
+    assert bucket.tokens == 2
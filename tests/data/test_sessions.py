@@ -0,0 +1,61 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from trading_calendars import get_calendar
+
+from ta_scanner.data.sessions import BAR_START_OFFSET, session_dates, tag_rth
+
+
+@pytest.mark.parametrize("calendar_name", ["XNYS", "CMES", "XHKG"])
+def test_tag_rth_matches_is_open_on_minute(calendar_name):
+    calendar = get_calendar(calendar_name)
+    # fri - tue, covers a weekend and XHKG's lunch break
+    ts = pd.date_range("2020-07-31", "2020-08-04 23:59", freq="1min", tz="UTC")
+
+    expected = np.array([calendar.is_open_on_minute(t) for t in ts])
+    np.testing.assert_array_equal(tag_rth(ts, calendar), expected)
+
+
+def test_tag_rth_bar_start_offset():
+    calendar = get_calendar("XNYS")
+    ts = pd.Series(
+        pd.to_datetime(
+            [
+                "2020-08-03 09:29",
+                "2020-08-03 09:30",
+                "2020-08-03 15:59",
+                "2020-08-03 16:00",
+            ]
+        ).tz_localize("US/Eastern")
+    )
+    np.testing.assert_array_equal(
+        tag_rth(ts, calendar, BAR_START_OFFSET), [False, True, True, False]
+    )
+
+
+def test_tag_rth_outside_calendar():
+    calendar = get_calendar("XNYS")
+    assert len(tag_rth(pd.DatetimeIndex([], tz="UTC"), calendar)) == 0
+
+    ts = pd.date_range("2020-08-01", periods=3, freq="1h", tz="UTC")
+    assert not tag_rth(ts, calendar).any()
+
+
+def test_session_dates_futures_evening():
+    calendar = get_calendar("CMES")
+    # the 8/4 session opens 17:00 CT on 8/3, after the 8/3 session closed
+    evening = pd.date_range("2020-08-03 18:00", periods=3, freq="1min", tz="US/Eastern")
+    assert session_dates(evening, calendar) == {datetime.date(2020, 8, 4)}
+
+    afternoon = pd.date_range(
+        "2020-08-03 14:00", periods=3, freq="1min", tz="US/Eastern"
+    )
+    assert session_dates(evening.append(afternoon), calendar) == {
+        datetime.date(2020, 8, 3),
+        datetime.date(2020, 8, 4),
+    }
+
+    # a saturday is in no session
+    weekend = pd.date_range("2020-08-01 12:00", periods=3, freq="1min", tz="UTC")
+    assert session_dates(weekend, calendar) == set()
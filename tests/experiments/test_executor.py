@@ -0,0 +1,82 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+from ta_scanner.experiments import executor as executor_module
+from ta_scanner.experiments.executor import (
+    ExperimentExecutor,
+    SharedArrays,
+    gen_walk_forward_windows,
+)
+from ta_scanner.experiments.parameter_sweep import ParameterSweep
+from ta_scanner.filters import FilterOptions
+from ta_scanner.indicators import IndicatorEmaCrossover, IndicatorParams
+
+
+def sum_slice(arrays, task):
+    return float(arrays["close"][task].sum())
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="requires shared_memory")
+def test_shared_arrays_attach():
+    close = np.arange(10, dtype=np.float64)
+    volume = np.arange(10, dtype=np.int64) * 2
+
+    with SharedArrays({"close": close, "volume": volume}) as shared:
+        shm, arrays = SharedArrays.attach(shared.spec)
+        np.testing.assert_array_equal(arrays["close"], close)
+        np.testing.assert_array_equal(arrays["volume"], volume)
+        assert not arrays["close"].flags.writeable
+        del arrays
+        shm.close()
+
+
+def test_map_results_in_task_order():
+    close = np.arange(100, dtype=np.float64)
+    tasks = [slice(i, i + 10) for i in range(0, 100, 10)]
+    expected = [float(close[t].sum()) for t in tasks]
+
+    for max_workers in [1, 2]:
+        executor = ExperimentExecutor(max_workers=max_workers)
+        assert list(executor.map(sum_slice, tasks, {"close": close})) == expected
+
+
+def test_map_without_shared_memory(monkeypatch):
+    # the python 3.7 path, workers get a copy of the arrays when they start
+    monkeypatch.setattr(executor_module, "shared_memory", None)
+    close = np.arange(100, dtype=np.float64)
+    tasks = [slice(i, i + 10) for i in range(0, 100, 10)]
+    expected = [float(close[t].sum()) for t in tasks]
+
+    executor = ExperimentExecutor(max_workers=2)
+    assert list(executor.map(sum_slice, tasks, {"close": close})) == expected
+
+
+def test_parallel_sweep_matches_serial():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"close": 100.0 + np.cumsum(rng.normal(0, 0.5, size=500))})
+    sweep = ParameterSweep(
+        IndicatorEmaCrossover,
+        {IndicatorParams.fast_ema: range(2, 12), IndicatorParams.slow_ema: [15, 30]},
+        {
+            FilterOptions.win_points: 2,
+            FilterOptions.loss_points: 1,
+            FilterOptions.threshold_intervals: 10,
+        },
+    )
+
+    serial = sweep.run(df)
+    parallel = sweep.run(df, executor=ExperimentExecutor(max_workers=2))
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_gen_walk_forward_windows():
+    ts = pd.Series(
+        pd.date_range("2020-08-03", periods=5, freq="D").repeat(3), name="ts"
+    )
+    windows = gen_walk_forward_windows(ts, train_days=2)
+
+    assert [w.label.day for w in windows] == [5, 6, 7]
+    assert windows[0].train == slice(0, 6)
+    assert windows[0].test == slice(6, 9)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ta_scanner.experiments.parameter_sweep import (
+    FilterSweep,
+    ParameterSweep,
+    ParameterSweepException,
+)
+from ta_scanner.filters import FilterCumsum, FilterOptions
+from ta_scanner.indicators import (
+    CombinedBindary,
+    IndicatorSmaCrossover,
+    IndicatorParams,
+)
+from ta_scanner.reports import BasicReport
+
+
+filter_params = {
+    FilterOptions.win_points: 2,
+    FilterOptions.loss_points: 1,
+    FilterOptions.threshold_intervals: 10,
+}
+
+
+def gen_df_bars(length=600, seed=5):
+    rng = np.random.default_rng(seed)
+    close = 100.0 + np.cumsum(rng.normal(0, 0.5, size=length))
+    return pd.DataFrame({"close": close})
+
+
+def run_cross(df_original, fast_sma, slow_sma):
+    df = df_original.copy()
+    indicator = IndicatorSmaCrossover(
+        "cross",
+        {IndicatorParams.fast_sma: fast_sma, IndicatorParams.slow_sma: slow_sma},
+    )
+    indicator.apply(df)
+    sfilter = FilterCumsum("cross", "cross_pnl", filter_params)
+    return BasicReport().summarize_ledger(sfilter.trade_ledger(df))
+
+
+def test_requires_moving_average_crossover():
+    with pytest.raises(ParameterSweepException):
+        ParameterSweep(CombinedBindary, {}, filter_params)
+
+
+def test_requires_fast_and_slow_params():
+    with pytest.raises(ParameterSweepException):
+        ParameterSweep(
+            IndicatorSmaCrossover, {IndicatorParams.fast_sma: [5]}, filter_params
+        )
+
+
+def test_sweep_matches_run_cross():
+    df = gen_df_bars()
+    param_grid = {
+        IndicatorParams.fast_sma: range(2, 8),
+        IndicatorParams.slow_sma: [10, 20],
+    }
+    sweep = ParameterSweep(IndicatorSmaCrossover, param_grid, filter_params)
+    results = sweep.run(df)
+
+    assert len(results) == 12
+    assert (
+        list(results.columns)
+        == [
+            "fast_sma",
+            "slow_sma",
+        ]
+        + BasicReport.metric_columns
+    )
+
+    for _, row in results.iterrows():
+        expected = run_cross(df, int(row.fast_sma), int(row.slow_sma))
+        actual = (row.pnl, row["count"], row.average, row["median"])
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_filter_sweep_matches_filter_cumsum():
+    df = gen_df_bars()
+    IndicatorSmaCrossover(
+        "cross", {IndicatorParams.fast_sma: 3, IndicatorParams.slow_sma: 12}
+    ).apply(df)
+    filter_grid = {
+        FilterOptions.win_points: [1, 2],
+        FilterOptions.loss_points: [1, 3],
+        FilterOptions.threshold_intervals: [5, 20],
+    }
+    results = FilterSweep(filter_grid).run(df, "cross")
+
+    assert len(results) == 8
+    for _, row in results.iterrows():
+        params = {
+            FilterOptions.win_points: row.win_points,
+            FilterOptions.loss_points: row.loss_points,
+            FilterOptions.threshold_intervals: int(row.threshold_intervals),
+        }
+        sfilter = FilterCumsum("cross", "cross_pnl", params)
+        ledger = sfilter.trade_ledger(df)
+        expected = BasicReport().summarize_ledger(ledger)
+        actual = (row.pnl, row["count"], row.average, row["median"])
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_filter_sweep_requires_every_filter_option():
+    with pytest.raises(ParameterSweepException):
+        FilterSweep({FilterOptions.win_points: [1]})
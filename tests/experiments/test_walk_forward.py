@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from ta_scanner.experiments.executor import ExperimentExecutor
+from ta_scanner.experiments.parameter_sweep import ParameterSweep
+from ta_scanner.experiments.walk_forward import WalkForwardExperiment
+from ta_scanner.filters import FilterOptions
+from ta_scanner.indicators import IndicatorEmaCrossover, IndicatorParams
+
+
+def gen_df_bars(days=8, bars_per_day=120, seed=2) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-08-03", periods=days)
+    ts = np.concatenate(
+        [
+            pd.date_range(d + pd.Timedelta(hours=9), periods=bars_per_day, freq="1min")
+            for d in dates
+        ]
+    )
+    close = 100 + rng.normal(0, 0.5, len(ts)).cumsum()
+    return pd.DataFrame({"ts": ts, "close": close})
+
+
+def gen_sweep() -> ParameterSweep:
+    return ParameterSweep(
+        IndicatorEmaCrossover,
+        {IndicatorParams.fast_ema: range(3, 9), IndicatorParams.slow_ema: [15]},
+        {
+            FilterOptions.win_points: 2,
+            FilterOptions.loss_points: 1,
+            FilterOptions.threshold_intervals: 10,
+        },
+    )
+
+
+def test_walk_forward_experiment():
+    df = gen_df_bars()
+    experiment = WalkForwardExperiment(gen_sweep(), train_days=3)
+    results = experiment.run(df)
+
+    assert len(results) == 5
+    assert results.label.tolist() == [
+        d.date() for d in pd.bdate_range("2020-08-06", periods=5)
+    ]
+    np.testing.assert_allclose(results.cumulative_pnl, results.pnl.cumsum())
+
+    # each window trains and tests on warm signals sliced from the full span
+    sweep = gen_sweep()
+    close = df.close.to_numpy()
+    signals = sweep.signals(close)
+    window = experiment.windows(df)[2]
+
+    train = sweep.evaluate(close[window.train], signals[window.train])
+    selected = int(np.nanargmax(train.pnl))
+    test = sweep.evaluate(
+        close[window.test],
+        signals[window.test][:, [selected]],
+        [sweep.cells()[selected]],
+    )
+
+    row = results.iloc[2]
+    assert row.fast_ema == train.fast_ema[selected]
+    assert row.pnl == test.pnl[0]
+    assert row["count"] == test["count"][0]
+
+
+def test_walk_forward_experiment_parallel_matches_serial():
+    df = gen_df_bars()
+    experiment = WalkForwardExperiment(gen_sweep(), train_days=2)
+    serial = experiment.run(df)
+    parallel = experiment.run(df, executor=ExperimentExecutor(max_workers=2))
+    pd.testing.assert_frame_equal(serial, parallel)
@@ -0,0 +1,174 @@
+import pickle
+import numpy as np
+import pandas as pd
+
+from ta_scanner.cache import IndicatorCache, canonical_params, fingerprint_arrays
+from ta_scanner.experiments.parameter_sweep import ParameterSweep
+from ta_scanner.filters import FilterOptions
+from ta_scanner.indicators import (
+    IndicatorEmaCrossover,
+    IndicatorParams,
+    CombinedBindary,
+)
+
+
+def gen_df(seed=1, length=500) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"close": 100 + rng.normal(0, 0.5, length).cumsum()})
+
+
+def gen_indicator(fast_ema=5) -> IndicatorEmaCrossover:
+    params = {IndicatorParams.fast_ema: fast_ema, IndicatorParams.slow_ema: 20}
+    return IndicatorEmaCrossover(field_name="crossover", params=params)
+
+
+def test_canonical_params():
+    a = {IndicatorParams.fast_ema: 5, IndicatorParams.slow_ema: np.int64(20)}
+    b = {IndicatorParams.slow_ema: 20, IndicatorParams.fast_ema: 5}
+    assert canonical_params(a) == canonical_params(b)
+    assert canonical_params({IndicatorParams.field_names: ("a", "b")}) == (
+        canonical_params({IndicatorParams.field_names: ["a", "b"]})
+    )
+
+
+def test_fingerprint_arrays():
+    values = np.arange(10, dtype=np.float64)
+    assert fingerprint_arrays([values]) == fingerprint_arrays([values.copy()])
+    assert fingerprint_arrays([values]) != fingerprint_arrays([values[:-1]])
+    assert fingerprint_arrays([values]) != fingerprint_arrays([values.astype(np.int64)])
+
+
+def test_apply_hits_cache():
+    cache = IndicatorCache()
+    df_expected = gen_df()
+    gen_indicator().apply(df_expected)
+
+    df_first, df_second = gen_df(), gen_df()
+    cache.apply(gen_indicator(), df_first)
+    cache.apply(gen_indicator(), df_second)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    pd.testing.assert_frame_equal(df_first, df_expected)
+    pd.testing.assert_frame_equal(df_second, df_expected)
+
+    # the cached arrays are not shared with the frame
+    df_second.loc[0, "crossover"] = 9
+    cache.apply(gen_indicator(), df_first)
+    pd.testing.assert_frame_equal(df_first, df_expected)
+
+    # different params or bars miss
+    cache.apply(gen_indicator(fast_ema=6), gen_df())
+    cache.apply(gen_indicator(), gen_df(seed=2))
+    assert cache.misses == 3
+
+
+def test_apply_combined_bindary_keys_on_its_fields():
+    cache = IndicatorCache()
+    combined = CombinedBindary(
+        field_name="composite", params={IndicatorParams.field_names: ["a", "b"]}
+    )
+    df = pd.DataFrame({"a": [0, 1, 0, -1], "b": [1, 0, 0, -1], "close": 1.0})
+    cache.apply(combined, df)
+
+    df["close"] = 2.0
+    cache.apply(combined, df)
+    assert cache.hits == 1
+    assert df.composite.tolist() == [0, 1, 0, -1]
+
+
+def test_lru_byte_budget():
+    df = gen_df(length=1000)
+    entry_nbytes = 3 * 1000 * 8
+    cache = IndicatorCache(max_bytes=2 * entry_nbytes)
+
+    for fast_ema in [5, 6, 7]:
+        cache.apply(gen_indicator(fast_ema), df.copy())
+    assert cache.nbytes == 2 * entry_nbytes
+
+    # 5 was evicted, 7 is still cached
+    cache.apply(gen_indicator(7), df.copy())
+    cache.apply(gen_indicator(5), df.copy())
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_disk_cache(tmp_path):
+    cache_dir = str(tmp_path / "indicators")
+    IndicatorCache(cache_dir=cache_dir).apply(gen_indicator(), gen_df())
+
+    # a new cache, eg in another process, reads the entry from disk
+    cache = pickle.loads(pickle.dumps(IndicatorCache(cache_dir=cache_dir)))
+    df = gen_df()
+    cache.apply(gen_indicator(), df)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    df_expected = gen_df()
+    gen_indicator().apply(df_expected)
+    pd.testing.assert_frame_equal(df, df_expected)
+
+
+def test_indicator_apply_with_cache():
+    cache = IndicatorCache()
+    df_expected = gen_indicator().apply(gen_df())
+
+    df = gen_df()
+    gen_indicator().apply(df, cache=cache)
+    gen_indicator().apply(df, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    pd.testing.assert_frame_equal(df, df_expected)
+
+
+def test_disk_budget(tmp_path):
+    cache_dir = tmp_path / "indicators"
+    df = gen_df(length=1000)
+    cache = IndicatorCache(cache_dir=str(cache_dir), max_disk_bytes=1)
+
+    for fast_ema in [5, 6, 7]:
+        gen_indicator(fast_ema).apply(df.copy(), cache=cache)
+    # the file just written is always kept
+    assert len(list(cache_dir.glob("*.npz"))) == 1
+
+    cache = IndicatorCache(cache_dir=str(cache_dir))
+    gen_indicator(7).apply(df.copy(), cache=cache)
+    gen_indicator(5).apply(df.copy(), cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_parameter_sweep_cache():
+    cache = IndicatorCache()
+    sweep = ParameterSweep(
+        IndicatorEmaCrossover,
+        {IndicatorParams.fast_ema: range(5, 10), IndicatorParams.slow_ema: [20]},
+        {
+            FilterOptions.win_points: 2,
+            FilterOptions.loss_points: 1,
+            FilterOptions.threshold_intervals: 10,
+        },
+        cache=cache,
+    )
+    df = gen_df()
+    first = sweep.run(df)
+    assert (cache.hits, cache.misses) == (0, 6)
+
+    second = sweep.run(df)
+    assert cache.hits == 6
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_parameter_sweep_disk_keys(tmp_path):
+    cache_dir = tmp_path / "indicators"
+    sweep = ParameterSweep(
+        IndicatorEmaCrossover,
+        {IndicatorParams.fast_ema: [5], IndicatorParams.slow_ema: [20]},
+        {
+            FilterOptions.win_points: 2,
+            FilterOptions.loss_points: 1,
+            FilterOptions.threshold_intervals: 10,
+        },
+        cache=IndicatorCache(cache_dir=str(cache_dir)),
+    )
+    sweep.run(gen_df())
+
+    # hashed keys, safe as file names on every platform
+    names = [path.stem for path in cache_dir.glob("*.npz")]
+    assert len(names) == 2
+    assert all(len(name) == 32 and name.isalnum() for name in names)
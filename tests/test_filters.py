@@ -1,8 +1,16 @@
+import numpy as np
 import pandas as pd
 import pytest
 from typing import Any, Dict
 
-from ta_scanner.filters import FilterCumsum, FilterOptions, FilterException
+from ta_scanner.filters import (
+    ExitReason,
+    FilterCumsum,
+    FilterException,
+    FilterOptions,
+    gen_filter_cells,
+)
+from ta_scanner.kernels import Backend
 
 
 def gen_df_zeros(field_name="some_field_name"):
@@ -46,3 +54,176 @@ def test_required_filter_options():
     )
 
     filter_cumsum.apply(df)
+
+
+def gen_df_random_walk(field_name="some_field_name", length=500, seed=7):
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2020-08-03 09:30", periods=length, freq="1min", tz="UTC")
+    close = 3000.0 + np.cumsum(rng.choice([-0.25, 0.0, 0.25], size=length) * 4)
+    signals = rng.choice([-1, 0, 0, 0, 0, 0, 0, 0, 1], size=length)
+    df = pd.DataFrame({"ts": ts, "close": close, field_name: signals}, index=ts)
+    return df
+
+
+def test_vectorized_matches_iterrows():
+    field_name = "indicator_name"
+    result_field_name = f"{field_name}_pnl"
+
+    params: Dict[FilterOptions, Any] = {
+        FilterOptions.win_points: 3.0,
+        FilterOptions.loss_points: 2.0,
+        FilterOptions.threshold_intervals: 15,
+    }
+
+    for backend, inverse in [
+        (Backend.numpy, 1),
+        (Backend.numpy, -1),
+        (Backend.auto, 1),
+    ]:
+        filter_cumsum = FilterCumsum(
+            field_name=field_name,
+            result_field_name=result_field_name,
+            params=params,
+            backend=backend,
+        )
+        df_vectorized = gen_df_random_walk(field_name)
+        df_iterrows = df_vectorized.copy()
+
+        filter_cumsum.apply(df_vectorized, inverse=inverse)
+        filter_cumsum.apply(df_iterrows, inverse=inverse, vectorized=False)
+
+        pd.testing.assert_series_equal(
+            df_vectorized[result_field_name], df_iterrows[result_field_name]
+        )
+
+
+def test_trade_ledger_matches_apply():
+    field_name = "indicator_name"
+    result_field_name = f"{field_name}_pnl"
+    params: Dict[FilterOptions, Any] = {
+        FilterOptions.win_points: 3.0,
+        FilterOptions.loss_points: 2.0,
+        FilterOptions.threshold_intervals: 15,
+    }
+    filter_cumsum = FilterCumsum(
+        field_name=field_name, result_field_name=result_field_name, params=params
+    )
+    df = gen_df_random_walk(field_name)
+    columns = list(df.columns)
+
+    ledger = filter_cumsum.trade_ledger(df, inverse=-1)
+    assert list(df.columns) == columns
+
+    signals = df[field_name].to_numpy()
+    assert len(ledger.pnl) == (signals != 0).sum()
+    order = np.lexsort((ledger.entry_index, ledger.exit_index))
+    np.testing.assert_array_equal(order, np.arange(len(order)))
+
+    # the result column keeps the later entry of trades exiting on one bar
+    filter_cumsum.apply(df, inverse=-1)
+    results = df[result_field_name].to_numpy()
+    exits = np.flatnonzero(~np.isnan(results))
+    last = np.append(ledger.exit_index[1:] != ledger.exit_index[:-1], True)
+    np.testing.assert_array_equal(ledger.exit_index[last], exits)
+    np.testing.assert_array_equal(ledger.pnl[last], results[exits])
+
+    np.testing.assert_array_equal(ledger.direction, signals[ledger.entry_index] * -1)
+    np.testing.assert_array_equal(
+        ledger.pnl, (ledger.exit_price - ledger.entry_price) * ledger.direction
+    )
+    assert (ledger.exit_index - ledger.entry_index < 15).all()
+
+
+def test_trade_ledger_exit_reasons():
+    params: Dict[FilterOptions, Any] = {
+        FilterOptions.win_points: 2.0,
+        FilterOptions.loss_points: 2.0,
+        FilterOptions.threshold_intervals: 3,
+    }
+    filter_cumsum = FilterCumsum(
+        field_name="signal", result_field_name="pnl", params=params
+    )
+    close = np.array([10.0, 11.0, 12.0, 12.0, 11.0, 10.0, 10.0, 10.5, 10.5])
+    signals = np.array([1, 0, 0, 1, 0, 0, 1, 0, 0])
+
+    ledger = filter_cumsum.trades(close, signals)
+
+    np.testing.assert_array_equal(ledger.entry_index, [0, 3, 6])
+    np.testing.assert_array_equal(ledger.exit_index, [2, 5, 8])
+    np.testing.assert_array_equal(ledger.pnl, [2.0, -2.0, 0.5])
+    assert [ExitReason(x) for x in ledger.exit_reason] == [
+        ExitReason.won,
+        ExitReason.lost,
+        ExitReason.max_time,
+    ]
+
+    frame = ledger.to_frame()
+    assert frame.exit_reason.tolist() == ["won", "lost", "max_time"]
+
+
+def test_trades_exiting_on_the_same_bar():
+    params: Dict[FilterOptions, Any] = {
+        FilterOptions.win_points: 5.0,
+        FilterOptions.loss_points: 5.0,
+        FilterOptions.threshold_intervals: 5,
+    }
+    filter_cumsum = FilterCumsum(
+        field_name="signal", result_field_name="pnl", params=params
+    )
+    close = np.array([100.0, 100.0, 106.0, 106.0, 106.0])
+    signals = np.array([1, 1, 0, 0, 0])
+
+    ledger = filter_cumsum.trades(close, signals)
+    np.testing.assert_array_equal(ledger.entry_index, [0, 1])
+    np.testing.assert_array_equal(ledger.exit_index, [2, 2])
+    np.testing.assert_array_equal(ledger.pnl, [6.0, 6.0])
+
+    df = pd.DataFrame({"ts": np.arange(5), "close": close, "signal": signals})
+    filter_cumsum.apply(df)
+    assert df.pnl.count() == 1
+    assert df.pnl[2] == 6.0
+
+
+def test_trades_without_signals():
+    params: Dict[FilterOptions, Any] = {
+        FilterOptions.win_points: 2.0,
+        FilterOptions.loss_points: 2.0,
+        FilterOptions.threshold_intervals: 3,
+    }
+    filter_cumsum = FilterCumsum(
+        field_name="signal", result_field_name="pnl", params=params
+    )
+    ledger = filter_cumsum.trades(np.ones(5), np.zeros(5))
+    assert len(ledger.pnl) == 0
+    assert ledger.exit_reason.dtype == np.int8
+
+
+def test_trades_grid_matches_trades():
+    field_name = "indicator_name"
+    df = gen_df_random_walk(field_name, length=800)
+    close = df.close.to_numpy()
+    signals = df[field_name].to_numpy()
+
+    cells = gen_filter_cells(
+        {
+            FilterOptions.win_points: [0.5, 2.0, 3.0],
+            FilterOptions.loss_points: [1.0, 2.0],
+            FilterOptions.threshold_intervals: [1, 5, 30],
+        }
+    )
+    filter_cumsum = FilterCumsum(
+        field_name=field_name, result_field_name="pnl", params={}
+    )
+    ledgers = filter_cumsum.trades_grid(close, signals, cells, inverse=-1)
+
+    assert len(ledgers) == 18
+    for cell, ledger in zip(cells, ledgers):
+        filter_cell = FilterCumsum(
+            field_name=field_name,
+            result_field_name="pnl",
+            params=cell,
+            backend=Backend.numpy,
+        )
+        expected = filter_cell.trades(close, signals, inverse=-1)
+        for actual_values, expected_values in zip(ledger, expected):
+            np.testing.assert_array_equal(actual_values, expected_values)
@@ -1,11 +1,15 @@
+import numpy as np
 import pandas as pd
 import pytest
 from typing import Any, Dict
 
 from ta_scanner.indicators import (
     IndicatorSmaCrossover,
+    IndicatorEmaCrossover,
     IndicatorParams,
     IndicatorException,
+    CombinedBindary,
+    CombineMode,
 )
 
 
@@ -34,3 +38,146 @@ def test_ensure_required_filter_options():
 
     expected_message = "IndicatorSmaCrossover requires key = IndicatorParams.slow_sma"
     assert expected_message == str(e.value)
+
+
+def test_combined_bindary_vectorized_matches_iterrows():
+    rng = np.random.default_rng(3)
+    field_names = ["a", "b", "c"]
+    data = rng.choice([-1, 0, 0, 0, 0, 0, 1], size=(400, len(field_names)))
+    df_vectorized = pd.DataFrame(data, columns=field_names)
+    df_iterrows = df_vectorized.copy()
+
+    combined = CombinedBindary(
+        field_name="composite", params={IndicatorParams.field_names: field_names}
+    )
+    combined.apply(df_vectorized)
+    combined.apply(df_iterrows, vectorized=False)
+
+    pd.testing.assert_series_equal(df_vectorized.composite, df_iterrows.composite)
+
+
+@pytest.mark.parametrize(
+    "indicator_class", [IndicatorSmaCrossover, IndicatorEmaCrossover]
+)
+def test_update_matches_apply(indicator_class):
+    rng = np.random.default_rng(9)
+    df = pd.DataFrame({"close": 100 + rng.normal(0, 0.25, 1000).cumsum()})
+    params = {indicator_class.fast_param: 7, indicator_class.slow_param: 30}
+
+    batch = indicator_class(field_name="signal", params=params)
+    batch.apply(df)
+
+    streaming = indicator_class(field_name="signal", params=params)
+    signals = [streaming.update(bar) for _, bar in df.iterrows()]
+
+    np.testing.assert_array_equal(np.array(signals), df.signal.to_numpy())
+    assert (df.signal != 0).sum() > 0
+
+
+def test_rolling_averages_match_talib_bit_for_bit():
+    rng = np.random.default_rng(4)
+    close = 4000 + rng.normal(0, 1.5, 2000).cumsum()
+
+    for indicator_class in [IndicatorSmaCrossover, IndicatorEmaCrossover]:
+        for timeperiod in [2, 13, 60]:
+            expected = indicator_class.moving_average(close, timeperiod)
+            rolling = indicator_class.rolling_class(timeperiod)
+            actual = np.array([rolling.update(x) for x in close])
+            assert expected.tobytes() == actual.tobytes()
+
+
+def test_update_reset():
+    params = {IndicatorParams.fast_sma: 2, IndicatorParams.slow_sma: 3}
+    sma_crossover = IndicatorSmaCrossover(field_name="signal", params=params)
+    bars = [{"close": c} for c in [3, 2, 1, 2, 3, 4]]
+
+    first = [sma_crossover.update(bar) for bar in bars]
+    sma_crossover.reset()
+    second = [sma_crossover.update(bar) for bar in bars]
+    assert first == second
+
+
+@pytest.mark.parametrize(
+    "vote",
+    [
+        {},
+        {IndicatorParams.combine_mode: CombineMode.majority},
+        {
+            IndicatorParams.combine_mode: CombineMode.weighted,
+            IndicatorParams.weights: [3, 2, 1],
+        },
+    ],
+)
+def test_combined_bindary_update_matches_apply(vote):
+    rng = np.random.default_rng(5)
+    field_names = ["a", "b", "c"]
+    data = rng.choice([-1, 0, 0, 0, 1], size=(300, len(field_names)))
+    df = pd.DataFrame(data, columns=field_names)
+
+    params = {IndicatorParams.field_names: field_names, **vote}
+    combined = CombinedBindary(field_name="composite", params=params)
+    combined.apply(df)
+    signals = [combined.update(bar) for _, bar in df.iterrows()]
+
+    np.testing.assert_array_equal(np.array(signals), df.composite.to_numpy())
+
+
+def test_combined_bindary_majority():
+    df = pd.DataFrame({"a": [1, 0, 0, -1], "b": [0, 1, 0, 0], "c": [0, 0, -1, 0]})
+    params = {
+        IndicatorParams.field_names: ["a", "b", "c"],
+        IndicatorParams.combine_mode: CombineMode.majority,
+    }
+    CombinedBindary(field_name="composite", params=params).apply(df)
+    assert df.composite.tolist() == [0, 1, 1, -1]
+
+
+def test_combined_bindary_weighted_requires_a_weight_per_field():
+    df = pd.DataFrame({"a": [1, 0], "b": [0, 1]})
+    params = {
+        IndicatorParams.field_names: ["a", "b"],
+        IndicatorParams.combine_mode: CombineMode.weighted,
+        IndicatorParams.weights: [1.0],
+    }
+    with pytest.raises(IndicatorException):
+        CombinedBindary(field_name="composite", params=params).apply(df)
+
+
+@pytest.mark.parametrize(
+    "indicator_class", [IndicatorSmaCrossover, IndicatorEmaCrossover]
+)
+def test_update_chunk_matches_compute(indicator_class):
+    rng = np.random.default_rng(2)
+    close = 100 + rng.normal(0, 0.25, 1000).cumsum()
+    params = {indicator_class.fast_param: 7, indicator_class.slow_param: 30}
+
+    expected = indicator_class(field_name="signal", params=params).compute(
+        {"close": close}
+    )
+
+    streaming = indicator_class(field_name="signal", params=params)
+    # chunk boundaries inside the slow warm up and at the end
+    bounds = [0, 10, 11, 400, 999, 1000]
+    chunks = [
+        streaming.update_chunk({"close": close[start:stop]})
+        for start, stop in zip(bounds[:-1], bounds[1:])
+    ]
+
+    for c, values in expected.items():
+        actual = np.concatenate([chunk[c] for chunk in chunks])
+        assert actual.tobytes() == values.tobytes()
+
+
+def test_combined_bindary_update_chunk_matches_apply():
+    rng = np.random.default_rng(8)
+    data = rng.choice([-1, 0, 0, 0, 1], size=(200, 2))
+    df = pd.DataFrame(data, columns=["a", "b"])
+
+    combined = CombinedBindary(
+        field_name="composite", params={IndicatorParams.field_names: ["a", "b"]}
+    )
+    chunks = [combined.update_chunk(df.iloc[i : i + 64]) for i in range(0, 200, 64)]
+    combined.apply(df)
+
+    actual = np.concatenate([chunk["composite"] for chunk in chunks])
+    np.testing.assert_array_equal(actual, df.composite.to_numpy())
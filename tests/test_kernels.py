@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from ta_scanner.kernels import (
+    Backend,
+    resolve_backend,
+    cumsum_exits,
+    combined_binary,
+)
+
+
+def gen_close(length=300, seed=11):
+    rng = np.random.default_rng(seed)
+    return 100.0 + np.cumsum(rng.choice([-0.5, 0.0, 0.5], size=length))
+
+
+def gen_signals(length=300, width=3, seed=11):
+    rng = np.random.default_rng(seed)
+    return rng.choice([-1, 0, 0, 0, 0, 1], size=(length, width)).astype(np.int8)
+
+
+def test_resolve_backend_numpy():
+    assert resolve_backend(Backend.numpy) == Backend.numpy
+
+
+def test_cumsum_exits_backends_match():
+    pytest.importorskip("numba")
+
+    close = gen_close()
+    positions = np.arange(0, len(close), 7)
+    directions = np.where(positions % 2 == 0, 1.0, -1.0)
+
+    for threshold in [1, 10, 50]:
+        args = (close, positions, directions, 2.0, 1.5, threshold)
+        numpy_index, numpy_pnl = cumsum_exits(*args, backend=Backend.numpy)
+        numba_index, numba_pnl = cumsum_exits(*args, backend=Backend.numba)
+
+        np.testing.assert_array_equal(numpy_index, numba_index)
+        np.testing.assert_array_equal(numpy_pnl, numba_pnl)
+
+
+@pytest.mark.parametrize(
+    "weights, min_weight", [(None, None), (None, 2.0), ([0.5, 0.25, 0.25], 0.5)]
+)
+def test_combined_binary_backends_match(weights, min_weight):
+    pytest.importorskip("numba")
+
+    signals = gen_signals()
+    kwargs = {"weights": weights, "min_weight": min_weight}
+    np.testing.assert_array_equal(
+        combined_binary(signals, backend=Backend.numpy, **kwargs),
+        combined_binary(signals, backend=Backend.numba, **kwargs),
+    )
+
+
+def test_combined_binary_all_agree():
+    signals = np.array([[1, 0], [0, 0], [0, 1], [-1, 0], [0, -1]], dtype=np.int8)
+    expected = np.array([0, 0, 1, 0, -1], dtype=np.int8)
+    np.testing.assert_array_equal(combined_binary(signals, Backend.numpy), expected)
+
+
+def test_combined_binary_majority():
+    signals = np.array(
+        [[1, 0, 0], [0, 1, 0], [0, 0, -1], [-1, 0, 0], [0, 0, 0], [0, -1, 0]],
+        dtype=np.int8,
+    )
+    expected = np.array([0, 1, 1, -1, 0, -1], dtype=np.int8)
+    result = combined_binary(signals, Backend.numpy, min_weight=2.0)
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_combined_binary_weighted():
+    signals = np.array([[1, 0, 0], [0, -1, 0], [0, 0, -1]], dtype=np.int8)
+    weights = np.array([2.0, 1.0, 1.0])
+    expected = np.array([1, 1, 0], dtype=np.int8)
+    result = combined_binary(signals, Backend.numpy, weights=weights, min_weight=2.0)
+    np.testing.assert_array_equal(result, expected)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ta_scanner.filters import FilterCumsum, FilterOptions
+from ta_scanner.indicators import (
+    BaseIndicator,
+    CombinedBindary,
+    IndicatorEmaCrossover,
+    IndicatorParams,
+    IndicatorSmaCrossover,
+)
+from ta_scanner.pipeline import Pipeline, PipelineException
+from ta_scanner.reports import BasicReport
+
+
+filter_params = {
+    FilterOptions.win_points: 2,
+    FilterOptions.loss_points: 1,
+    FilterOptions.threshold_intervals: 10,
+}
+
+
+def gen_df_bars(length=500, seed=9):
+    rng = np.random.default_rng(seed)
+    close = 100.0 + np.cumsum(rng.normal(0, 0.5, size=length))
+    return pd.DataFrame({"close": close})
+
+
+def gen_indicators():
+    return [
+        IndicatorSmaCrossover(
+            "sma", {IndicatorParams.fast_sma: 5, IndicatorParams.slow_sma: 20}
+        ),
+        IndicatorEmaCrossover(
+            "ema", {IndicatorParams.fast_ema: 8, IndicatorParams.slow_ema: 30}
+        ),
+        CombinedBindary("combined", {IndicatorParams.field_names: ["sma", "ema"]}),
+    ]
+
+
+def test_pipeline_matches_apply_without_mutating():
+    df = gen_df_bars()
+    sfilter = FilterCumsum("combined", "combined_pnl", filter_params)
+    pipeline = Pipeline(gen_indicators(), sfilter, BasicReport())
+
+    memory_usage = df.memory_usage(deep=True)
+    result = pipeline.run(df)
+    assert list(df.columns) == ["close"]
+    pd.testing.assert_series_equal(df.memory_usage(deep=True), memory_usage)
+
+    df_applied = df.copy()
+    for indicator in gen_indicators():
+        indicator.apply(df_applied)
+    for c, values in result.columns.items():
+        np.testing.assert_array_equal(values, df_applied[c].to_numpy())
+
+    sfilter.apply(df_applied)
+    expected = BasicReport().analyze(df_applied, "combined_pnl")
+    metrics = result.metrics.iloc[0]
+    actual = (metrics.pnl, metrics["count"], metrics.average, metrics["median"])
+    np.testing.assert_array_equal(actual, expected)
+
+    assert list(result.to_frame(df.index).columns) == list(result.columns)
+
+
+class WritesInput(BaseIndicator):
+    def apply(self, df):
+        pass
+
+    def compute(self, columns):
+        columns["close"][0] = 0.0
+        return {self.field_name: columns["close"]}
+
+
+def test_pipeline_inputs_are_read_only():
+    df = gen_df_bars()
+    with pytest.raises(ValueError):
+        Pipeline([WritesInput("writes", {})]).run(df)
+    assert df.close[0] != 0.0
+
+
+def test_pipeline_requires_input_columns():
+    combined = CombinedBindary("combined", {IndicatorParams.field_names: ["sma"]})
+    with pytest.raises(PipelineException) as e:
+        Pipeline([combined]).run(gen_df_bars())
+    assert str(e.value) == "CombinedBindary requires column sma"
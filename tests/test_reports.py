@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from ta_scanner.filters import ExitReason, TradeLedger
+from ta_scanner.reports import BasicReport
+
+
+def test_metrics():
+    values = [np.nan, 2.0, 0.0, -1.0, -3.0, 0.0, 4.0, np.nan]
+    metrics = BasicReport().metrics(values).iloc[0]
+
+    assert metrics.pnl == 2.0
+    assert metrics["count"] == 4
+    assert metrics.average == 0.5
+    assert metrics["median"] == 0.5
+    assert metrics.win_rate == 0.5
+    assert metrics.profit_factor == 1.5
+    # equity 2, 1, -2, 2 from a peak of 2
+    assert metrics.max_drawdown == 4.0
+    np.testing.assert_allclose(metrics.sharpe, 0.5 / np.std([2, -1, -3, 4], ddof=1))
+    np.testing.assert_allclose(metrics.sortino, 0.5 / np.sqrt(10 / 4))
+    assert metrics.expectancy == 0.5
+
+
+def test_metrics_matrix_matches_columns():
+    rng = np.random.default_rng(3)
+    matrix = rng.choice([-2.0, -1.0, 0.0, 0.0, 1.5, 3.0], size=(50, 4))
+    matrix[:, 3] = 0.0
+
+    report = BasicReport()
+    metrics = report.metrics(matrix)
+
+    assert len(metrics) == 4
+    for i in range(3):
+        pd.testing.assert_series_equal(
+            metrics.iloc[i], report.metrics(matrix[:, i]).iloc[0], check_names=False
+        )
+    assert report.summarize(matrix[:, 0]) == tuple(metrics.iloc[0][:4])
+
+    no_trades = metrics.iloc[3]
+    assert no_trades.pnl == 0.0
+    assert no_trades["count"] == 0
+    assert np.isnan(no_trades.average)
+
+
+def gen_ledger(pnl) -> TradeLedger:
+    count = len(pnl)
+    return TradeLedger(
+        entry_index=np.arange(count),
+        exit_index=np.arange(count) + 1,
+        direction=np.ones(count, dtype=np.int8),
+        entry_price=np.full(count, 100.0),
+        exit_price=100.0 + np.asarray(pnl),
+        pnl=np.asarray(pnl, dtype=np.float64),
+        exit_reason=np.full(count, ExitReason.max_time, dtype=np.int8),
+    )
+
+
+def test_ledger_breakeven_trades_are_trades():
+    report = BasicReport()
+    assert report.summarize_ledger(gen_ledger([0.0, 0.0])) == (0.0, 2, 0.0, 0.0)
+
+    metrics = report.ledger_metrics([gen_ledger([2.0, 0.0, -1.0])]).iloc[0]
+    assert metrics["count"] == 3
+    assert metrics.win_rate == 1 / 3
+    np.testing.assert_allclose(metrics.average, 1 / 3)
+    # a breakeven trade is neither a win nor a loss
+    np.testing.assert_allclose(metrics.expectancy, 2 / 3 - 1 / 3)
+
+
+def test_ledger_metrics_ignore_padding():
+    report = BasicReport()
+    metrics = report.ledger_metrics(
+        [gen_ledger([1.0, 0.0, -1.0, 0.0]), gen_ledger([0.0]), gen_ledger([])]
+    )
+    assert metrics["count"].tolist() == [4, 1, 0]
+    assert metrics.win_rate.iloc[1] == 0.0
+    assert np.isnan(metrics.win_rate.iloc[2])
+
+
+def test_analyze_only_exports_with_a_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({"pnl": [np.nan, 1.0, 0.0, -2.0]})
+
+    assert BasicReport().analyze(df, "pnl") == (-1.0, 2, -0.5, -0.5)
+    assert list(tmp_path.iterdir()) == []
+
+    export_path = tmp_path / "trades.csv"
+    BasicReport().analyze(df, "pnl", export_path=export_path)
+    assert len(pd.read_csv(export_path)) == 2
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ta_scanner.experiments.executor import ExperimentExecutor
+from ta_scanner.filters import FilterCumsum, FilterOptions
+from ta_scanner.indicators import IndicatorSmaCrossover, IndicatorParams
+from ta_scanner.data.bar_set import SharedBarSet
+from ta_scanner.scanner import (
+    BarSetLoader,
+    Scanner,
+    ScanPipeline,
+    ScannerException,
+    gen_futures_universe,
+)
+
+
+def load_fake_bars(symbol: str) -> pd.DataFrame:
+    if symbol == "/BAD":
+        raise ValueError("no bars")
+    rng = np.random.default_rng(sum(map(ord, symbol)))
+    close = 100 + rng.normal(0, 0.5, 800).cumsum()
+    ts = pd.date_range("2020-08-03 09:30", periods=len(close), freq="1min")
+    return pd.DataFrame({"ts": ts, "close": close})
+
+
+def gen_pipeline() -> ScanPipeline:
+    params = {IndicatorParams.fast_sma: 5, IndicatorParams.slow_sma: 30}
+    filter_params = {
+        FilterOptions.win_points: 2,
+        FilterOptions.loss_points: 1,
+        FilterOptions.threshold_intervals: 20,
+    }
+    return ScanPipeline(
+        [IndicatorSmaCrossover(field_name="crossover", params=params)],
+        FilterCumsum(
+            field_name="crossover",
+            result_field_name="crossover_pnl",
+            params=filter_params,
+        ),
+    )
+
+
+def test_gen_futures_universe():
+    symbols = gen_futures_universe()
+    assert "/ES" in symbols
+    assert len(symbols) == len(set(symbols))
+
+
+def test_pipeline_without_trades():
+    df = load_fake_bars("/ES")
+    df["crossover"] = 0
+    pipeline = gen_pipeline()._replace(indicators=[])
+    pnl, count, average, median = pipeline.run(df)
+    assert (pnl, count) == (0, 0)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_scan(max_workers):
+    symbols = ["/ES", "/BAD", "/GC", "/CL"]
+    scanner = Scanner(
+        gen_pipeline(), load_fake_bars, ExperimentExecutor(max_workers=max_workers)
+    )
+    results = scanner.scan(symbols)
+
+    assert sorted(results.symbol) == sorted(symbols)
+    assert results.pnl.iloc[:3].is_monotonic_decreasing
+    assert results.symbol.iloc[-1] == "/BAD"
+    assert "no bars" in results.error.iloc[-1]
+
+    scanned = results[results.error.isnull()]
+    assert (scanned.bars == 800).all()
+    assert (scanned.load_seconds >= 0).all()
+    assert (scanned.run_seconds >= 0).all()
+
+    # same metrics as running the pipeline directly
+    expected = gen_pipeline().run(load_fake_bars("/GC"))
+    actual = scanned.set_index("symbol").loc["/GC", Scanner.metric_columns]
+    np.testing.assert_allclose(actual.to_numpy(dtype=np.float64), expected)
+
+
+def test_scan_requires_symbols():
+    scanner = Scanner(gen_pipeline(), load_fake_bars)
+    with pytest.raises(ScannerException):
+        scanner.scan([])
+
+
+def test_scan_bar_set_matches_frames():
+    symbols = ["/ES", "/GC", "/CL"]
+    frames = {}
+    for symbol in symbols:
+        df = load_fake_bars(symbol)
+        for c in ["open", "high", "low", "volume"]:
+            df[c] = df.close
+        frames[symbol] = df
+
+    executor = ExperimentExecutor(max_workers=2)
+    expected = Scanner(gen_pipeline(), frames.get, ExperimentExecutor(1)).scan(symbols)
+    with SharedBarSet.create(frames) as bar_set:
+        loader = BarSetLoader(bar_set.name)
+        results = Scanner(gen_pipeline(), loader, executor).scan(symbols)
+
+    columns = ["symbol"] + Scanner.metric_columns + ["bars"]
+    pd.testing.assert_frame_equal(results[columns], expected[columns])